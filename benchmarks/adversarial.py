@@ -0,0 +1,81 @@
+import sys
+import time
+from typing import Callable, List, Tuple
+
+import src.common_log_format  # noqa: F401
+import src.mariadb_mysql  # noqa: F401
+import src.nginx  # noqa: F401
+import src.syslog  # noqa: F401
+from src.classifier import Classifier
+from src.pipeline import MAX_PARSE_LENGTH, Event, Pipeline
+from src.syslog.regex import RFC5424
+
+HTTPD = '1.1.1.1 - - [10/Oct/2000:13:55:36 -0700] '
+MYSQL = '2020-01-01 00:00:00 1 [Note] '
+# Most a guarded line short enough to be parsed may take
+BUDGET = 1000.0
+
+HEADER = '<27>1 2020-03-22T12:35:47.385660+02:00 host.localdomain app 927 DOCKER:d8e210ec875a~app_1~sha256:20da7ed64a1e~app:latest~docker'
+
+# Crafted lines of a given size (in repetitions of their pattern), each aimed at a fragment that
+# backtracks: STRUCTURED-DATA elements that can be split in 2^n ways before a mismatch, MESSAGE
+# that cannot reach "$", unterminated elements and inner formats scanning quotes.
+CASES: Tuple[Tuple[str, Callable[[int], str], Tuple[int, ...]], ...] = (
+    ('sd elements, no space', lambda size: f'{HEADER} ' + '[a]' * size + 'x', (8, 16, 20)),
+    ('sd elements, newline', lambda size: f'{HEADER} ' + '[a]' * size + ' m\nm', (8, 16, 20)),
+    ('sd unterminated', lambda size: f'{HEADER} [' + 'a' * size, (1000, 8000, 60000)),
+    ('sd escaped brackets', lambda size: f'{HEADER} [' + 'a\\]' * size + 'x', (1000, 2600, 20000)),
+    ('long message', lambda size: f'{HEADER} - ' + 'a' * size, (1000, 8000, 60000)),
+    ('httpd quotes', lambda size: f'{HEADER} - {HTTPD}"' + '" 200 1 ' * size, (100, 1000, 7000)),
+    ('mysql brackets', lambda size: f'{HEADER} - {MYSQL}' + '[A' * size, (100, 4000, 30000)),
+)
+
+
+def unguarded() -> Callable[[str], object]:
+    classifier = Classifier.from_registry()
+
+    def parse(line: str) -> object:
+        match = RFC5424.match(line)
+        if match is not None and match.group('message'):
+            return classifier.match(match.group('message'))
+        return match
+    return parse
+
+
+def guarded() -> Callable[[str], object]:
+    def consume(event: Event) -> None:
+        event.inner
+    return Pipeline.from_registry(consume, fallback=lambda line: None)
+
+
+def worst(parse: Callable[[str], object], line: str, repeat: int = 3) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        parse(line)
+        best = min(best, time.perf_counter() - started)
+    return best * 1e6
+
+
+def main() -> None:
+    candidates = (('unguarded', unguarded()), ('guarded', guarded()))
+    worst_case: List[float] = []
+    over: List[str] = []
+    for name, generate, sizes in CASES:
+        for size in sizes:
+            line = generate(size)
+            times = [worst(parse, line) for _, parse in candidates]
+            worst_case.append(times[-1])
+            if len(line) <= MAX_PARSE_LENGTH and times[-1] > BUDGET:
+                over.append(f'{name} x{size}')
+            columns = ' '.join(
+                f'{label} {value:10.1f} us' for (label, _), value in zip(candidates, times)
+            )
+            print(f'{name:>22} x{size:<6} {len(line):6} chars: {columns}')
+    print(f'{"guarded worst case":>22}: {max(worst_case):.1f} us/line')
+    if over:
+        sys.exit(f'Over {BUDGET:.0f} us/line when guarded: {", ".join(over)}')
+
+
+if __name__ == '__main__':
+    main()
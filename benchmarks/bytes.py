@@ -0,0 +1,98 @@
+import sys
+import time
+import tracemalloc
+from typing import Callable, List, Sequence
+
+import src.common_log_format  # noqa: F401
+import src.mariadb_mysql  # noqa: F401
+import src.nginx  # noqa: F401
+import src.syslog  # noqa: F401
+from src import as_bytes, get_regex
+from src.pipeline import BytesPipeline, Event, Pipeline
+from src.sentry import payload
+from src.timestamp import Normalizer
+
+from . import corpus
+
+
+def measure(handle: Callable[[bytes], object], lines: Sequence[bytes]) -> float:
+    best = float('inf')
+    for _ in range(5):
+        started = time.perf_counter()
+        for line in lines:
+            handle(line)
+        best = min(best, time.perf_counter() - started)
+    return best / len(lines) * 1e9
+
+
+# Peak of memory allocated while handling one line after another, per line
+def allocated(handle: Callable[[bytes], object], lines: Sequence[bytes]) -> float:
+    tracemalloc.start()
+    for line in lines:
+        handle(line)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / len(lines)
+
+
+def main(count: int = 10000) -> None:
+    normalizer = Normalizer()
+    events: List[object] = []
+
+    def forward(event: Event) -> None:
+        events.append(payload(event, normalizer))
+
+    def drop(event: Event) -> None:
+        pass
+
+    def decoding(pipeline: Pipeline) -> Callable[[bytes], None]:
+        return lambda line: pipeline(line.decode('utf-8', 'replace'))
+
+    mixed = [line.encode() for line in corpus.mixed(count)]
+    noise = [line.encode() for line in corpus.generate('NOISE', count)]
+    print(f'{"":>30}  decode-then-match        bytes')
+    for name, lines, consumer, severity in (
+        ('mixed, forwarded', mixed, forward, 7),
+        ('mixed, not forwarded', mixed, drop, 7),
+        ('mixed, severity <= 4', mixed, drop, 4),
+        ('not syslog', noise, drop, 7),
+    ):
+        row = []
+        for pipeline in (
+            decoding(Pipeline.from_registry(consumer, severity)),
+            BytesPipeline.from_registry(consumer, severity),
+        ):
+            events.clear()
+            ns = measure(pipeline, lines)
+            events.clear()
+            row.append(f'{ns:7.0f} ns {allocated(pipeline, lines):6.0f} B')
+        print(f'{name:>30}: {row[0]}  {row[1]}')
+
+    # Inner formats on bytes, decoding every group sent on, against decoding MESSAGE once
+    for name, pattern in get_regex():
+        if name == 'RFC5424':
+            continue
+        binary = as_bytes(pattern)
+        messages = [line.encode() for line in corpus.generate(name, count)]
+
+        def by_bytes(message: bytes) -> object:
+            match = binary.match(message)
+            return {
+                key: value.decode('utf-8', 'replace')
+                for key, value in match.groupdict().items() if value is not None
+            } if match else None
+
+        def by_str(message: bytes) -> object:
+            match = pattern.match(message.decode('utf-8', 'replace'))
+            return {
+                key: value for key, value in match.groupdict().items() if value is not None
+            } if match else None
+
+        print(
+            f'{name + " fields":>30}: {measure(by_str, messages):7.0f} ns           '
+            f'{measure(by_bytes, messages):7.0f} ns'
+        )
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,55 @@
+import re
+import sys
+import time
+from typing import Callable, Iterable, Optional, Tuple
+
+import src.common_log_format  # noqa: F401
+import src.mariadb_mysql  # noqa: F401
+import src.nginx  # noqa: F401
+import src.syslog  # noqa: F401
+from src import get_regex
+from src.classifier import Classifier
+
+from . import samples
+
+
+def sequential(regex: Tuple[Tuple[str, re.Pattern], ...]) -> Callable[[str], Optional[tuple]]:
+    def classify(line: str) -> Optional[tuple]:
+        for name, item in regex:
+            match = item.match(line)
+            if match is not None:
+                return name, match.groupdict()
+        return None
+    return classify
+
+
+def measure(classify: Callable[[str], Optional[tuple]], lines: Iterable[str], repeat: int) -> float:
+    lines = tuple(lines)
+    best = float('inf')
+    for _ in range(5):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            for line in lines:
+                classify(line)
+        best = min(best, time.perf_counter() - started)
+    return best / (repeat * len(lines)) * 1e9
+
+
+def main(repeat: int = 2000) -> None:
+    regex = get_regex()
+    candidates = (
+        ('sequential', sequential(regex)),
+        ('classifier', Classifier(regex).classify),
+    )
+    corpora = (
+        ('mixed', samples.ALL),
+        ('last registered', samples.NGINX_ERROR),
+        ('no match', samples.NOISE),
+    )
+    for corpus, lines in corpora:
+        for name, classify in candidates:
+            print(f'{corpus:>16} {name:>12}: {measure(classify, lines, repeat):8.0f} ns/line')
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
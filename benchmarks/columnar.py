@@ -0,0 +1,55 @@
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import src.common_log_format  # noqa: F401
+import src.mariadb_mysql  # noqa: F401
+import src.nginx  # noqa: F401
+import src.syslog  # noqa: F401
+from src.classifier import Classifier
+from src.columnar import parse_many
+from src.timestamp import Normalizer
+
+from . import corpus
+
+
+# One dict per line, as a replay would build them without `parse_many`
+def by_line(lines: Sequence[str]) -> List[Optional[Dict[str, Any]]]:
+    classifier = Classifier.from_registry()
+    normalizer = Normalizer()
+    result: List[Optional[Dict[str, Any]]] = []
+    for line in lines:
+        record = classifier.match(line)
+        if record is None:
+            result.append(None)
+            continue
+        row: Dict[str, Any] = record.asdict()
+        row['format'] = record.FORMAT
+        row['timestamp'] = normalizer.microseconds(record)
+        result.append(row)
+    return result
+
+
+def measure(parse: Callable[[Sequence[str]], object], lines: Sequence[str]) -> float:
+    best = float('inf')
+    for _ in range(5):
+        started = time.perf_counter()
+        parse(lines)
+        best = min(best, time.perf_counter() - started)
+    return best / len(lines) * 1e9
+
+
+def main(count: int = 20000) -> None:
+    corpora = {name: corpus.generate(name, count) for name in ('HTTPD', 'MYSQL', 'NGINX_ERROR')}
+    corpora['mixed'] = corpus.mixed(count)
+    for name, lines in corpora.items():
+        dicts = measure(by_line, lines)
+        columns = measure(parse_many, lines)
+        print(
+            f'{name:>12}: dict per line {dicts:6.0f} ns/line, parse_many {columns:6.0f} ns/line'
+            f' ({dicts / columns:.2f}x)'
+        )
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
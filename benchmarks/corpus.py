@@ -0,0 +1,206 @@
+import calendar
+import random
+import sys
+from typing import Callable, Dict, List, Optional
+
+# Seeded generators of realistic lines: the same seed always gives the same corpus, so that
+# numbers measured on it can be compared between commits.
+
+Generator = Callable[[random.Random], str]
+
+CONTAINERS = tuple(
+    (
+        f'{random.Random(index).getrandbits(256):064x}',
+        f'project_{name}_{index % 3 + 1}',
+        f'sha256:{random.Random(image).getrandbits(256):064x}',
+        image,
+    )
+    for index, (name, image) in enumerate((
+        ('web', 'httpd:2.4'),
+        ('proxy', 'nginx:1.17'),
+        ('db', 'mariadb:10.4'),
+        ('db', 'mysql:8.0'),
+        ('worker', 'python:3.8-slim'),
+        ('cache', 'redis:5'),
+    ))
+)
+HOSTS = ('docker-01.example.com', 'docker-02.example.com', 'host.localdomain')
+METHODS = ('GET', 'GET', 'GET', 'POST', 'PUT', 'DELETE', 'HEAD')
+PATHS = (
+    '/', '/index.php', '/apache_pb.gif', '/api/v1/users/{id}', '/api/v1/orders/{id}/items',
+    '/static/css/app.{id}.css', '/login?next=%2Faccount', '/health',
+)
+STATUSES = (200, 200, 200, 200, 201, 204, 301, 304, 400, 403, 404, 500, 502)
+USER_AGENTS = (
+    'Mozilla/4.08 [en] (Win98; I ;Nav)',
+    'Mozilla/5.0 (X11; Linux x86_64; rv:74.0) Gecko/20100101 Firefox/74.0',
+    'curl/7.68.0',
+    'kube-probe/1.17',
+)
+MYSQL_LEVELS = ('Note', 'Note', 'Note', 'Warning', 'Warning', 'ERROR', 'System')
+MYSQL_MESSAGES = (
+    ('MY-012487', 'InnoDB', 'InnoDB: DDL log recovery : begin'),
+    ('MY-010116', 'Server', '/usr/sbin/mysqld (mysqld 8.0.19) starting as process {id}'),
+    ('10051', 'Server', 'Event Scheduler: scheduler thread started with id {id}'),
+    ('MY-013360', 'Server', "Plugin sha256_password reported: 'sha256_password is deprecated'"),
+    (None, 'InnoDB', 'Buffer pool(s) load completed at 200322 12:35:{id:02d}'),
+    (None, None, "Aborted connection {id} to db: 'app' user: 'app' host: '172.18.0.{id}' (Got timeout reading communication packets)"),
+)
+NGINX_LEVELS = ('debug', 'info', 'notice', 'warn', 'error', 'crit', 'alert', 'emerg')
+NGINX_MESSAGES = (
+    'stat() "/var/www/html/index.php" failed (13: Permission denied), client: {ip}, server: example.com, request: "GET /index.php HTTP/1.1", host: "example.com"',
+    'open() "/usr/share/nginx/html/favicon.ico" failed (2: No such file or directory), client: {ip}, server: localhost, request: "GET /favicon.ico HTTP/1.1"',
+    'upstream timed out (110: Connection timed out) while reading response header from upstream, client: {ip}, server: _, upstream: "http://172.18.0.{id}:8000/api"',
+    'signal process started',
+)
+NOISE = (
+    'Traceback (most recent call last):',
+    '  File "/app/worker.py", line {id}, in run',
+    '    at com.example.Service.run(Service.java:{id})',
+    'KeyError: \'user_{id}\'',
+    '2020-03-22 12:35:47,123 INFO [main] Application started in {id} ms',
+    '[{id}] WARNING: unable to connect to redis',
+    '{ip} connected',
+    '',
+)
+
+
+def _ip(rng: random.Random) -> str:
+    octets = rng.choice((10, 127, 172, 192)), rng.randrange(256), rng.randrange(256)
+    return '.'.join(map(str, octets + (rng.randrange(1, 255),)))
+
+
+def _time(rng: random.Random) -> tuple:
+    return (
+        rng.choice((2019, 2020)), rng.randint(1, 12), rng.randint(1, 28),
+        rng.randrange(24), rng.randrange(60), rng.randrange(60), rng.randrange(1000000),
+    )
+
+
+def _iso(rng: random.Random, digits: int, timezone: str) -> str:
+    year, month, day, hour, minute, second, microsecond = _time(rng)
+    result = f'{year}-{month:02d}-{day:02d}T{hour:02d}:{minute:02d}:{second:02d}.{microsecond:06d}'
+    return result[:20 + digits] + timezone
+
+
+def _fill(template: str, rng: random.Random) -> str:
+    return template.format(id=rng.randrange(1, 100), ip=_ip(rng))
+
+
+def httpd(rng: random.Random) -> str:
+    year, month, day, hour, minute, second, _ = _time(rng)
+    request = f'{rng.choice(METHODS)} {_fill(rng.choice(PATHS), rng)} HTTP/1.{rng.randrange(2)}'
+    line = (
+        f'{_ip(rng)} - {rng.choice(("-", "frank", "admin"))} '
+        f'[{day:02d}/{calendar.month_abbr[month]}/{year}:{hour:02d}:{minute:02d}:{second:02d} '
+        f'{rng.choice(("+0000", "-0700", "+0130"))}] "{request}" {rng.choice(STATUSES)} '
+        f'{rng.randrange(100000)}'
+    )
+    if rng.random() < 0.5:
+        referer = f'http://www.example.com{_fill(rng.choice(PATHS), rng)}'
+        line += f' "{referer}" "{rng.choice(USER_AGENTS)}"'
+    return line
+
+
+def mysql(rng: random.Random) -> str:
+    err_code, subsystem, message = rng.choice(MYSQL_MESSAGES)
+    if rng.random() < 0.5:
+        # MySQL 8
+        line = (
+            f'{_iso(rng, 6, "Z")} {rng.randrange(100)} [{rng.choice(MYSQL_LEVELS)}] '
+            f'[{err_code or "MY-000000"}] [{subsystem or "Server"}] '
+        )
+    else:
+        # MariaDB
+        year, month, day, hour, minute, second, _ = _time(rng)
+        line = (
+            f'{year}-{month:02d}-{day:02d} {hour:02d}:{minute:02d}:{second:02d} '
+            f'{rng.randrange(10 ** 14, 10 ** 15)} [{rng.choice(MYSQL_LEVELS)}] '
+        )
+    return line + _fill(message, rng)
+
+
+def nginx_error(rng: random.Random) -> str:
+    year, month, day, hour, minute, second, _ = _time(rng)
+    line = (
+        f'{year}/{month:02d}/{day:02d} {hour:02d}:{minute:02d}:{second:02d} '
+        f'[{rng.choice(NGINX_LEVELS)}] {rng.randrange(1, 32768)}#{rng.randrange(4)}: '
+    )
+    if rng.random() < 0.8:
+        line += f'*{rng.randrange(1, 100000)} '
+    return line + _fill(rng.choice(NGINX_MESSAGES), rng)
+
+
+def noise(rng: random.Random) -> str:
+    return _fill(rng.choice(NOISE), rng)
+
+
+INNER: Dict[str, Generator] = {
+    'HTTPD': httpd,
+    'MYSQL': mysql,
+    'NGINX_ERROR': nginx_error,
+    'NOISE': noise,
+}
+
+
+# https://tools.ietf.org/html/rfc5424, as written by Docker's syslog logging driver with the
+# "rfc5424micro" format and the MSGID tag documented in the README
+def docker(rng: random.Random, message: str) -> str:
+    full_id, name, image_id, image = rng.choice(CONTAINERS)
+    return (
+        f'<{rng.choice((27, 28, 30, 30, 30, 31))}>1 {_iso(rng, 6, "+02:00")} '
+        f'{rng.choice(HOSTS)} {full_id[:12]} {rng.randrange(1, 32768)} '
+        f'DOCKER:{full_id}~{name}~{image_id}~{image}~docker -'
+    ) + (f' {message}' if message else '')
+
+
+def rfc5424(rng: random.Random) -> str:
+    structured_data = rng.choice((
+        '-',
+        f'[exampleSDID@32473 iut="3" eventSource="Application" eventID="{rng.randrange(10000)}"]',
+        '[origin ip="192.0.2.1" software="rsyslogd"][meta sequenceId="1"]',
+    ))
+    message = noise(rng) or 'BOM An application event log entry...'
+    return (
+        f'<{rng.randrange(192)}>1 {_iso(rng, 3, "Z")} {rng.choice(HOSTS)} '
+        f'{rng.choice(("evntslog", "sshd", "cron"))} {rng.randrange(1, 32768)} '
+        f'ID{rng.randrange(100)} {structured_data} {message}'
+    )
+
+
+def _docker(inner: Generator) -> Generator:
+    return lambda rng: docker(rng, inner(rng))
+
+
+GENERATORS: Dict[str, Generator] = {
+    'RFC5424': rfc5424,
+    **INNER,
+    **{f'DOCKER_{name}': _docker(inner) for name, inner in INNER.items()},
+}
+
+
+def generate(name: str, count: int, seed: int = 0) -> List[str]:
+    rng = random.Random(f'{name}:{seed}')
+    return [GENERATORS[name](rng) for _ in range(count)]
+
+
+# Docker-tagged lines with the given share of every inner format, shuffled
+def mixed(count: int, seed: int = 0, weights: Optional[Dict[str, float]] = None) -> List[str]:
+    weights = weights or {'HTTPD': 0.4, 'NGINX_ERROR': 0.2, 'MYSQL': 0.2, 'NOISE': 0.2}
+    lines: List[str] = []
+    for name, weight in weights.items():
+        lines.extend(generate(f'DOCKER_{name}', int(count * weight), seed))
+    random.Random(seed).shuffle(lines)
+    return lines
+
+
+def main(name: str = 'mixed', count: str = '10', seed: str = '0') -> None:
+    if name == 'mixed':
+        lines = mixed(int(count), int(seed))
+    else:
+        lines = generate(name, int(count), int(seed))
+    sys.stdout.write(''.join(f'{line}\n' for line in lines))
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:])
@@ -0,0 +1,65 @@
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List
+
+from src.docker import Client, Enricher
+from src.docker.stub import StubServer
+
+from . import corpus
+
+Payload = Dict[str, Any]
+
+
+def payloads(count: int) -> List[Payload]:
+    return [
+        {
+            'message': {'formatted': 'foo'},
+            'tags': {'container_id': full_id},
+            'contexts': {'docker': {'container_id': full_id}},
+        }
+        for index in range(count)
+        for full_id in (corpus.CONTAINERS[index % len(corpus.CONTAINERS)][0],)
+    ]
+
+
+def measure(handle: Callable[[Payload], None], items: List[Payload]) -> float:
+    started = time.perf_counter()
+    for item in items:
+        handle(item)
+    return (time.perf_counter() - started) / len(items) * 1e9
+
+
+async def run(count: int) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        server = StubServer(os.path.join(directory, 'docker.sock'), delay=0.005)
+        for full_id, name, _, image in corpus.CONTAINERS:
+            server.add(full_id, name, {'com.docker.compose.service': name}, [])
+        await server.start()
+        sent: List[Payload] = []
+        enricher = Enricher(sent.append, Client(server.path))
+        items = payloads(count)
+
+        started = time.perf_counter()
+        cold = measure(enricher, items[:1000])
+        while enricher.waiting:
+            await asyncio.sleep(0.001)
+        print(
+            f'cold cache: {cold:6.0f} ns/payload to queue, all enriched after '
+            f'{(time.perf_counter() - started) * 1000:.1f} ms, {enricher.lookups} lookups for '
+            f'{len(corpus.CONTAINERS)} containers, {enricher.coalesced} coalesced'
+        )
+        print(f'  passthrough: {measure(sent.append, items):6.0f} ns/payload')
+        print(f'    cache hit: {measure(enricher, payloads(count)):6.0f} ns/payload')
+        print(f'     hit rate: {enricher.hit_rate:.4f}')
+        await server.close()
+
+
+def main(count: int = 100000) -> None:
+    asyncio.run(run(count))
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
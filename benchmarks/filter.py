@@ -0,0 +1,51 @@
+import sys
+import time
+from typing import Callable, List
+
+import src.common_log_format  # noqa: F401
+import src.mariadb_mysql  # noqa: F401
+import src.nginx  # noqa: F401
+import src.syslog  # noqa: F401
+from src.pipeline import Event, Pipeline
+from src.syslog.filter import PriFilter, Rule
+from src.syslog.pri import parse_pri
+from src.syslog.regex import RFC5424
+
+from . import corpus
+
+
+def measure(handle: Callable[[str], object], lines: List[str]) -> float:
+    best = float('inf')
+    for _ in range(5):
+        started = time.perf_counter()
+        for line in lines:
+            handle(line)
+        best = min(best, time.perf_counter() - started)
+    return best / len(lines) * 1e9
+
+
+def main(count: int = 20000) -> None:
+    lines = corpus.mixed(count)
+    dropped = [line for line in lines if parse_pri(line) & 7 > 4]  # type: ignore
+
+    def consume(event: Event) -> None:
+        event.inner
+
+    def pipeline() -> Pipeline:
+        return Pipeline.from_registry(consume)
+
+    rules = [Rule.parse('container:project_db_3=6'), Rule.parse('image:nginx=3')]
+    print(f'{len(dropped) / len(lines):.0%} of the mixed corpus is less severe than 4')
+    for name, handle, given in (
+        ('RFC5424 regex, dropped lines', RFC5424.match, dropped),
+        ('filter, dropped lines', PriFilter(lambda line: None, 4), dropped),
+        ('filter with rules, dropped lines', PriFilter(lambda line: None, 4, rules=rules), dropped),
+        ('pipeline, all lines', pipeline(), lines),
+        ('filter + pipeline, all lines', PriFilter(pipeline(), 4), lines),
+        ('filter with rules + pipeline', PriFilter(pipeline(), 4, rules=rules), lines),
+    ):
+        print(f'{name:>32}: {measure(handle, given):8.0f} ns/line')
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
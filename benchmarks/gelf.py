@@ -0,0 +1,71 @@
+import json
+import random
+import sys
+import time
+import zlib
+from typing import List
+
+from src.gelf import Gelf
+
+MESSAGE = {
+    'version': '1.1',
+    'host': 'host.localdomain',
+    'timestamp': 1584880547.38566,
+    'level': 3,
+    '_container_id': 'd8e210ec875a' + '0' * 52,
+    '_container_name': 'nginx_1',
+    '_image_id': 'sha256:20da7ed64a1e',
+    '_image_name': 'nginx:latest',
+}
+
+
+# `concurrent` messages of `count` chunks each at a time, their chunks shuffled together, as
+# many senders splitting large messages at once would deliver them
+def datagrams(messages: int, count: int, concurrent: int, seed: int = 0) -> List[bytes]:
+    rng = random.Random(seed)
+    result: List[bytes] = []
+    for start in range(0, messages, concurrent):
+        group = []
+        for index in range(start, min(start + concurrent, messages)):
+            text = f'Traceback of request {index}\n' + '  File "/app/worker.py", line 1\n' * 40
+            data = zlib.compress(json.dumps({**MESSAGE, 'short_message': text}).encode())
+            size = -(-len(data) // count)
+            key = index.to_bytes(8, 'big')
+            group.extend(
+                b'\x1e\x0f' + key + bytes((sequence, count))
+                + data[sequence * size:(sequence + 1) * size]
+                for sequence in range(count)
+            )
+        rng.shuffle(group)
+        result.extend(group)
+    return result
+
+
+def main(messages: int = 20000) -> None:
+    for count, concurrent in ((2, 10), (8, 100), (8, 1000), (128, 100)):
+        total = messages if count < 128 else messages // 10
+        items = datagrams(total, count, concurrent)
+        lines = 0
+
+        def handle(line: str) -> None:
+            nonlocal lines
+            lines += 1
+
+        gelf = Gelf(handle, maxsize=concurrent)
+        peak = 0
+        started = time.perf_counter()
+        for index, item in enumerate(items):
+            gelf(item)
+            if not index & 255:
+                peak = max(peak, len(gelf))
+        elapsed = time.perf_counter() - started
+        print(
+            f'{count:3d} chunks x {concurrent:4d} interleaved: '
+            f'{len(items) / elapsed:8.0f} chunks/s, '
+            f'{gelf.messages / elapsed:7.0f} messages/s, {lines / elapsed:8.0f} lines/s, '
+            f'{peak:4d} pending at most, {gelf.evicted + gelf.expired} lost'
+        )
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,68 @@
+import asyncio
+import multiprocessing
+import sys
+import time
+
+import src.common_log_format  # noqa: F401
+import src.mariadb_mysql  # noqa: F401
+import src.nginx  # noqa: F401
+import src.syslog  # noqa: F401
+from src.classifier import Classifier
+from src.listener import Listener
+
+from . import loadgen, samples
+
+
+async def run(protocol: str, count: int, framing: str = 'octet', rate: float = 0) -> None:
+    classifier = Classifier.from_registry()
+    received = 0
+    first = last = 0.0
+
+    def handle(line: str) -> None:
+        nonlocal received, first, last
+        last = time.perf_counter()
+        if not received:
+            first = last
+        received += 1
+        classifier.classify(line)
+
+    listener = Listener(
+        handle,
+        '127.0.0.1',
+        udp_port=0 if protocol == 'udp' else None,
+        tcp_port=0 if protocol == 'tcp' else None,
+    )
+    await listener.start()
+    if protocol == 'udp':
+        target, args = loadgen.send_udp, (listener.udp_address, samples.RFC5424, count, rate)
+    else:
+        target, args = loadgen.send_tcp, (listener.tcp_address, samples.RFC5424, count, framing)
+    process = multiprocessing.Process(target=target, args=args)
+    process.start()
+
+    idle = 0
+    while received < count and idle < 20:
+        seen = received
+        await asyncio.sleep(0.1)
+        idle = idle + 1 if received == seen else 0
+    listener.close()
+    process.join()
+
+    elapsed = (last - first) or float('inf')
+    name = protocol if protocol == 'udp' else f'{protocol}/{framing}'
+    print(
+        f'{name:>12}: received {received}/{count} lines, '
+        f'{received / elapsed:8.0f} lines/s, {elapsed / max(received, 1) * 1e9:6.0f} ns/line'
+    )
+    if listener.reader is not None:
+        print(f'{"":>12}  {received / max(listener.reader.wakeups, 1):.1f} datagrams/wakeup')
+
+
+def main(count: int = 100000) -> None:
+    asyncio.run(run('tcp', count, 'octet'))
+    asyncio.run(run('tcp', count, 'newline'))
+    asyncio.run(run('udp', count, rate=50000))
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,78 @@
+import argparse
+import itertools
+import socket
+import time
+from typing import Sequence, Tuple
+
+from . import samples
+
+
+def frame(line: str, framing: str) -> bytes:
+    data = line.encode()
+    if framing == 'octet':
+        return b'%d %s' % (len(data), data)
+    return data + b'\n'
+
+
+def send_udp(address: Tuple[str, int], lines: Sequence[str], count: int, rate: float = 0) -> float:
+    datagrams = [line.encode() for line in lines]
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.connect(address)
+    started = time.perf_counter()
+    try:
+        for index, datagram in enumerate(itertools.islice(itertools.cycle(datagrams), count)):
+            if rate and index % 1000 == 0:
+                delay = started + index / rate - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            try:
+                sock.send(datagram)
+            except ConnectionRefusedError:
+                pass
+    finally:
+        sock.close()
+    return time.perf_counter() - started
+
+
+def send_tcp(
+    address: Tuple[str, int],
+    lines: Sequence[str],
+    count: int,
+    framing: str = 'octet',
+    chunk: int = 1000,
+) -> float:
+    frames = [frame(line, framing) for line in lines]
+    sock = socket.create_connection(address)
+    started = time.perf_counter()
+    try:
+        source = itertools.islice(itertools.cycle(frames), count)
+        while True:
+            data = b''.join(itertools.islice(source, chunk))
+            if not data:
+                break
+            sock.sendall(data)
+    finally:
+        sock.close()
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.loadgen')
+    parser.add_argument('protocol', choices=('udp', 'tcp'))
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=514)
+    parser.add_argument('--count', type=int, default=100000)
+    parser.add_argument('--rate', type=float, default=0, help='UDP datagrams/s, 0 = unlimited')
+    parser.add_argument('--framing', choices=('octet', 'newline'), default='octet')
+    args = parser.parse_args()
+
+    address = (args.host, args.port)
+    if args.protocol == 'udp':
+        elapsed = send_udp(address, samples.RFC5424, args.count, args.rate)
+    else:
+        elapsed = send_tcp(address, samples.RFC5424, args.count, args.framing)
+    print(f'sent {args.count} lines in {elapsed:.2f}s ({args.count / elapsed:.0f} lines/s)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+import sys
+import time
+from typing import Callable, Dict, Optional
+
+import src.common_log_format  # noqa: F401
+import src.mariadb_mysql  # noqa: F401
+import src.nginx  # noqa: F401
+import src.syslog  # noqa: F401
+from src.metrics import Metrics
+from src.pipeline import Event, Pipeline
+
+from .pipeline import LINES
+
+
+def consume(event: Event) -> None:
+    event.inner
+
+
+def pipeline(sample: Optional[int]) -> Callable[[str], None]:
+    metrics = Metrics(sample) if sample is not None else None
+    result = Pipeline.from_registry(consume, metrics=metrics)
+    if metrics is not None:
+        metrics.counter('pattern_matches_total', '', 'pattern', lambda: result.hits)
+    return result
+
+
+# Variants take turns over many short rounds, the fastest round of each counts, so that a noisy
+# machine slows them all alike
+def main(rounds: int = 300) -> None:
+    variants = {name: pipeline(sample) for name, sample in (
+        ('off', None), ('sample 1/16', 16), ('sample 1/1', 1),
+    )}
+    best: Dict[str, float] = {name: float('inf') for name in variants}
+    for _ in range(rounds):
+        for name, handle in variants.items():
+            started = time.perf_counter()
+            for line in LINES:
+                handle(line)
+            best[name] = min(best[name], (time.perf_counter() - started) / len(LINES))
+    for name, elapsed in best.items():
+        overhead = (elapsed / best['off'] - 1) * 100
+        print(f'{name:>12}: {elapsed * 1e9:6.0f} ns/line, {overhead:+5.1f}%')
+
+    metrics = Metrics()
+    handle = Pipeline.from_registry(consume, metrics=metrics)
+    metrics.counter('pattern_matches_total', '', 'pattern', lambda: handle.hits)
+    for line in LINES:
+        handle(line)
+    started = time.perf_counter()
+    for _ in range(1000):
+        metrics.render()
+    print(f'{"render":>12}: {(time.perf_counter() - started) * 1e3:6.0f} us/scrape')
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
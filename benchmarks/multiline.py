@@ -0,0 +1,75 @@
+import random
+import sys
+import time
+from typing import Callable, List
+
+import src.common_log_format  # noqa: F401
+import src.mariadb_mysql  # noqa: F401
+import src.nginx  # noqa: F401
+import src.syslog  # noqa: F401
+from src.multiline import Assembler
+from src.pipeline import Event, Pipeline
+
+from . import corpus
+
+HEAD = '2020-03-22 12:35:47 0 [ERROR] InnoDB: Unable to lock ./ibdata1 error: 11'
+TRACE = tuple(f'    at com.example.Service.run(Service.java:{index})' for index in range(20))
+
+
+# `streams` containers writing, interleaved, a matched line followed by `depth` continuation lines
+def traces(streams: int, depth: int, count: int, seed: int = 0) -> List[str]:
+    rng = random.Random(seed)
+    lines: List[str] = []
+    while len(lines) < count:
+        stream = rng.randrange(streams)
+        header = (
+            f'<27>1 2020-03-22T12:35:47.385660+02:00 host.localdomain app {stream % 7 + 1} '
+            f'DOCKER:{stream:012x}~app_{stream}~sha256:20da7ed64a1e~app:latest~docker -'
+        )
+        lines.append(f'{header} {HEAD}')
+        lines.extend(f'{header} {line}' for line in TRACE[:depth])
+    return lines[:count]
+
+
+def measure(handle: Callable[[str], None], lines: List[str]) -> float:
+    best = float('inf')
+    for _ in range(5):
+        started = time.perf_counter()
+        for line in lines:
+            handle(line)
+        best = min(best, time.perf_counter() - started)
+    return best / len(lines) * 1e9
+
+
+def main(count: int = 20000) -> None:
+    def consume(event: Event) -> None:
+        event.inner
+
+    cases = (
+        ('mixed corpus', corpus.mixed(count)),
+        ('1000 streams, traces of 5', traces(1000, 5, count)),
+        ('10000 streams, traces of 20', traces(10000, 20, count)),
+        ('10000 streams, no traces', traces(10000, 0, count)),
+    )
+    for name, lines in cases:
+        plain = measure(Pipeline.from_registry(consume), lines)
+        assembler = Assembler(consume)
+        assembled = measure(Pipeline.from_registry(assembler), lines)
+        print(
+            f'{name:>28}: {plain:6.0f} -> {assembled:6.0f} ns/line, '
+            f'{len(assembler)} streams held, {assembler.size / 1024:.0f} KiB'
+        )
+
+    # Expiring many idle streams, all found by one pass over the timer wheel
+    lines = traces(10000, 0, 10000)
+    assembler = Assembler(consume, clock=lambda: 0.0)
+    pipeline = Pipeline.from_registry(assembler)
+    for line in lines:
+        pipeline(line)
+    started = time.perf_counter()
+    expired = assembler.expire(1.0)
+    print(f'{"expire":>28}: {expired} streams in {(time.perf_counter() - started) * 1e3:.1f} ms')
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
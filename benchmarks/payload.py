@@ -0,0 +1,82 @@
+import sys
+import time
+from typing import Any, Callable, Dict, List, Sequence
+
+import src.common_log_format  # noqa: F401
+import src.mariadb_mysql  # noqa: F401
+import src.nginx  # noqa: F401
+import src.syslog  # noqa: F401
+from src import get_context
+from src.pipeline import Event, Pipeline
+from src.record import Record
+from src.sentry import LEVELS, payload
+from src.timestamp import Normalizer
+
+from . import corpus
+
+CONTEXT = get_context()
+
+
+# Every group looked up by name in the field -> contexts map, as `add_context` was meant to be
+# used before routing tables
+def by_name(record: Record, contexts: Dict[str, Dict[str, str]]) -> None:
+    for key, value in record.asdict().items():
+        if value is None:
+            continue
+        for name in CONTEXT.get(key, ()):
+            contexts.setdefault(name, {})[key] = value
+
+
+def by_lookup(event: Event, normalizer: Normalizer) -> Dict[str, Any]:
+    header, inner = event.envelope, event.inner
+    contexts: Dict[str, Dict[str, str]] = {}
+    by_name(header, contexts)
+    result = {
+        'timestamp': normalizer.epoch(header) or time.time(),
+        'level': LEVELS[event.severity],
+        'logger': header.appname,  # type: ignore
+        'server_name': header.hostname,  # type: ignore
+        'platform': 'other',
+        'message': {'formatted': getattr(inner, 'message', None) or event.message},
+        'tags': dict(contexts.get('docker', {})),
+        'contexts': contexts,
+    }
+    if inner is not None:
+        by_name(inner, contexts)
+        result['tags']['format'] = inner.FORMAT  # type: ignore
+        result['extra'] = {key: value for key, value in inner.asdict().items() if value is not None}
+    return result
+
+
+def measure(handle: Callable[[Any], object], items: Sequence[Any]) -> float:
+    best = float('inf')
+    for _ in range(5):
+        started = time.perf_counter()
+        for item in items:
+            handle(item)
+        best = min(best, time.perf_counter() - started)
+    return best / len(items) * 1e9
+
+
+def main(count: int = 20000) -> None:
+    lines = corpus.mixed(count)
+    events: List[Event] = []
+    pipeline = Pipeline.from_registry(events.append)
+    for line in lines:
+        pipeline(line)
+    for event in events:
+        event.inner
+    normalizer = Normalizer()
+    for event in events[:100]:
+        assert by_lookup(event, normalizer)['contexts'] == payload(event, normalizer)['contexts']
+
+    for name, build in (('by field name', by_lookup), ('routing tables', payload)):
+        ns = measure(lambda event: build(event, normalizer), events)
+        end_to_end = measure(
+            Pipeline.from_registry(lambda event: build(event, normalizer)), lines,  # type: ignore
+        )
+        print(f'{name:>15}: {ns:7.0f} ns/event, match to event dict {end_to_end:7.0f} ns/line')
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,55 @@
+import sys
+import time
+from typing import Callable, Iterable
+
+import src.common_log_format  # noqa: F401
+import src.mariadb_mysql  # noqa: F401
+import src.nginx  # noqa: F401
+import src.syslog  # noqa: F401
+from src.classifier import Classifier
+from src.pipeline import Event, Pipeline
+from src.syslog.regex import RFC5424
+
+from . import samples
+
+# Docker-tagged envelopes around every inner format, mostly at info/debug severity
+LINES = tuple(
+    f'<{priority}>1 2020-03-22T12:35:47.385660+02:00 host.localdomain app 927 '
+    f'DOCKER:d8e210ec875a~app_{index}~sha256:20da7ed64a1e~app:latest~docker - {message}'
+    for index, message in enumerate(samples.MYSQL + samples.NGINX_ERROR + samples.HTTPD)
+    for priority in (27, 30, 30, 30, 31, 31, 31, 31)
+)
+
+
+def measure(handle: Callable[[str], None], lines: Iterable[str], repeat: int) -> float:
+    lines = tuple(lines)
+    best = float('inf')
+    for _ in range(5):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            for line in lines:
+                handle(line)
+        best = min(best, time.perf_counter() - started)
+    return best / (repeat * len(lines)) * 1e9
+
+
+def main(repeat: int = 200) -> None:
+    classifier = Classifier.from_registry()
+
+    def monolithic(line: str) -> None:
+        groups = RFC5424.match(line).groupdict()
+        classifier.classify(groups['message'])
+
+    def consume(event: Event) -> None:
+        event.inner
+
+    for name, handle in (
+        ('both stages, every line', monolithic),
+        ('two-stage, severity <= 7', Pipeline.from_registry(consume, 7)),
+        ('two-stage, severity <= 4', Pipeline.from_registry(consume, 4)),
+    ):
+        print(f'{name:>26}: {measure(handle, LINES, repeat):8.0f} ns/line')
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
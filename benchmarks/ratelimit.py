@@ -0,0 +1,52 @@
+import sys
+import time
+import tracemalloc
+from typing import Any, Dict, List
+
+from src.ratelimit import Limit, RateLimiter
+
+Payload = Dict[str, Any]
+
+
+def payloads(count: int, keys: int) -> List[Payload]:
+    return [
+        {
+            'timestamp': 1000.0,
+            'level': 'error',
+            'message': {'formatted': f'Aborted connection {index} to db'},
+            'tags': {
+                'container_id': f'{index % keys:064x}',
+                'container_name': f'app_{index % keys}',
+                'image_name': 'mariadb:10.4',
+                'format': 'MYSQL',
+            },
+        }
+        for index in range(count)
+    ]
+
+
+def main(count: int = 200000, keys: int = 10000) -> None:
+    items = payloads(count, keys)
+    limits = [Limit.parse('image:nginx=100/60'), Limit.parse('*=1000/60')]
+    for name, fingerprint_limits in (('per container', []), ('+ fingerprint', limits)):
+        # A clock that stands still keeps every bucket active
+        limiter = RateLimiter(lambda event: None, limits, fingerprint_limits, clock=lambda: 0.0)
+        started = time.perf_counter()
+        for item in items:
+            limiter(item)
+        elapsed = time.perf_counter() - started
+
+        limiter = RateLimiter(lambda event: None, limits, fingerprint_limits, clock=lambda: 0.0)
+        tracemalloc.start()
+        for item in items[:keys]:
+            limiter(item)
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        print(
+            f'{name:>14}: {elapsed / count * 1e9:5.0f} ns/event, {len(limiter)} buckets, '
+            f'{size / len(limiter):4.0f} B/bucket'
+        )
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
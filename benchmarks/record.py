@@ -0,0 +1,68 @@
+import gc
+import itertools
+import sys
+import time
+import tracemalloc
+from typing import Callable, List, Sequence
+
+from src.record import record_type
+from src.syslog.regex import RFC5424
+
+from . import samples
+
+FORWARDED = ('severity', 'container_id', 'message')
+
+
+def corpus(count: int) -> List[str]:
+    lines = itertools.cycle(samples.RFC5424)
+    return [f'{line} #{index}' for index, line in zip(range(count), lines)]
+
+
+def by_groupdict(line: str) -> object:
+    groups = RFC5424.match(line).groupdict()
+    for key in FORWARDED:
+        groups[key]
+    return groups
+
+
+_RECORD = record_type('RFC5424', RFC5424)
+
+
+def by_record(line: str) -> object:
+    record = _RECORD(RFC5424.match(line))
+    for key in FORWARDED:
+        getattr(record, key)
+    return record
+
+
+def throughput(parse: Callable[[str], object], lines: Sequence[str]) -> float:
+    started = time.perf_counter()
+    for line in lines:
+        parse(line)
+    return (time.perf_counter() - started) / len(lines) * 1e9
+
+
+def retained(parse: Callable[[str], object], lines: Sequence[str]) -> tuple:
+    gc.collect()
+    blocks = sys.getallocatedblocks()
+    tracemalloc.start()
+    result = [parse(line) for line in lines]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    blocks = sys.getallocatedblocks() - blocks
+    del result
+    return size / len(lines), blocks / len(lines)
+
+
+def main(count: int = 1000000, window: int = 10000) -> None:
+    lines = corpus(count)
+    for name, parse in (('groupdict()', by_groupdict), ('Record', by_record)):
+        size, blocks = retained(parse, lines[:window])
+        print(
+            f'{name:>12}: {throughput(parse, lines):6.0f} ns/line over {count} lines, '
+            f'{size:6.0f} B and {blocks:4.1f} blocks retained per record'
+        )
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,46 @@
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+from src.replay import Settings, _chunks, parse_chunk
+
+from . import corpus
+
+
+# A json-file log of the corpus' inner lines, as Docker writes it
+def write_log(directory: str, count: int) -> str:
+    path = os.path.join(directory, f'{corpus.CONTAINERS[0][0]}-json.log')
+    with open(path, 'w') as file:
+        for line in corpus.mixed(count):
+            message = line.partition(' - ')[2]
+            file.write(json.dumps({
+                'log': f'{message}\n',
+                'stream': 'stderr' if line.startswith('<27>') else 'stdout',
+                'time': '2020-03-22T12:35:47.385660123Z',
+            }) + '\n')
+    return path
+
+
+def main(count: int = 200000, processes: int = os.cpu_count() or 1) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        path = write_log(directory, count)
+        size = os.path.getsize(path) / 1024 / 1024
+        settings = Settings('host')
+        for workers in sorted({1, processes}):
+            chunks = list(_chunks([path], {}, 1024 * 1024))
+            started = time.perf_counter()
+            with ProcessPoolExecutor(workers) as pool:
+                lines = sum(result[1] for result in pool.map(parse_chunk, chunks, repeat(settings)))
+            elapsed = time.perf_counter() - started
+            print(
+                f'{workers:>2} processes: {lines / elapsed:8.0f} lines/s, '
+                f'{size / elapsed:6.1f} MB/s'
+            )
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,22 @@
+RFC5424 = (
+    '<30>1 2020-03-22T12:35:47.385660+02:00 host.localdomain 6e8ef9a56b54 927 6e8ef9a56b54 - 2020-03-22T12:35:47.538083Z 0 [Note] [MY-012487] [InnoDB] InnoDB: DDL log recovery : begin',
+    '<165>1 2003-10-11T22:14:15.003Z mymachine.example.com evntslog - ID47 [exampleSDID@32473 iut="3" eventSource="Application" eventID="1011"] BOM An application event log entry...',
+)
+HTTPD = (
+    '127.0.0.1 - frank [10/Oct/2000:13:55:36 -0700] "GET /apache_pb.gif HTTP/1.0" 200 2326',
+    '127.0.0.1 - frank [10/Oct/2000:13:55:36 +0130] "GET /apache_pb.gif HTTP/1.0" 200 2326 "http://www.example.com/start.html" "Mozilla/4.08 [en] (Win98; I ;Nav)"',
+)
+MYSQL = (
+    '2020-03-22T12:35:47.538083Z 4 [Warning] [10051] [Server] Event Scheduler: scheduler thread started with id 4',
+    '2020-03-22 12:35:47 140310100753288 [Note] InnoDB:  Percona XtraDB (http://www.percona.com) 5.6.38-83.0 started',
+)
+NGINX_ERROR = (
+    '2020/03/21 23:30:24 [crit] 30016#0: *4 stat() "/var/www/html/index.php" failed (13: Permission denied), client: 127.0.0.1, server: example.com, request: "GET /index.php HTTP/1.1", host: "example.com"',
+)
+NOISE = (
+    'Traceback (most recent call last):',
+    '    at com.example.Service.run(Service.java:42)',
+    '2020-03-22 12:35:47,123 INFO [main] Application started',
+)
+
+ALL = RFC5424 + HTTPD + MYSQL + NGINX_ERROR + NOISE
@@ -0,0 +1,43 @@
+import asyncio
+import sys
+import time
+
+from src.sentry import Sender
+from src.sentry.stub import StubServer
+
+
+async def run(count: int, batch_size: int, compress: bool, connections: int = 4) -> None:
+    stub = StubServer(keep=0)
+    await stub.start()
+    sender = Sender(stub.dsn(), batch_size, 0.05, connections, compress)
+    sender.start()
+
+    started = time.perf_counter()
+    for index in range(count):
+        sender.send({
+            'level': 'error',
+            'message': {'formatted': f'InnoDB: Unable to lock ./ibdata{index}, error: 11'},
+            'tags': {'container_name': 'mariadb_1', 'image_name': 'million12/mariadb'},
+        })
+        if index % batch_size == 0:
+            # Let the event loop run the sender, as the listener would between wakeups
+            await asyncio.sleep(0)
+    await sender.close()
+    elapsed = time.perf_counter() - started
+    await stub.close()
+
+    print(
+        f'pipeline {batch_size:>3} gzip {compress!s:>5}: {sender.sent / elapsed:8.0f} events/s, '
+        f'{stub.bytes / max(stub.requests, 1) / 1024:6.1f} KiB/request, '
+        f'p50 {sender.latency(0.5) * 1000:6.1f} ms, p99 {sender.latency(0.99) * 1000:6.1f} ms'
+    )
+
+
+def main(count: int = 20000) -> None:
+    for batch_size in (1, 5, 20, 100):
+        for compress in (False, True):
+            asyncio.run(run(count, batch_size, compress))
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
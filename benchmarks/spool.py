@@ -0,0 +1,64 @@
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+from src.spool import FSYNC_POLICIES, Spool
+
+Payload = Dict[str, Any]
+
+
+def payloads(count: int) -> List[Payload]:
+    return [
+        {
+            'timestamp': 1584880547.38566,
+            'level': 'error',
+            'logger': 'app_1',
+            'server_name': 'host',
+            'platform': 'other',
+            'message': {'formatted': f'Aborted connection {index} to db: \'app\' user: \'app\''},
+            'tags': {'container_name': 'app_1', 'image_name': 'mariadb:10.4', 'format': 'MYSQL'},
+        }
+        for index in range(count)
+    ]
+
+
+def main(count: int = 100000, batch: int = 100) -> None:
+    items = payloads(count)
+    for policy in FSYNC_POLICIES:
+        # fsync after every append is orders of magnitude slower, fewer events are enough
+        total = count // 20 if policy == 'always' else count
+        with tempfile.TemporaryDirectory() as directory:
+            spool = Spool(directory, segment_bytes=16 * 1024 * 1024, fsync=policy)
+            started = time.perf_counter()
+            for start in range(0, total, batch):
+                spool.append(items[start:start + batch])
+            spool.sync()
+            elapsed = time.perf_counter() - started
+            size = spool.bytes
+            print(
+                f'append {policy:>8}: {total / elapsed:9.0f} events/s, '
+                f'{size / elapsed / 1e6:6.1f} MB/s, {spool.syncs} fsyncs'
+            )
+            if policy != 'never':
+                continue
+            spool.close()
+
+            spool = Spool(directory, segment_bytes=16 * 1024 * 1024)
+            started = time.perf_counter()
+            read = 0
+            while True:
+                events = spool.read_events(batch * 10)
+                if not events:
+                    break
+                read += len(events)
+                spool.commit()
+            elapsed = time.perf_counter() - started
+            print(
+                f'replay (mmap)  : {read / elapsed:9.0f} events/s, '
+                f'{size / elapsed / 1e6:6.1f} MB/s'
+            )
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
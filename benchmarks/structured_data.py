@@ -0,0 +1,50 @@
+import re
+import sys
+import time
+from typing import Callable, Tuple
+
+from src.syslog.structured_data import StructuredData, parse_structured_data
+
+_ELEMENT = re.compile(r'\[([^\s="\]]+)((?: [^\s="\]]+="(?:[^"\\]|\\.)*")*)\]')
+_PARAM = re.compile(r' ([^\s="\]]+)="((?:[^"\\]|\\.)*)"')
+_UNESCAPE = re.compile(r'\\(["\\\]])')
+
+INPUTS: Tuple[Tuple[str, str], ...] = (
+    ('RFC5424_3', '[exampleSDID@32473 iut="3" eventSource="Application" eventID="1011"][examplePriority@32473 class="high"]'),
+    ('one param', '[origin ip="192.0.2.1"]'),
+    ('escapes', '[meta path="C:\\\\Program Files\\\\app" note="say \\"hi\\" [x\\]"]' * 3),
+    ('5 elements', ''.join(f'[sd{index}@32473 a="{index}" b="value {index}" c="x"]' for index in range(5))),
+    ('20 params', '[app@32473 ' + ' '.join(f'k{index}="v{index}"' for index in range(20)) + ']'),
+)
+
+
+def by_regex(text: str) -> StructuredData:
+    result: StructuredData = {}
+    for element in _ELEMENT.finditer(text):
+        params = result.setdefault(element.group(1), {})
+        for param in _PARAM.finditer(element.group(2)):
+            params[param.group(1)] = _UNESCAPE.sub(r'\1', param.group(2))
+    return result
+
+
+def measure(parse: Callable[[str], StructuredData], text: str, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(5):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            parse(text)
+        best = min(best, time.perf_counter() - started)
+    return best / repeat * 1e9
+
+
+def main(repeat: int = 20000) -> None:
+    for name, text in INPUTS:
+        assert by_regex(text) == parse_structured_data(text), name
+        print(
+            f'{name:>12}: regex {measure(by_regex, text, repeat):8.0f} ns, '
+            f'tokenizer {measure(parse_structured_data, text, repeat):8.0f} ns'
+        )
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
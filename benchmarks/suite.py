@@ -0,0 +1,139 @@
+import argparse
+import json
+import platform
+import sys
+import time
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+import src.common_log_format  # noqa: F401
+import src.mariadb_mysql  # noqa: F401
+import src.nginx  # noqa: F401
+import src.syslog  # noqa: F401
+from src import get_regex
+from src.classifier import Classifier
+from src.pipeline import Event, Pipeline
+from src.sentry import payload
+from src.timestamp import Normalizer
+
+from . import corpus
+from .record import retained
+
+Case = Tuple[str, Callable[[str], object], List[str]]
+
+
+def cases(count: int, seed: int) -> List[Case]:
+    regex = get_regex()
+    lines = {name: corpus.generate(name, count, seed) for name in corpus.GENERATORS}
+    result: List[Case] = []
+    for name, pattern in regex:
+        matching = lines[name]
+        if name == 'RFC5424':
+            matching = matching + corpus.mixed(count, seed)
+        others = [line for key, value in lines.items() if key != name for line in value]
+        missing = [line for line in others if pattern.match(line) is None][:count]
+        result.append((f'{name} match', pattern.match, matching))
+        result.append((f'{name} miss', pattern.match, missing))
+
+    classifier = Classifier.from_registry()
+    result.append(('classifier match', classifier.match, [
+        line for name in corpus.INNER if name != 'NOISE' for line in lines[name]
+    ]))
+    result.append(('classifier miss', classifier.match, lines['NOISE']))
+
+    mixed = corpus.mixed(count, seed)
+    # Consumers keep what they produce, so that its allocations are seen by `retained`
+    events: List[Event] = []
+
+    def inner(event: Event) -> None:
+        event.inner
+        events.append(event)
+
+    normalizer = Normalizer()
+    result.append(('pipeline', Pipeline.from_registry(inner), mixed))
+    result.append(('pipeline+payload', Pipeline.from_registry(
+        lambda event: events.append(payload(event, normalizer)),  # type: ignore
+    ), mixed))
+    result.append(('pipeline severity<=4', Pipeline.from_registry(inner, 4), mixed))
+    return result
+
+
+def measure(handle: Callable[[str], object], lines: Sequence[str], repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for line in lines:
+            handle(line)
+        best = min(best, time.perf_counter() - started)
+    return best / len(lines) * 1e9
+
+
+def run(count: int, seed: int, repeat: int) -> Dict[str, Any]:
+    results: Dict[str, Dict[str, float]] = {}
+    for name, handle, lines in cases(count, seed):
+        ns = measure(handle, lines, repeat)
+        size, blocks = retained(handle, lines)
+        results[name] = {
+            'lines': len(lines),
+            'ns_per_line': round(ns, 1),
+            'lines_per_second': round(1e9 / ns),
+            'bytes_per_line': round(size, 1),
+            'blocks_per_line': round(blocks, 2),
+        }
+        print(
+            f'{name:>22}: {ns:8.0f} ns/line {1e9 / ns:10.0f} lines/s '
+            f'{size:7.0f} B {blocks:5.1f} blocks/line'
+        )
+    return {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'count': count,
+        'seed': seed,
+        'results': results,
+    }
+
+
+# Cases slower than the baseline by more than `tolerance` are regressions
+def compare(result: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    regressions = []
+    if (result['count'], result['seed']) != (baseline['count'], baseline['seed']):
+        print(f'Baseline was measured with --count {baseline["count"]} --seed {baseline["seed"]}')
+    for name, item in result['results'].items():
+        before = baseline['results'].get(name)
+        if before is None:
+            continue
+        change = item['ns_per_line'] / before['ns_per_line'] - 1
+        print(
+            f'{name:>22}: {before["ns_per_line"]:8.0f} -> {item["ns_per_line"]:8.0f} ns/line '
+            f'{change:+7.1%}'
+        )
+        if change > tolerance:
+            regressions.append(name)
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.suite')
+    parser.add_argument('--count', type=int, default=2000, help='lines per format')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=5, help='best of this many runs')
+    parser.add_argument('--save', help='write the results as a JSON baseline')
+    parser.add_argument('--compare', help='JSON baseline to compare the results with')
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    args = parser.parse_args()
+
+    result = run(args.count, args.seed, args.repeat)
+    if args.save:
+        with open(args.save, 'w') as file:
+            json.dump(result, file, indent=2)
+            file.write('\n')
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        regressions = compare(result, baseline, args.tolerance)
+        if regressions:
+            print(f'Slower by more than {args.tolerance:.0%}: {", ".join(regressions)}')
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+import datetime as dt
+import sys
+import time
+
+from src.mariadb_mysql.regex import MYSQL
+from src.record import record_type
+from src.timestamp import MONTHS, Normalizer, _offset
+
+_RECORD = record_type('MYSQL', MYSQL)
+
+
+def corpus(count: int, burst: int) -> list:
+    return [
+        _RECORD(MYSQL.match(
+            f'2020-03-22T12:{index // burst // 60 % 60:02d}:{index // burst % 60:02d}.{index % 1000000:06d}+02:00 '
+            f'0 [Note] InnoDB: line {index}'
+        ))
+        for index in range(count)
+    ]
+
+
+def per_line(record) -> dt.datetime:
+    return dt.datetime(
+        int(record.year), MONTHS[record.month], int(record.day),
+        int(record.hour), int(record.minute), int(record.second),
+        int((record.microsecond or '0').ljust(6, '0')),
+        dt.timezone(dt.timedelta(seconds=_offset(record.timezone))),
+    ).astimezone(dt.timezone.utc)
+
+
+def main(count: int = 200000) -> None:
+    for burst in (1, 10, 1000):
+        records = corpus(count, burst)
+        normalizer = Normalizer()
+        for name, normalize in (
+            ('per line', per_line),
+            ('Normalizer.datetime', normalizer.datetime),
+            ('Normalizer.epoch', normalizer.epoch),
+        ):
+            started = time.perf_counter()
+            for record in records:
+                normalize(record)
+            elapsed = (time.perf_counter() - started) / count * 1e9
+            print(f'{burst:>5} lines/s {name:>20}: {elapsed:6.0f} ns/line')
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,65 @@
+import asyncio
+import os
+import sys
+import time
+
+import src.common_log_format  # noqa: F401
+import src.mariadb_mysql  # noqa: F401
+import src.nginx  # noqa: F401
+import src.syslog  # noqa: F401
+from src.buffer import BoundedQueue
+from src.pipeline import Event, Pipeline
+from src.workers import Workers
+
+from . import samples
+
+# The same inner lines logged by 64 containers
+LINES = tuple(
+    f'<{priority}>1 2020-03-22T12:35:47.385660+02:00 host.localdomain app 927 '
+    f'DOCKER:{container:012x}~app_{container}~sha256:20da7ed64a1e~app:latest~docker - {message}'
+    for container in range(64)
+    for message in samples.MYSQL + samples.NGINX_ERROR + samples.HTTPD
+    for priority in (27, 30)
+)
+
+
+async def run(workers: int, count: int) -> float:
+    received = 0
+
+    def consume(event: Event) -> None:
+        nonlocal received
+        received += 1
+        event.inner
+
+    queue = BoundedQueue(count)
+    if workers:
+        handler = Workers(consume, workers)
+        handler.start()
+        wait = handler.wait
+    else:
+        handler, wait = Pipeline.from_registry(consume), None
+    # Let the worker processes start before the clock does
+    await asyncio.sleep(0.5)
+
+    started = time.perf_counter()
+    task = asyncio.ensure_future(queue.consume(handler, wait=wait))
+    for index in range(count):
+        queue.put(LINES[index % len(LINES)])
+    while received < count:
+        await asyncio.sleep(0.001)
+    elapsed = time.perf_counter() - started
+    task.cancel()
+    if isinstance(handler, Workers):
+        await handler.close()
+    return count / elapsed
+
+
+def main(count: int = 200000, cores: int = 0) -> None:
+    cores = cores or os.cpu_count() or 1
+    print(f'{"in-process":>12}: {asyncio.run(run(0, count)):8.0f} lines/s')
+    for workers in range(1, cores + 1):
+        print(f'{workers:>4} workers: {asyncio.run(run(workers, count)):8.0f} lines/s')
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -2,21 +2,78 @@ import re
 from collections import deque, defaultdict
 from typing import Deque, Dict, List, Tuple, Union
 
+# A context, the indexes of the groups routed to it and the keys they are given there
+Route = Tuple[str, Tuple[int, ...], Tuple[str, ...]]
+
 __all__ = (
     'add_context',
     'add_regex',
+    'as_bytes',
+    'get_context',
+    'get_regex',
+    'get_routes',
 )
 
 __CONTEXT: Dict[str, Deque[str]] = defaultdict(deque)
 __REGEX: Deque[re.Pattern] = deque()
+__REGEX_NAME: Dict[re.Pattern, str] = {}
+__BYTES: Dict[re.Pattern, re.Pattern] = {}
+__ROUTES: Dict[re.Pattern, Tuple[Route, ...]] = {}
 
 
+# Groups of every pattern named like one of `keys` are routed to the `name` context, see
+# `get_routes`. Routes are looked up when record types are created, so contexts are added on
+# import, next to the patterns.
 def add_context(name: str, keys: Union[List[str], Tuple[str, ...]]) -> None:
     for item in keys:
-        if item not in __CONTEXT[item]:
+        if name not in __CONTEXT[item]:
             __CONTEXT[item].append(name)
+    __ROUTES.clear()
 
 
-def add_regex(item: re.Pattern):
+def add_regex(name: str, item: re.Pattern) -> None:
     if item not in __REGEX:
         __REGEX.append(item)
+        __REGEX_NAME[item] = name
+
+
+def get_regex() -> Tuple[Tuple[str, re.Pattern], ...]:
+    return tuple((__REGEX_NAME[item], item) for item in __REGEX)
+
+
+# Patterns are formatted from `Atom.asdict()` fragments, all of them ASCII, so the encoded source
+# is the same pattern over bytes. There `\s`, `\d` and `\w` are ASCII only and every byte of a
+# multi-byte UTF-8 character is matched on its own, e.g. by `\S` or `.`.
+def as_bytes(item: re.Pattern) -> re.Pattern:
+    try:
+        return __BYTES[item]
+    except KeyError:
+        pass
+    if not item.pattern.isascii():
+        raise ValueError(f'Cannot match non-ASCII pattern against bytes: {item.pattern!r}')
+    result = re.compile(item.pattern.encode('ascii'), item.flags & ~re.UNICODE)
+    __BYTES[item] = result
+    return result
+
+
+def get_context() -> Dict[str, Tuple[str, ...]]:
+    return {key: tuple(value) for key, value in __CONTEXT.items() if value}
+
+
+# The routing table of a pattern, from `pattern.groupindex`: for every context, the indexes of
+# its groups in the pattern, so that all its values are read with one `group(*indexes)` call
+def get_routes(item: re.Pattern) -> Tuple[Route, ...]:
+    try:
+        return __ROUTES[item]
+    except KeyError:
+        pass
+    fields: Dict[str, List[Tuple[int, str]]] = {}
+    for key, index in sorted(item.groupindex.items(), key=lambda pair: pair[1]):
+        for name in __CONTEXT.get(key, ()):
+            fields.setdefault(name, []).append((index, key))
+    result = tuple(
+        (name, tuple(index for index, _ in pairs), tuple(key for _, key in pairs))
+        for name, pairs in fields.items()
+    )
+    __ROUTES[item] = result
+    return result
@@ -0,0 +1,454 @@
+import argparse
+import asyncio
+import json
+import signal
+import sys
+from typing import Any, Callable, Union
+
+import src.common_log_format  # noqa: F401
+import src.mariadb_mysql  # noqa: F401
+import src.nginx  # noqa: F401
+import src.syslog  # noqa: F401
+from src.aggregate import AGGREGATE_WINDOW, Aggregator
+from src.buffer import DROP_LOWEST_SEVERITY, POLICIES, BoundedQueue
+from src.cache import LRUCache
+from src.docker import Client, Enricher
+from src.gelf import TIMEOUT, Gelf
+from src.listener import Listener
+from src.metrics import Exporter, Metrics, SlowLine
+from src.multiline import Assembler
+from src.pipeline import MAX_PARSE_LENGTH, BytesPipeline, Event, Pipeline
+from src.ratelimit import Limit, RateLimiter
+from src.sentry import Payload, Sender, payload, raw_payload
+from src.spool import FSYNC_INTERVAL, FSYNC_POLICIES, Spool
+from src.syslog.filter import PriFilter, Rule
+from src.syslog.pri import severity
+from src.timestamp import Normalizer
+from src.workers import Workers
+
+
+# Counters and depths the components keep anyway, read on every scrape or snapshot
+def collect(metrics: Metrics, queue: BoundedQueue, pipeline: Any, **stages: Any) -> None:
+    metrics.gauge('queue_depth', 'Lines waiting to be parsed', None, queue.__len__)
+    metrics.counter(
+        'queue_dropped_total', 'Lines dropped by the queue, by drop policy', 'policy',
+        lambda: queue.dropped,
+    )
+    metrics.counter(
+        'parse_errors_total', 'Lines the parser failed on', None, lambda: queue.errors,
+    )
+    if isinstance(pipeline, Workers):
+        metrics.counter('lines_total', 'Lines given to the workers', None, lambda: pipeline.lines)
+        metrics.counter(
+            'workers_dropped_total', 'Lines dropped by full workers', None,
+            lambda: pipeline.dropped,
+        )
+        metrics.counter(
+            'workers_restarts_total', 'Workers replaced after they died', None,
+            lambda: pipeline.restarts,
+        )
+    else:
+        metrics.counter(
+            'pattern_matches_total', 'Lines matched, by pattern', 'pattern',
+            lambda: pipeline.hits,
+        )
+        metrics.counter(
+            'pattern_misses_total', 'Lines no pattern matched, by stage', 'stage',
+            lambda: {'envelope': pipeline.unparsed, 'inner': pipeline.classifier.misses},
+        )
+        metrics.counter(
+            'rejected_total', 'Lines too long or malformed to be parsed', None,
+            lambda: pipeline.rejected,
+        )
+    filter_ = stages.get('filter')
+    if filter_ is not None:
+        metrics.counter(
+            'filtered_total', 'Lines discarded by their <PRI>, by field', 'field',
+            lambda: filter_.discarded,
+        )
+    assembler = stages.get('assembler')
+    if assembler is not None:
+        metrics.gauge(
+            'multiline_pending', 'Events waiting for continuation lines', None, assembler.__len__,
+        )
+    limiter = stages.get('limiter')
+    if limiter is not None:
+        metrics.counter(
+            'rate_limited_total', 'Events dropped by a rate limit', None,
+            lambda: limiter.suppressed,
+        )
+    sender = stages.get('sender')
+    if sender is not None:
+        metrics.gauge(
+            'sentry_pending', 'Events waiting to be sent', None, lambda: sender.pending,
+        )
+        metrics.counter(
+            'sentry_events_total', 'Events by outcome', 'outcome',
+            lambda: {
+                'sent': sender.sent,
+                'failed': sender.failed,
+                'spilled': sender.spilled,
+                'dropped': sum(sender.queue.dropped.values()),
+            },
+        )
+    gelf = stages.get('gelf')
+    if gelf is not None:
+        metrics.gauge('gelf_pending', 'GELF messages waiting for chunks', None, gelf.__len__)
+        metrics.counter(
+            'gelf_messages_total', 'GELF messages by outcome', 'outcome',
+            lambda: {
+                'decoded': gelf.messages,
+                'invalid': gelf.invalid,
+                'expired': gelf.expired,
+                'evicted': gelf.evicted,
+            },
+        )
+    spool = stages.get('spool')
+    if spool is not None:
+        metrics.gauge('spool_bytes', 'Bytes of the spool on disk', None, lambda: spool.bytes)
+        metrics.gauge(
+            'spool_backlog_bytes', 'Bytes of the spool not sent yet', None,
+            lambda: spool.backlog,
+        )
+
+
+def report(line: SlowLine) -> None:
+    print(
+        f'Slow line: {line.seconds * 1000:.3f} ms in {line.stage}, pattern {line.pattern}: '
+        f'{line.line[:200]!r}',
+        file=sys.stderr,
+    )
+
+
+def report_error(line: Any, error: Exception) -> None:
+    if not isinstance(line, str):
+        line = bytes(line).decode('utf-8', 'replace')
+    print(f'Failed to parse line: {error!r}: {line[:200]!r}', file=sys.stderr)
+
+
+def positive(value: str) -> int:
+    result = int(value)
+    if result < 1:
+        raise ValueError(value)
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog='python -m src')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--udp-port', type=int, default=514)
+    parser.add_argument('--tcp-port', type=int, default=514)
+    parser.add_argument(
+        '--severity', type=int, default=7, choices=range(8),
+        help='parse inner formats only for events at least this severe',
+    )
+    parser.add_argument(
+        '--keep-severity', type=int, default=7, choices=range(8),
+        help='drop less severe lines by their <PRI> before they are parsed',
+    )
+    parser.add_argument(
+        '--drop-facility', type=int, action='append', default=[], choices=range(24),
+        metavar='0..23',
+        help='drop lines of this facility before they are parsed, can be repeated',
+    )
+    parser.add_argument(
+        '--keep-rule', type=Rule.parse, action='append', default=[],
+        metavar='{container,image}:NAME=SEVERITY',
+        help='--keep-severity for one container or image, the first matching rule applies',
+    )
+    parser.add_argument('--dsn', help='Sentry DSN, print events to stdout when omitted')
+    parser.add_argument(
+        '--batch-size', type=int, default=20,
+        help='envelopes of one event each pipelined per Sentry connection',
+    )
+    parser.add_argument('--flush-interval', type=float, default=1.0)
+    parser.add_argument('--connections', type=int, default=4)
+    parser.add_argument('--gzip', action='store_true')
+    parser.add_argument(
+        '--aggregate-window', type=float,
+        help='seconds over which the repeats of an event, itself sent at once, are folded into '
+        'one summary sent when the window ends; 0 disables, 10 by default with --dsn',
+    )
+    parser.add_argument('--aggregate-size', type=int, default=10000)
+    parser.add_argument(
+        '--rate-limit', type=Limit.parse, action='append', default=[],
+        metavar='{container,image,format,severity}:NAME=COUNT/SECONDS',
+        help='at most COUNT events per container over SECONDS, or "*=COUNT/SECONDS" for all, '
+        'the first matching limit applies',
+    )
+    parser.add_argument(
+        '--fingerprint-rate-limit', type=Limit.parse, action='append', default=[],
+        metavar='{container,image,format,severity}:NAME=COUNT/SECONDS',
+        help='--rate-limit per container and message template',
+    )
+    parser.add_argument(
+        '--rate-limit-window', type=float, default=60.0,
+        help='seconds over which events dropped by a rate limit are summarized in one event',
+    )
+    parser.add_argument(
+        '--gelf-port', type=int, metavar='PORT',
+        help='also receive GELF over UDP, as sent by Docker\'s gelf logging driver',
+    )
+    parser.add_argument(
+        '--gelf-pending', type=int, default=1000,
+        help='chunked GELF messages reassembled at once, the oldest are dropped beyond',
+    )
+    parser.add_argument(
+        '--gelf-timeout', type=float, default=TIMEOUT,
+        help='seconds the chunks of a GELF message are waited for',
+    )
+    parser.add_argument(
+        '--docker-socket', metavar='PATH',
+        help='tag events with the labels of their container, looked up in this Docker socket',
+    )
+    parser.add_argument('--docker-cache-size', type=int, default=10000)
+    parser.add_argument('--docker-ttl', type=float, default=300.0)
+    parser.add_argument(
+        '--docker-timeout', type=float, default=1.0,
+        help='seconds events wait for a lookup of their container',
+    )
+    parser.add_argument(
+        '--docker-tag-label', action='append', default=[], metavar='LABEL',
+        help='also tag events with this label of their container, can be repeated',
+    )
+    parser.add_argument(
+        '--queue-size', type=positive, default=10000,
+        help='received lines waiting to be parsed, TCP reads pause at 80%% of it',
+    )
+    parser.add_argument(
+        '--pending-size', type=positive, default=100000, help='events waiting to be sent',
+    )
+    parser.add_argument('--drop-policy', default=DROP_LOWEST_SEVERITY, choices=POLICIES)
+    parser.add_argument(
+        '--spool-dir', metavar='PATH',
+        help='spill events to disk rather than dropping them while Sentry is down or slow',
+    )
+    parser.add_argument('--spool-max-bytes', type=int, default=1024 * 1024 * 1024)
+    parser.add_argument(
+        '--spool-max-age', type=float, default=24 * 60 * 60,
+        help='seconds after which spilled events are dropped, oldest first',
+    )
+    parser.add_argument('--spool-segment-bytes', type=int, default=64 * 1024 * 1024)
+    parser.add_argument(
+        '--spool-fsync', default=FSYNC_INTERVAL, choices=FSYNC_POLICIES,
+        help='when spilled events are flushed to disk: after every write, every '
+        '--spool-fsync-interval seconds, or whenever the OS gets to it',
+    )
+    parser.add_argument('--spool-fsync-interval', type=float, default=1.0)
+    parser.add_argument(
+        '--max-parse-length', type=int, default=MAX_PARSE_LENGTH,
+        help='forward longer lines without parsing them',
+    )
+    parser.add_argument(
+        '--workers', type=int, default=0,
+        help='parse in this many processes sharded by container, 0 parses in-process',
+    )
+    parser.add_argument(
+        '--parse-bytes', action='store_true',
+        help='match lines as received, decoding only the fields sent on',
+    )
+    parser.add_argument(
+        '--invalid-utf8', default='replace', choices=('replace', 'backslashreplace', 'strict'),
+        help='with --parse-bytes, how invalid UTF-8 is decoded, "strict" sends such lines raw',
+    )
+    parser.add_argument(
+        '--multiline-idle', type=float, default=0.5,
+        help='seconds to wait for continuation lines of an event, 0 disables',
+    )
+    parser.add_argument('--multiline-lines', type=int, default=500)
+    parser.add_argument('--multiline-bytes', type=int, default=65536)
+    parser.add_argument(
+        '--multiline-memory', type=int, default=64 * 1024 * 1024,
+        help='bytes of all events waiting for continuation lines',
+    )
+    parser.add_argument(
+        '--metrics-port', type=int, metavar='PORT',
+        help='serve Prometheus metrics on this port, at /metrics',
+    )
+    parser.add_argument(
+        '--metrics-sample', type=int, default=16, metavar='N',
+        help='time one line in N per stage',
+    )
+    parser.add_argument(
+        '--slow-line', type=float, metavar='SECONDS',
+        help='report timed lines slower than this to stderr, with the slowest pattern',
+    )
+    args = parser.parse_args()
+    if args.parse_bytes and args.workers > 0:
+        parser.error('--parse-bytes cannot be combined with --workers')
+    # These work on the events sent to Sentry, which are not what is printed to stdout
+    if not args.dsn:
+        for flag, value in (
+            ('--rate-limit', args.rate_limit),
+            ('--fingerprint-rate-limit', args.fingerprint_rate_limit),
+            ('--aggregate-window', args.aggregate_window),
+            ('--docker-socket', args.docker_socket),
+            ('--spool-dir', args.spool_dir),
+        ):
+            if value:
+                parser.error(f'{flag} requires --dsn')
+    elif args.aggregate_window is None:
+        args.aggregate_window = AGGREGATE_WINDOW
+
+    write = sys.stdout.write
+
+    def consume(event: Event) -> None:
+        write(json.dumps(event.asdict()) + '\n')
+
+    def consume_raw(line: str) -> None:
+        write(json.dumps({'raw': line}) + '\n')
+
+    async def serve() -> None:
+        sender = aggregator = enricher = limiter = spool = exporter = None
+        metrics = None
+        if args.metrics_port is not None or args.slow_line is not None:
+            metrics = Metrics(args.metrics_sample, args.slow_line, report)
+        if args.dsn:
+            if args.spool_dir:
+                spool = Spool(
+                    args.spool_dir, args.spool_max_bytes, args.spool_max_age,
+                    args.spool_segment_bytes, args.spool_fsync, args.spool_fsync_interval,
+                )
+            sender = Sender(
+                args.dsn, args.batch_size, args.flush_interval, args.connections, args.gzip,
+                max_pending=args.pending_size, policy=args.drop_policy, spool=spool,
+                metrics=metrics,
+            )
+            sender.start()
+            send: Callable[[Payload], object] = sender.send
+            if args.rate_limit or args.fingerprint_rate_limit:
+                limiter = RateLimiter(
+                    send, args.rate_limit, args.fingerprint_rate_limit, args.rate_limit_window,
+                )
+                send = limiter
+            if args.aggregate_window > 0:
+                aggregator = Aggregator(send, args.aggregate_window, args.aggregate_size)
+                send = aggregator
+            if args.docker_socket:
+                enricher = Enricher(
+                    send, Client(args.docker_socket), args.docker_cache_size, args.docker_ttl,
+                    args.docker_timeout, tag_labels=args.docker_tag_label,
+                )
+                enricher.start()
+                send = enricher
+            normalizer = Normalizer()
+
+            def consumer(event: Event) -> None:
+                send(payload(event, normalizer))
+
+            def fallback(line: str) -> None:
+                send(raw_payload(line))
+        else:
+            consumer, fallback = consume, consume_raw
+        assembler = None
+        if args.multiline_idle > 0:
+            consumer = assembler = Assembler(
+                consumer, args.multiline_lines, args.multiline_bytes, args.multiline_idle,
+                args.multiline_memory,
+            )
+        workers = wait = None
+        pipeline: Union[Workers, Pipeline, BytesPipeline]
+        if args.workers > 0:
+            pipeline = workers = Workers(
+                consumer, args.workers, args.severity,
+                max_length=args.max_parse_length, fallback=fallback,
+            )
+            workers.start()
+            wait = workers.wait
+        elif args.parse_bytes:
+            pipeline = BytesPipeline.from_registry(
+                consumer, args.severity, LRUCache(), max_length=args.max_parse_length,
+                fallback=fallback, errors=args.invalid_utf8, metrics=metrics,
+            )
+        else:
+            pipeline = Pipeline.from_registry(
+                consumer, args.severity, LRUCache(), max_length=args.max_parse_length,
+                fallback=fallback, metrics=metrics,
+            )
+        # Lines are queued as received and parsed by one task, so that a full queue drops UDP
+        # lines before any regex runs and pauses TCP reads until the parser catches up.
+        queue = BoundedQueue(
+            args.queue_size, args.drop_policy, severity, high=args.queue_size * 4 // 5,
+        )
+        handler: Callable[[Union[str, bytes]], object] = queue.put
+        filter_ = None
+        if args.keep_severity < 7 or args.drop_facility or args.keep_rule:
+            handler = filter_ = PriFilter(
+                handler, args.keep_severity, args.drop_facility, args.keep_rule,
+            )
+        gelf = None
+        if args.gelf_port is not None:
+            gelf = Gelf(
+                handler, args.gelf_pending, timeout=args.gelf_timeout, binary=args.parse_bytes,
+            )
+        if metrics is not None:
+            collect(
+                metrics, queue, pipeline, filter=filter_, assembler=assembler, limiter=limiter,
+                sender=sender, spool=spool, gelf=gelf,
+            )
+        if metrics is not None and args.metrics_port is not None:
+            exporter = Exporter(metrics, args.host, args.metrics_port)
+            await exporter.start()
+        listener = Listener(
+            handler, args.host, args.udp_port, args.tcp_port, args.parse_bytes, args.gelf_port,
+            gelf,
+        )
+        queue.on_high = listener.pause_reading
+        queue.on_low = listener.resume_reading
+        await listener.start()
+        parser_task = asyncio.ensure_future(
+            queue.consume(pipeline, wait=wait, on_error=report_error),
+        )
+        # `docker stop` sends SIGTERM: stop like on Ctrl-C, flushing everything still in memory
+        serve_task = asyncio.current_task()
+        if serve_task is not None:
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, serve_task.cancel)
+        try:
+            while True:
+                await asyncio.sleep(0.1)
+                # Lines would only pile up behind a parser that is gone, with TCP reads paused
+                if parser_task.done():
+                    parser_task.result()
+                    raise RuntimeError('The parser stopped')
+                if workers is not None:
+                    workers.check()
+                if gelf is not None:
+                    gelf.expire()
+                if assembler is not None:
+                    assembler.expire()
+                if aggregator is not None:
+                    aggregator.expire()
+                if limiter is not None:
+                    limiter.expire()
+                if spool is not None:
+                    spool.expire()
+        except asyncio.CancelledError:
+            pass
+        finally:
+            if exporter is not None:
+                await exporter.close()
+            listener.close()
+            parser_task.cancel()
+            for line in queue.get_batch(len(queue)):
+                pipeline(line)
+            if workers is not None:
+                await workers.close()
+            if assembler is not None:
+                assembler.flush()
+            if enricher is not None:
+                await enricher.close()
+            if aggregator is not None:
+                aggregator.flush()
+            if limiter is not None:
+                limiter.flush()
+            if sender is not None:
+                await sender.close()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+__all__ = (
+    'AGGREGATE_WINDOW',
+    'Aggregator',
+    'template',
+)
+
+Payload = Dict[str, Any]
+
+AGGREGATE_WINDOW = 10.0
+
+# Applied in order: identifiers first, so that their digits are not masked one by one
+_MASKS = (
+    (re.compile(r'\b[0-9a-fA-F]{8}-(?:[0-9a-fA-F]{4}-){3}[0-9a-fA-F]{12}\b'), '<uuid>'),
+    (re.compile(r'\b(?:\d{1,3}\.){3}\d{1,3}(?::\d+)?\b'), '<ip>'),
+    (re.compile(r'\b0[xX][0-9a-fA-F]+\b'), '<hex>'),
+    (re.compile(r'\b(?=\d*[a-fA-F])(?=[a-fA-F]*\d)[0-9a-fA-F]{8,}\b'), '<hex>'),
+    (re.compile(r'\b\d+(?:\.\d+)?'), '<num>'),
+)
+
+
+def template(message: str) -> str:
+    for pattern, replacement in _MASKS:
+        message = pattern.sub(replacement, message)
+    return message
+
+
+class _Group:
+    __slots__ = ('event', 'count', 'first_seen', 'last_seen', 'opened')
+
+    def __init__(self, opened: float) -> None:
+        self.event: Optional[Payload] = None
+        self.count = 0
+        self.first_seen = self.last_seen = 0.0
+        self.opened = opened
+
+
+# Events sharing container, level, format and message template within `window` seconds form a
+# group. The first event of a group is passed on at once; the repeats are folded into the first
+# of them, passed on as a summary when the window closes, so only repeats wait for the window.
+# Groups are kept in the order they were opened, so the oldest group is always the first to be
+# closed, either when its window ends or when `maxsize` groups are open and room is needed for
+# a new one.
+class Aggregator:
+    def __init__(
+        self,
+        consumer: Callable[[Payload], object],
+        window: float = AGGREGATE_WINDOW,
+        maxsize: int = 10000,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.consumer = consumer
+        self.window = window
+        self.maxsize = maxsize
+        self.clock = clock
+        self.received = 0
+        self.emitted = 0
+        self.evicted = 0
+        self._groups: 'OrderedDict[Tuple[Any, ...], _Group]' = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._groups)
+
+    def __call__(self, event: Payload) -> None:
+        self.received += 1
+        now = self.clock()
+        self.expire(now)
+
+        message = event.get('message', {}).get('formatted') or ''
+        tags = event.get('tags', {})
+        key = (
+            tags.get('container_id') or tags.get('container_name'),
+            event.get('level'),
+            tags.get('format'),
+            template(message),
+        )
+
+        group = self._groups.get(key)
+        if group is None:
+            if len(self._groups) >= self.maxsize:
+                self.evicted += 1
+                self._close(self._groups.popitem(last=False))
+            self._groups[key] = _Group(now)
+            self._emit(event)
+            return
+
+        seen = event.get('timestamp', 0.0)
+        group.count += 1
+        if group.event is None:
+            group.event = event
+            group.first_seen = group.last_seen = seen
+        else:
+            group.first_seen = min(group.first_seen, seen)
+            group.last_seen = max(group.last_seen, seen)
+
+    # Closes the groups whose window has ended, returns how many summaries were emitted
+    def expire(self, now: Optional[float] = None) -> int:
+        if now is None:
+            now = self.clock()
+        count = 0
+        groups = self._groups
+        while groups:
+            item = next(iter(groups.items()))
+            if item[1].opened + self.window > now:
+                break
+            del groups[item[0]]
+            count += self._close(item)
+        return count
+
+    def flush(self) -> None:
+        while self._groups:
+            self._close(self._groups.popitem(last=False))
+
+    def _close(self, item: Tuple[Tuple[Any, ...], _Group]) -> bool:
+        key, group = item
+        event = group.event
+        if event is None:
+            return False
+        fingerprint: List[str] = [str(part) for part in key if part is not None]
+        event['fingerprint'] = fingerprint
+        event['extra'] = {
+            **event.get('extra', {}),
+            'count': group.count,
+            'first_seen': group.first_seen,
+            'last_seen': group.last_seen,
+            'template': key[-1],
+        }
+        self._emit(event)
+        return True
+
+    def _emit(self, event: Payload) -> None:
+        self.emitted += 1
+        self.consumer(event)
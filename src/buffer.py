@@ -0,0 +1,144 @@
+import asyncio
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+__all__ = (
+    'BoundedQueue',
+    'DROP_LOWEST_SEVERITY',
+    'DROP_NEWEST',
+    'DROP_OLDEST',
+)
+
+DROP_NEWEST = 'drop-newest'
+DROP_OLDEST = 'drop-oldest'
+DROP_LOWEST_SEVERITY = 'drop-lowest-severity'
+
+POLICIES = (DROP_NEWEST, DROP_OLDEST, DROP_LOWEST_SEVERITY)
+
+# https://tools.ietf.org/html/rfc5424#section-6.2.1: 0 (emergency) .. 7 (debug)
+SEVERITIES = 8
+
+
+# FIFO queue of at most `maxsize` items. Under `drop-lowest-severity` every syslog severity has
+# its own bucket and items carry a sequence number, so the oldest item overall is still the one
+# returned first, and the least severe item is found by looking at no more than 8 buckets.
+class BoundedQueue:
+    def __init__(
+        self,
+        maxsize: int = 10000,
+        policy: str = DROP_NEWEST,
+        severity: Optional[Callable[[Any], int]] = None,
+        high: Optional[int] = None,
+        low: Optional[int] = None,
+        on_high: Optional[Callable[[], None]] = None,
+        on_low: Optional[Callable[[], None]] = None,
+    ) -> None:
+        if maxsize < 1:
+            raise ValueError(f'Invalid queue size: {maxsize}, expected 1 or more')
+        if policy not in POLICIES:
+            raise ValueError(f'Unknown drop policy: {policy!r}, expected one of {POLICIES}')
+        if policy == DROP_LOWEST_SEVERITY and severity is None:
+            raise ValueError(f'{DROP_LOWEST_SEVERITY} requires a severity function')
+        self.maxsize = maxsize
+        self.policy = policy
+        self.severity = severity if policy == DROP_LOWEST_SEVERITY else None
+        self.high = high if high is not None else maxsize
+        self.low = low if low is not None else self.high // 2
+        self.on_high = on_high
+        self.on_low = on_low
+        self.accepted = 0
+        self.errors = 0
+        self.dropped: Dict[str, int] = {policy: 0 for policy in POLICIES}
+        self.above_high = False
+        self._size = 0
+        self._sequence = 0
+        self._buckets: List[Deque[Tuple[int, Any]]] = [
+            deque() for _ in range(SEVERITIES if self.severity is not None else 1)
+        ]
+        self._ready: Optional[asyncio.Event] = None
+
+    def __len__(self) -> int:
+        return self._size
+
+    def full(self) -> bool:
+        return self._size >= self.maxsize
+
+    def put(self, item: Any) -> bool:
+        bucket = 0
+        if self.severity is not None:
+            bucket = min(max(self.severity(item), 0), SEVERITIES - 1)
+        if self._size >= self.maxsize and not self._make_room(bucket):
+            self.dropped[self.policy] += 1
+            return False
+
+        self._sequence += 1
+        self._buckets[bucket].append((self._sequence, item))
+        self._size += 1
+        self.accepted += 1
+        if self._ready is not None:
+            self._ready.set()
+        if not self.above_high and self._size >= self.high:
+            self.above_high = True
+            if self.on_high is not None:
+                self.on_high()
+        return True
+
+    def get(self) -> Any:
+        buckets = self._buckets
+        if len(buckets) == 1:
+            bucket = buckets[0]
+        else:
+            bucket = min((item for item in buckets if item), key=lambda item: item[0][0])
+        _, item = bucket.popleft()
+        self._size -= 1
+        if self.above_high and self._size <= self.low:
+            self.above_high = False
+            if self.on_low is not None:
+                self.on_low()
+        return item
+
+    def get_batch(self, size: int) -> List[Any]:
+        return [self.get() for _ in range(min(size, self._size))]
+
+    # `wait`, when given, is awaited before every batch, so that a slower stage downstream can
+    # leave the backlog in this queue, under its drop policy and watermarks. An item the handler
+    # fails on is counted in `errors` and passed to `on_error`, the next ones are still handled.
+    async def consume(
+        self,
+        handler: Callable[[Any], None],
+        batch: int = 256,
+        wait: Optional[Callable[[], Awaitable[None]]] = None,
+        on_error: Optional[Callable[[Any, Exception], None]] = None,
+    ) -> None:
+        if self._ready is None:
+            self._ready = asyncio.Event()
+        while True:
+            if not self._size:
+                self._ready.clear()
+                await self._ready.wait()
+            if wait is not None:
+                await wait()
+            for item in self.get_batch(batch):
+                try:
+                    handler(item)
+                except Exception as error:
+                    self.errors += 1
+                    if on_error is not None:
+                        on_error(item, error)
+            # Yield to the event loop between batches, so that receiving keeps going
+            await asyncio.sleep(0)
+
+    def _make_room(self, bucket: int) -> bool:
+        if self.policy == DROP_NEWEST:
+            return False
+        if self.policy == DROP_OLDEST:
+            self._buckets[0].popleft()
+        else:
+            worst = max(index for index, item in enumerate(self._buckets) if item)
+            if worst < bucket:
+                return False
+            # Among the least severe items the oldest one is dropped
+            self._buckets[worst].popleft()
+        self._size -= 1
+        self.dropped[self.policy] += 1
+        return True
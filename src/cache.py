@@ -0,0 +1,87 @@
+import time
+from collections import OrderedDict
+from typing import Callable, Generic, Hashable, List, Optional, Tuple, TypeVar
+
+__all__ = (
+    'LRUCache',
+)
+
+T = TypeVar('T')
+
+
+# Entries expire `ttl` seconds after they were last stored or read, so the least recently used
+# entry is always the first to expire and eviction only ever looks at the front of the cache.
+class LRUCache(Generic[T]):
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        ttl: Optional[float] = 300.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if maxsize < 1:
+            raise ValueError('maxsize must be a positive integer')
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data: 'OrderedDict[Hashable, Tuple[T, float]]' = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        item = self._data.get(key)
+        return item is not None and (self.ttl is None or item[1] > self.clock())
+
+    def get(self, key: Hashable, default: Optional[T] = None) -> Optional[T]:
+        item = self._data.get(key)
+        if item is None:
+            self.misses += 1
+            return default
+        now = self.clock()
+        if self.ttl is not None:
+            if item[1] <= now:
+                del self._data[key]
+                self.evictions += 1
+                self.misses += 1
+                return default
+            self._data[key] = (item[0], now + self.ttl)
+        self._data.move_to_end(key)
+        self.hits += 1
+        return item[0]
+
+    def set(self, key: Hashable, value: T) -> None:
+        now = self.clock()
+        self._data[key] = (value, now + self.ttl if self.ttl is not None else 0.0)
+        self._data.move_to_end(key)
+        self.expire(now)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def keys(self) -> List[Hashable]:
+        return list(self._data)
+
+    def pop(self, key: Hashable, default: Optional[T] = None) -> Optional[T]:
+        item = self._data.pop(key, None)
+        return default if item is None else item[0]
+
+    def expire(self, now: Optional[float] = None) -> int:
+        if self.ttl is None:
+            return 0
+        if now is None:
+            now = self.clock()
+        count = 0
+        while self._data:
+            key, item = next(iter(self._data.items()))
+            if item[1] > now:
+                break
+            del self._data[key]
+            count += 1
+        self.evictions += count
+        return count
+
+    def clear(self) -> None:
+        self._data.clear()
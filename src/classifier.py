@@ -0,0 +1,98 @@
+import re
+import time
+from typing import Dict, Iterable, Optional, Tuple, Type
+
+from src import get_regex
+from src.cache import LRUCache
+from src.metrics import Metrics
+from src.record import Record, record_type
+
+__all__ = (
+    'Classifier',
+)
+
+Groups = Dict[str, Optional[str]]
+
+
+# Patterns are tried in the order they were registered and the first one that matches wins:
+# with a handful of formats that is faster than one combined scan, which has to be followed by
+# a second match of the winning pattern to extract its groups.
+# With a cache, the format that last matched a line of a given key (e.g. Docker container ID)
+# is tried first for the next line of that key.
+# Lines matched by every format are counted in `hits`, lines matched by none in `misses`; with
+# `metrics`, sampled matches are timed as the "classify" stage.
+class Classifier:
+    def __init__(
+        self,
+        regex: Iterable[Tuple[str, re.Pattern]],
+        cache: Optional[LRUCache[Type[Record]]] = None,
+        metrics: Optional[Metrics] = None,
+    ) -> None:
+        self.regex: Tuple[Tuple[str, re.Pattern], ...] = tuple(regex)
+        self.cache = cache
+        self.hits: Dict[str, int] = {name: 0 for name, _ in self.regex}
+        self.misses = 0
+        self._stage = metrics.stage('classify') if metrics is not None else None
+        self._types = tuple(record_type(name, item) for name, item in self.regex)
+
+    @classmethod
+    def from_registry(
+        cls,
+        cache: Optional[LRUCache[Type[Record]]] = None,
+        metrics: Optional[Metrics] = None,
+    ) -> 'Classifier':
+        return cls(get_regex(), cache, metrics)
+
+    def classify(self, line: str, key: Optional[str] = None) -> Optional[Tuple[str, Groups]]:
+        record = self.match(line, key)
+        if record is None:
+            return None
+        return record.FORMAT, record.asdict()
+
+    def match(self, line: str, key: Optional[str] = None) -> Optional[Record]:
+        stage = self._stage
+        if stage is not None and stage.sampled():
+            started = time.perf_counter()
+            result = self._lookup(line, key)
+            stage.observe(time.perf_counter() - started, line, self.slowest)
+        else:
+            result = self._lookup(line, key)
+        if result is None:
+            self.misses += 1
+        else:
+            hits = self.hits
+            hits[result.FORMAT] = hits.get(result.FORMAT, 0) + 1
+        return result
+
+    # The format whose pattern takes longest on `line`, each of them run on it once
+    def slowest(self, line: str) -> Optional[str]:
+        result, longest = None, -1.0
+        for name, item in self.regex:
+            started = time.perf_counter()
+            item.match(line)
+            elapsed = time.perf_counter() - started
+            if elapsed > longest:
+                result, longest = name, elapsed
+        return result
+
+    def _lookup(self, line: str, key: Optional[str]) -> Optional[Record]:
+        if key is None or self.cache is None:
+            return self._match(line)
+
+        cached = self.cache.get(key)
+        if cached is not None:
+            match = cached.PATTERN.match(line)
+            if match is not None:
+                return cached(match)
+
+        result = self._match(line)
+        if result is not None and type(result) is not cached:
+            self.cache.set(key, type(result))
+        return result
+
+    def _match(self, line: str) -> Optional[Record]:
+        for item in self._types:
+            match = item.PATTERN.match(line)
+            if match is not None:
+                return item(match)
+        return None
@@ -0,0 +1,152 @@
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Type
+
+from src.classifier import Classifier
+from src.record import Record
+from src.timestamp import FIELDS as TIMESTAMP_FIELDS, Normalizer
+
+__all__ = (
+    'Columns',
+    'NO_TIMESTAMP',
+    'UNPARSED',
+    'parse_many',
+)
+
+# Format id of a line no registered pattern matched
+UNPARSED = -1
+# Timestamp of a line without one, also NumPy's NaT
+NO_TIMESTAMP = -2 ** 63
+
+Column = List[Optional[str]]
+
+
+# Results of `parse_many`, one row per line: the id of its format in `formats` (or UNPARSED),
+# its timestamp in microseconds since the epoch (or NO_TIMESTAMP) and one column per field of
+# all formats, None where a line has no such field. The fields a timestamp is made of are only
+# kept as `timestamp`.
+class Columns:
+    def __init__(
+        self,
+        lines: Sequence[str],
+        formats: Tuple[str, ...],
+        format: array,
+        timestamp: array,
+        fields: Dict[str, Column],
+    ) -> None:
+        self.lines = lines
+        self.formats = formats
+        self.format = format
+        self.timestamp = timestamp
+        self.fields = fields
+
+    def __len__(self) -> int:
+        return len(self.format)
+
+    def __getitem__(self, field: str) -> Column:
+        return self.fields[field]
+
+    def row(self, index: int) -> Dict[str, Any]:
+        format_id = self.format[index]
+        result: Dict[str, Any] = {
+            'format': self.formats[format_id] if format_id != UNPARSED else None,
+            'timestamp': self.timestamp[index] if self.timestamp[index] != NO_TIMESTAMP else None,
+        }
+        result.update(
+            (key, column[index]) for key, column in self.fields.items()
+            if column[index] is not None
+        )
+        return result
+
+    # A structured array of "format" (int8), "timestamp" (int64) and one object field per column
+    def to_numpy(self) -> Any:
+        try:
+            import numpy
+        except ImportError:
+            raise RuntimeError('Columns.to_numpy() requires NumPy') from None
+        dtype = [('format', 'i1'), ('timestamp', 'i8')] + [(key, 'O') for key in self.fields]
+        result = numpy.empty(len(self), dtype=dtype)
+        result['format'] = numpy.frombuffer(self.format, dtype='i1')
+        result['timestamp'] = numpy.frombuffer(self.timestamp, dtype='i8')
+        for key, column in self.fields.items():
+            result[key] = column
+        return result
+
+
+class _Format:
+    __slots__ = ('id', 'type', 'indexes', 'keys', 'timestamp', 'rows', 'values')
+
+    def __init__(self, format_id: int, record: Type[Record]) -> None:
+        self.id = format_id
+        self.type = record
+        names = set(TIMESTAMP_FIELDS[:-1])
+        self.timestamp = record.PATTERN.groupindex.keys() >= names
+        fields = [
+            (index, key) for index, key in zip(record.INDEXES, record.FIELDS)
+            if not (self.timestamp and key in TIMESTAMP_FIELDS)
+        ]
+        self.indexes = tuple(index for index, _ in fields)
+        self.keys = tuple(key for _, key in fields)
+        self.rows: List[int] = []
+        self.values: List[Tuple[Optional[str], ...]] = []
+
+
+# Matches every line against the registered patterns (see `Classifier`) and keeps, per format,
+# only the row numbers and one tuple of group values per line, read with a single
+# `group(*indexes)` call; these are turned into columns at the end. Consecutive lines are
+# mostly of one format, so the format of the previous line is tried first.
+def parse_many(
+    lines: Iterable[str],
+    classifier: Optional[Classifier] = None,
+    normalizer: Optional[Normalizer] = None,
+) -> Columns:
+    lines = lines if isinstance(lines, (list, tuple)) else list(lines)
+    classifier = classifier or Classifier.from_registry()
+    normalizer = normalizer or Normalizer()
+    formats: Dict[Type[Record], _Format] = {}
+    format_ids = array('b', bytes(len(lines)))
+    timestamps = array('q', [NO_TIMESTAMP]) * len(lines)
+    microseconds = normalizer.microseconds
+
+    previous: Optional[_Format] = None
+    for row, line in enumerate(lines):
+        match = previous.type.PATTERN.match(line) if previous is not None else None
+        if previous is not None and match is not None:
+            record = previous.type(match)
+        else:
+            found = classifier.match(line)
+            if found is None:
+                format_ids[row] = UNPARSED
+                continue
+            record = found
+            previous = formats.get(type(record))
+            if previous is None:
+                previous = formats[type(record)] = _Format(len(formats), type(record))
+        format_ids[row] = previous.id
+        previous.rows.append(row)
+        indexes = previous.indexes
+        previous.values.append(
+            record.group(*indexes) if len(indexes) > 1 else tuple(map(record.group, indexes))
+        )
+        if previous.timestamp:
+            value = microseconds(record)
+            if value is not None:
+                timestamps[row] = value
+
+    fields: Dict[str, Column] = {}
+    for item in formats.values():
+        for key, values in zip(item.keys, zip(*item.values)):
+            if len(item.rows) == len(lines):
+                fields[key] = list(values)
+                continue
+            column = fields.get(key)
+            if column is None:
+                column = fields[key] = [None] * len(lines)
+            for row, value in zip(item.rows, values):
+                column[row] = value
+    return Columns(
+        lines,
+        tuple(item.type.FORMAT for item in formats.values()),
+        format_ids,
+        timestamps,
+        fields,
+    )
@@ -3,7 +3,7 @@ from src import add_context, add_regex
 from .regex import HTTPD
 
 
-add_regex(HTTPD)
+add_regex('HTTPD', HTTPD)
 
 add_context('httpd', [
     'authuser',
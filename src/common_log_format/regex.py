@@ -10,12 +10,16 @@ class Atom(_base.BaseAtom):
     LOG_HTTP_STATUS = r'(?P<http_status>[1-5][0-9]{2})'
     LOG_REFERER = r'"(?P<referer>([a-z]+://\S+)?)"'
     LOG_RFC931 = r'(?P<user_identifier>-|\S+)'
+    # Apache and nginx escape quotes in the request line, so the closing quote is the first one
+    # not escaped: no other split for `.+` to backtrack through on a line full of quotes. Runs
+    # of plain characters between escapes are matched at once, see "unrolling the loop".
+    LOG_REQUEST = r'(?P<message>(?=[^"])[^"\\]*(?:\\.[^"\\]*)*)'
     LOG_USER_AGENT = r'"(?P<user_agent>[^\"]+)"'
 
 
 # Common Log Format, Combined Log Format
 HTTPD = re.compile((
     r'^{IP}\s{LOG_RFC931}\s{LOG_AUTHUSER}\s\[{LOG_DATE}:{TIME}(\s{TIMEZONE})?\] '
-    r'"{MESSAGE}"\s{LOG_HTTP_STATUS}\s{LOG_CONTENT_SIZE}'
+    r'"{LOG_REQUEST}"\s{LOG_HTTP_STATUS}\s{LOG_CONTENT_SIZE}'
     r'(\s{LOG_REFERER})?(\s{LOG_USER_AGENT})?$'
 ).format(**Atom.asdict()))
@@ -0,0 +1,322 @@
+import asyncio
+import json
+import time
+from typing import (
+    Any, AsyncIterator, Callable, Dict, List, NamedTuple, Optional, Sequence, Set, Tuple,
+)
+from urllib.parse import quote
+
+from src.cache import LRUCache
+
+__all__ = (
+    'Client',
+    'DockerError',
+    'Enricher',
+    'Metadata',
+)
+
+SOCKET = '/var/run/docker.sock'
+# Only these variables of a container's environment are read, never sent on
+ENVIRONMENT_VARIABLES = ('SENTRY_ENVIRONMENT', 'ENVIRONMENT')
+# Compose labels, then Swarm's
+PROJECT_LABELS = ('com.docker.compose.project', 'com.docker.stack.namespace')
+SERVICE_LABELS = ('com.docker.compose.service', 'com.docker.swarm.service.name')
+# Seconds without lookups after one failed, while the daemon is restarted or overloaded
+RETRY = 5.0
+
+Payload = Dict[str, Any]
+
+
+class DockerError(Exception):
+    pass
+
+
+# https://docs.docker.com/engine/api/v1.40/
+# Just enough of the Engine API over its Unix socket: one connection per request, answered with
+# a Content-Length or a chunked body, which the events stream never ends.
+class Client:
+    def __init__(self, path: str = SOCKET, timeout: float = 5.0) -> None:
+        self.path = path
+        self.timeout = timeout
+        self.requests = 0
+
+    # GET /containers/{id}/json, None when there is no such container
+    async def inspect(self, container_id: str) -> Optional[Dict[str, Any]]:
+        status, body = await asyncio.wait_for(
+            self._get(f'/containers/{quote(container_id)}/json'), self.timeout,
+        )
+        if status == 404:
+            return None
+        return json.loads(await asyncio.wait_for(_read(body), self.timeout))
+
+    # GET /events of containers, one decoded event at a time, until the connection is lost
+    async def events(self) -> AsyncIterator[Dict[str, Any]]:
+        filters = quote(json.dumps({'type': ['container']}))
+        _, body = await asyncio.wait_for(self._get(f'/events?filters={filters}'), self.timeout)
+        buffer = b''
+        async for data in body:
+            buffer += data
+            *lines, buffer = buffer.split(b'\n')
+            for line in lines:
+                if line.strip():
+                    yield json.loads(line)
+
+    async def _get(self, path: str) -> Tuple[int, AsyncIterator[bytes]]:
+        self.requests += 1
+        reader, writer = await asyncio.open_unix_connection(self.path)
+        try:
+            writer.write(
+                f'GET {path} HTTP/1.1\r\nHost: docker\r\nConnection: close\r\n\r\n'.encode(),
+            )
+            status_line = await reader.readline()
+            parts = status_line.split(None, 2)
+            if len(parts) < 2 or not parts[1].isdigit():
+                raise DockerError(f'Invalid response: {status_line!r}')
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip()
+        except BaseException:
+            writer.close()
+            raise
+        status = int(parts[1])
+        body = _body(reader, writer, headers)
+        if status >= 400 and status != 404:
+            raise DockerError(f'{path}: {status} {(await _read(body))[:200]!r}')
+        return status, body
+
+
+async def _body(
+    reader: asyncio.StreamReader,
+    writer: asyncio.StreamWriter,
+    headers: Dict[str, str],
+) -> AsyncIterator[bytes]:
+    try:
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            while True:
+                size = int((await reader.readline()).split(b';')[0], 16)
+                if not size:
+                    break
+                yield await reader.readexactly(size)
+                await reader.readexactly(2)
+        elif 'content-length' in headers:
+            yield await reader.readexactly(int(headers['content-length']))
+        else:
+            while True:
+                data = await reader.read(65536)
+                if not data:
+                    break
+                yield data
+    except (asyncio.IncompleteReadError, ValueError) as error:
+        raise DockerError(f'Truncated response: {error}') from None
+    finally:
+        writer.close()
+
+
+async def _read(body: AsyncIterator[bytes]) -> bytes:
+    return b''.join([data async for data in body])
+
+
+def _first(values: Dict[str, str], keys: Sequence[str]) -> Optional[str]:
+    for key in keys:
+        if values.get(key):
+            return values[key]
+    return None
+
+
+# What `docker inspect` tells about a container that its log lines do not
+class Metadata(NamedTuple):
+    name: str
+    labels: Dict[str, str]
+    project: Optional[str]
+    service: Optional[str]
+    environment: Optional[str]
+
+    @classmethod
+    def from_inspect(cls, data: Dict[str, Any]) -> 'Metadata':
+        config = data.get('Config') or {}
+        labels = config.get('Labels') or {}
+        variables = dict(
+            item.partition('=')[::2] for item in config.get('Env') or ()
+            if item.partition('=')[0] in ENVIRONMENT_VARIABLES
+        )
+        return cls(
+            data.get('Name', '').lstrip('/'),
+            labels,
+            _first(labels, PROJECT_LABELS),
+            _first(labels, SERVICE_LABELS),
+            _first(variables, ENVIRONMENT_VARIABLES),
+        )
+
+
+# Returned for containers Docker does not know (any more), so that they are not looked up again
+# for every line until the entry expires
+_UNKNOWN = Metadata('', {}, None, None, None)
+
+
+# Adds the compose project and service, `environment` and the labels of a payload's container
+# (see `Metadata`), as tags ("compose.project", "compose.service", "label.NAME" for the labels
+# in `tag_labels`) and as the "docker_labels" context. Payloads are never held for the socket:
+# metadata comes from a TTL/LRU cache, and a payload of a container not in it waits, at most
+# `timeout` seconds and with at most `max_waiting` others, for one lookup per container however
+# many payloads wait for it; after a failed lookup payloads are passed on as they are for RETRY
+# seconds. The cache is kept up to date by the events stream, see `start`.
+class Enricher:
+    def __init__(
+        self,
+        consumer: Callable[[Payload], object],
+        client: Client,
+        maxsize: int = 10000,
+        ttl: Optional[float] = 300.0,
+        timeout: float = 1.0,
+        max_waiting: int = 10000,
+        tag_labels: Sequence[str] = (),
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.consumer = consumer
+        self.client = client
+        self.cache: LRUCache[Metadata] = LRUCache(maxsize, ttl, clock)
+        self.timeout = timeout
+        self.max_waiting = max_waiting
+        self.tag_labels = tuple(tag_labels)
+        self.clock = clock
+        self.lookups = 0
+        self.coalesced = 0
+        self.failed = 0
+        self.refreshed = 0
+        self.unenriched = 0
+        self._waiting: Dict[str, List[Payload]] = {}
+        self._count = 0
+        self._retry_at = 0.0
+        self._tasks: Set[asyncio.Task] = set()
+        self._events: Optional[asyncio.Task] = None
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.cache.hits + self.cache.misses
+        return self.cache.hits / total if total else 0.0
+
+    @property
+    def waiting(self) -> int:
+        return self._count
+
+    def __call__(self, event: Payload) -> None:
+        container_id = event.get('contexts', {}).get('docker', {}).get('container_id')
+        if not container_id:
+            self.consumer(event)
+            return
+        metadata = self.cache.get(container_id)
+        if metadata is not None:
+            self.consumer(self._enrich(event, metadata))
+            return
+        waiting = self._waiting.get(container_id)
+        if self._count >= self.max_waiting or (
+            waiting is None and self._retry_at and self.clock() < self._retry_at
+        ):
+            self.unenriched += 1
+            self.consumer(event)
+            return
+        self._count += 1
+        if waiting is not None:
+            self.coalesced += 1
+            waiting.append(event)
+            return
+        self._waiting[container_id] = [event]
+        self._spawn(self._lookup(container_id))
+
+    def start(self) -> None:
+        if self._events is None:
+            self._events = asyncio.get_running_loop().create_task(self._watch())
+
+    # Passes on every waiting payload, as it is
+    async def close(self) -> None:
+        tasks = [*self._tasks, *([self._events] if self._events is not None else [])]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._events = None
+        for container_id in list(self._waiting):
+            self._release(container_id, None)
+
+    def _spawn(self, coroutine: Any) -> None:
+        task = asyncio.get_running_loop().create_task(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _fetch(self, container_id: str) -> Optional[Metadata]:
+        self.lookups += 1
+        try:
+            data = await asyncio.wait_for(self.client.inspect(container_id), self.timeout)
+        except (OSError, DockerError, ValueError, asyncio.TimeoutError):
+            self.failed += 1
+            self._retry_at = self.clock() + RETRY
+            return None
+        self._retry_at = 0.0
+        metadata = _UNKNOWN if data is None else Metadata.from_inspect(data)
+        self.cache.set(container_id, metadata)
+        return metadata
+
+    async def _lookup(self, container_id: str) -> None:
+        metadata = None
+        try:
+            metadata = await self._fetch(container_id)
+        finally:
+            self._release(container_id, metadata)
+
+    def _release(self, container_id: str, metadata: Optional[Metadata]) -> None:
+        events = self._waiting.pop(container_id, [])
+        self._count -= len(events)
+        for event in events:
+            if metadata is None:
+                self.unenriched += 1
+                self.consumer(event)
+            else:
+                self.consumer(self._enrich(event, metadata))
+
+    # Containers are looked up when they start, before their first line, and again when they
+    # are renamed or updated; destroyed ones are forgotten. Everything cached is looked up again
+    # after the stream was lost, as events may have been missed meanwhile.
+    async def _watch(self) -> None:
+        delay = 0.0
+        while True:
+            if delay:
+                await asyncio.sleep(delay)
+                for container_id in self.cache.keys():
+                    self._spawn(self._fetch(str(container_id)))
+            try:
+                async for event in self.client.events():
+                    delay = 0.0
+                    action = event.get('Action') or event.get('status') or ''
+                    container_id = (event.get('Actor') or {}).get('ID') or event.get('id')
+                    if not container_id:
+                        continue
+                    if action == 'destroy':
+                        self.cache.pop(container_id)
+                    elif action == 'start' or (
+                        action in ('rename', 'update') and container_id in self.cache
+                    ):
+                        self.refreshed += 1
+                        self._spawn(self._fetch(str(container_id)))
+            except (OSError, DockerError, ValueError, asyncio.TimeoutError):
+                pass
+            delay = min(max(delay * 2, 1.0), 30.0)
+
+    def _enrich(self, event: Payload, metadata: Metadata) -> Payload:
+        if metadata is _UNKNOWN:
+            return event
+        tags = event.setdefault('tags', {})
+        if metadata.project:
+            tags['compose.project'] = metadata.project
+        if metadata.service:
+            tags['compose.service'] = metadata.service
+        for name in self.tag_labels:
+            if name in metadata.labels:
+                tags[f'label.{name}'] = metadata.labels[name]
+        if metadata.environment:
+            event['environment'] = metadata.environment
+        if metadata.labels:
+            event.setdefault('contexts', {})['docker_labels'] = metadata.labels
+        return event
@@ -0,0 +1,100 @@
+import asyncio
+import json
+from typing import Any, Dict, List, Optional, Set
+from urllib.parse import unquote, urlsplit
+
+__all__ = (
+    'StubServer',
+)
+
+
+# Local stand-in for the Docker Engine API on a Unix socket, for tests and benchmarks without a
+# daemon: answers GET /containers/{id}/json (by full id or a unique prefix of it, with a
+# Content-Length) and streams GET /events (chunked) with whatever `emit` is given.
+class StubServer:
+    def __init__(self, path: str, delay: float = 0.0, status: int = 200) -> None:
+        self.path = path
+        self.delay = delay
+        self.status = status
+        self.containers: Dict[str, Dict[str, Any]] = {}
+        self.requests: Dict[str, int] = {}
+        self.server: Optional[asyncio.AbstractServer] = None
+        self._streams: List[asyncio.StreamWriter] = []
+        self._handlers: Set[asyncio.Task] = set()
+
+    def add(self, container_id: str, name: str, labels: Dict[str, str], env: List[str]) -> None:
+        self.containers[container_id] = {
+            'Id': container_id,
+            'Name': f'/{name}',
+            'Config': {'Labels': labels, 'Env': env},
+        }
+
+    async def start(self) -> None:
+        self.server = await asyncio.start_unix_server(self._handle, self.path)
+
+    async def close(self) -> None:
+        if self.server is not None:
+            self.server.close()
+            for writer in self._streams:
+                writer.close()
+            for task in self._handlers:
+                task.cancel()
+            await asyncio.gather(*self._handlers, return_exceptions=True)
+            await self.server.wait_closed()
+
+    # Sends an event to every open events stream; streams are cut off with `drop=True`
+    async def emit(self, event: Dict[str, Any], drop: bool = False) -> None:
+        data = json.dumps(event).encode() + b'\n'
+        for writer in list(self._streams):
+            writer.write(b'%x\r\n%s\r\n' % (len(data), data))
+            await writer.drain()
+            if drop:
+                writer.close()
+        if drop:
+            self._streams.clear()
+
+    @property
+    def streams(self) -> int:
+        return len(self._streams)
+
+    def _find(self, prefix: str) -> Optional[Dict[str, Any]]:
+        found = [value for key, value in self.containers.items() if key.startswith(prefix)]
+        return found[0] if len(found) == 1 else None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        task = asyncio.current_task()
+        assert task is not None
+        self._handlers.add(task)
+        try:
+            request_line = await reader.readline()
+            while (await reader.readline()) not in (b'\r\n', b''):
+                pass
+            path = urlsplit(request_line.split()[1].decode()).path
+            self.requests[path] = self.requests.get(path, 0) + 1
+            if self.delay:
+                await asyncio.sleep(self.delay)
+            if path == '/events':
+                writer.write(b'HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\n')
+                await writer.drain()
+                self._streams.append(writer)
+                await reader.read()
+                return
+            container = None
+            if path.startswith('/containers/') and path.endswith('/json'):
+                container = self._find(unquote(path[len('/containers/'):-len('/json')]))
+            status = self.status if container is not None else 404
+            body = json.dumps(
+                container if status == 200 else {'message': 'No such container'},
+            ).encode()
+            writer.write(
+                b'HTTP/1.1 %d STUB\r\nContent-Type: application/json\r\n'
+                b'Content-Length: %d\r\n\r\n%s' % (status, len(body), body)
+            )
+            await writer.drain()
+        except (asyncio.CancelledError, ConnectionError, IndexError):
+            pass
+        finally:
+            self._handlers.discard(task)
+            if writer in self._streams:
+                self._streams.remove(writer)
+            writer.close()
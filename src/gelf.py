@@ -0,0 +1,211 @@
+import json
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from src.pipeline import Continued, ContinuedBytes
+
+__all__ = (
+    'Gelf',
+    'decompress',
+    'to_syslog',
+)
+
+# https://go2docs.graylog.org/current/getting_in_log_data/gelf.html#GELFviaUDP
+MAGIC = b'\x1e\x0f'
+# Magic, message id, sequence number and count
+HEADER_SIZE = 12
+MAX_CHUNKS = 128
+# Seconds the chunks of a message are waited for, counted from the first one
+TIMEOUT = 5.0
+# Largest decompressed message, larger ones are dropped rather than inflated
+MAX_MESSAGE_SIZE = 1024 * 1024
+# zlib or gzip, told by their header
+_WBITS = 32 + zlib.MAX_WBITS
+
+# facility "daemon", as Docker's syslog logging driver sends
+FACILITY = 3
+# Level of a message without one, by the GELF spec
+ALERT = 1
+
+
+class _Message:
+    __slots__ = ('chunks', 'missing', 'size', 'opened')
+
+    def __init__(self, count: int, opened: float) -> None:
+        self.chunks: List[Optional[bytes]] = [None] * count
+        self.missing = count
+        self.size = 0
+        self.opened = opened
+
+
+def decompress(data: bytes) -> bytes:
+    if data[:1] == b'{':
+        return data
+    decompressor = zlib.decompressobj(_WBITS)
+    try:
+        result = decompressor.decompress(data, MAX_MESSAGE_SIZE)
+    except zlib.error as error:
+        raise ValueError(f'Invalid compressed GELF message: {error}') from None
+    if decompressor.unconsumed_tail:
+        raise ValueError(f'GELF message larger than {MAX_MESSAGE_SIZE} bytes')
+    return result
+
+
+def _name(value: Any) -> str:
+    return ''.join(str(value or '').split()).replace('~', '_').lstrip('/') or 'unknown'
+
+
+def _timestamp(value: Any) -> str:
+    try:
+        seconds = float(value)
+    except (TypeError, ValueError):
+        seconds = time.time()
+    whole = int(seconds)
+    micro = min(int(round((seconds - whole) * 1e6)), 999999)
+    return time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(whole)) + f'.{micro:06d}Z'
+
+
+# A GELF message of Docker's gelf logging driver as the lines its syslog logging driver would
+# have sent with the README's tag, see `src.replay.to_syslog`: `_container_id`,
+# `_container_name`, `_image_id` and `_image_name` make the Docker MSGID, `level` the severity.
+# A message is one event whatever its number of lines: the first line of `short_message` gets
+# the header and the following ones, then those of `full_message` (which usually repeats
+# `short_message` first), are its continuation. Messages of other senders keep their host and
+# `_tag` but get no MSGID.
+def to_syslog(message: Dict[str, Any]) -> Continued:
+    try:
+        level = min(max(int(message.get('level', ALERT)), 0), 7)
+    except (TypeError, ValueError):
+        level = ALERT
+    container_id = str(message.get('_container_id') or '').lower()
+    if container_id.isalnum() and container_id.isascii():
+        appname = container_id[:12]
+        msgid = (
+            f'DOCKER:{container_id}~{_name(message.get("_container_name"))}'
+            f'~{_name(message.get("_image_id"))}~{_name(message.get("_image_name"))}~docker'
+        )
+    else:
+        appname = ''.join(str(message.get('_tag') or '').split()) or '-'
+        msgid = '-'
+    header = (
+        f'<{FACILITY * 8 + level}>1 {_timestamp(message.get("timestamp"))} '
+        f'{"".join(str(message.get("host") or "").split()) or "-"} {appname} - {msgid} -'
+    )
+    text = str(message.get('short_message') or '')
+    full = str(message.get('full_message') or '')
+    if full.startswith(text):
+        text = full or text
+    elif full:
+        text = f'{text}\n{full}'
+    first, *lines = [line.rstrip('\r') for line in text.rstrip('\r\n').split('\n')]
+    result = Continued(f'{header} {first}' if first else header)
+    result.continuation = lines
+    return result
+
+
+# GELF over UDP: every datagram is a message, zlib- or gzip-compressed or not, or one of up to
+# 128 chunks of one. Chunks are kept by message id in the order their messages started, until
+# all arrived or for `timeout` seconds, for at most `maxsize` messages of `max_bytes` in all,
+# beyond which the oldest are dropped. Complete messages are passed on as one syslog line each,
+# see `to_syslog`, as bytes with `binary` (see `BytesPipeline`). `invalid` counts datagrams and
+# messages that could not be decoded, `expired` and `evicted` the messages that never
+# completed.
+class Gelf:
+    def __init__(
+        self,
+        handler: Callable[[Union[str, bytes]], object],
+        maxsize: int = 1000,
+        max_bytes: int = 64 * 1024 * 1024,
+        timeout: float = TIMEOUT,
+        binary: bool = False,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.handler = handler
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.binary = binary
+        self.clock = clock
+        self.size = 0
+        self.messages = 0
+        self.chunks = 0
+        self.duplicates = 0
+        self.invalid = 0
+        self.expired = 0
+        self.evicted = 0
+        self._pending: 'OrderedDict[bytes, _Message]' = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def __call__(self, datagram: bytes) -> None:
+        if datagram[:2] != MAGIC:
+            self._decode(datagram)
+            return
+        self.chunks += 1
+        now = self.clock()
+        self.expire(now)
+        if len(datagram) < HEADER_SIZE:
+            self.invalid += 1
+            return
+        key, sequence, count = datagram[2:10], datagram[10], datagram[11]
+        if not 0 < count <= MAX_CHUNKS or sequence >= count:
+            self.invalid += 1
+            return
+        message = self._pending.get(key)
+        if message is None or len(message.chunks) != count:
+            if message is not None:
+                self.invalid += 1
+                self._drop(key)
+            message = self._pending[key] = _Message(count, now)
+        if message.chunks[sequence] is not None:
+            self.duplicates += 1
+            return
+        data = datagram[HEADER_SIZE:]
+        message.chunks[sequence] = data
+        message.missing -= 1
+        message.size += len(data)
+        self.size += len(data)
+        if not message.missing:
+            self._drop(key)
+            self._decode(b''.join(chunk or b'' for chunk in message.chunks))
+            return
+        while len(self._pending) > self.maxsize or self.size > self.max_bytes:
+            self._drop(next(iter(self._pending)))
+            self.evicted += 1
+
+    def expire(self, now: Optional[float] = None) -> int:
+        if now is None:
+            now = self.clock()
+        count = 0
+        pending = self._pending
+        while pending:
+            key, message = next(iter(pending.items()))
+            if message.opened + self.timeout > now:
+                break
+            self._drop(key)
+            count += 1
+        self.expired += count
+        return count
+
+    def _drop(self, key: bytes) -> None:
+        self.size -= self._pending.pop(key).size
+
+    def _decode(self, data: bytes) -> None:
+        try:
+            message = json.loads(decompress(data))
+            if not isinstance(message, dict):
+                raise ValueError('GELF message is not an object')
+        except ValueError:
+            self.invalid += 1
+            return
+        self.messages += 1
+        line = to_syslog(message)
+        if self.binary:
+            data = ContinuedBytes(line.encode())
+            data.continuation = line.continuation
+            self.handler(data)
+        else:
+            self.handler(line)
@@ -0,0 +1,284 @@
+import asyncio
+import socket
+from typing import Any, Callable, Optional, Set, Tuple
+
+__all__ = (
+    'DatagramReader',
+    'Listener',
+    'StreamProtocol',
+)
+
+Handler = Callable[[Any], object]
+
+# Largest syslog message accepted over TCP and largest UDP datagram
+MAX_MESSAGE_SIZE = 65536
+# Datagrams read from the socket per event loop wakeup
+DATAGRAM_BATCH = 64
+
+_DIGITS = frozenset(b'0123456789')
+# Longest MSG-LEN of an octet-counted frame, longer runs of digits start a line
+_LENGTH_DIGITS = 10
+
+
+def _decode(data: memoryview) -> str:
+    return str(data, 'utf-8', 'replace').rstrip('\r\n\x00')
+
+
+# Received bytes are copied out of the reused buffer as they are, see `BytesPipeline`
+def _copy(data: memoryview) -> bytes:
+    return bytes(data).rstrip(b'\r\n\x00')
+
+
+# UDP is read with `loop.add_reader` instead of `DatagramProtocol` so that every wakeup drains
+# up to `batch` datagrams into one preallocated buffer, instead of one datagram per callback.
+# `decode` is given the datagram's bytes in that buffer, which it must copy.
+class DatagramReader:
+    def __init__(
+        self,
+        sock: socket.socket,
+        handler: Handler,
+        batch: int = DATAGRAM_BATCH,
+        loop: Optional[asyncio.AbstractEventLoop] = None,
+        binary: bool = False,
+        decode: Optional[Callable[[memoryview], Any]] = None,
+    ) -> None:
+        self.sock = sock
+        self.handler = handler
+        self.batch = batch
+        self.decode = decode or (_copy if binary else _decode)
+        self.loop = loop or asyncio.get_event_loop()
+        self.datagrams = 0
+        self.wakeups = 0
+        self._buffer = bytearray(MAX_MESSAGE_SIZE)
+        self._view = memoryview(self._buffer)
+        sock.setblocking(False)
+        self.loop.add_reader(sock.fileno(), self._read)
+
+    def _read(self) -> None:
+        self.wakeups += 1
+        recv_into = self.sock.recv_into
+        view = self._view
+        handler, decode = self.handler, self.decode
+        for _ in range(self.batch):
+            try:
+                size = recv_into(view)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                # e.g. ICMP port unreachable reported on a connected socket
+                continue
+            self.datagrams += 1
+            handler(decode(view[:size]))
+
+    def close(self) -> None:
+        self.loop.remove_reader(self.sock.fileno())
+        self.sock.close()
+
+
+# https://tools.ietf.org/html/rfc6587#section-3.4
+# Every frame is either octet-counted ("MSG-LEN SP SYSLOG-MSG") or terminated by LF. A frame is
+# octet-counted only if it starts with up to 10 digits, not 0 first, and a space; anything else,
+# say a line starting with a date, is a line. Received bytes land directly in one reusable buffer.
+# A line longer than the buffer is dropped as a whole: what follows is ignored up to its LF.
+class StreamProtocol(asyncio.BufferedProtocol):
+    def __init__(
+        self,
+        handler: Handler,
+        max_size: int = MAX_MESSAGE_SIZE,
+        listener: Optional['Listener'] = None,
+        binary: bool = False,
+    ) -> None:
+        self.handler = handler
+        self.max_size = max_size
+        self.listener = listener
+        self.decode = _copy if binary else _decode
+        self.frames = 0
+        self.errors = 0
+        self.transport: Optional[asyncio.Transport] = None
+        self._buffer = bytearray(max_size + 16)
+        self._view = memoryview(self._buffer)
+        self._start = 0
+        self._end = 0
+        self._discarding = False
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        assert isinstance(transport, asyncio.Transport)
+        self.transport = transport
+        if self.listener is not None:
+            self.listener.connections.add(self)
+            if self.listener.paused:
+                transport.pause_reading()
+
+    def connection_lost(self, exc: Optional[Exception]) -> None:
+        if self.listener is not None:
+            self.listener.connections.discard(self)
+
+    def get_buffer(self, sizehint: int) -> memoryview:
+        if self._start and len(self._buffer) - self._end < 4096:
+            size = self._end - self._start
+            self._buffer[:size] = self._buffer[self._start:self._end]
+            self._start, self._end = 0, size
+        return self._view[self._end:]
+
+    def buffer_updated(self, nbytes: int) -> None:
+        self._end += nbytes
+        self._parse()
+        if self._start == self._end:
+            self._start = self._end = 0
+        elif self._start == 0 and self._end == len(self._buffer):
+            # No complete frame fits into the buffer: drop what has been received so far, and
+            # the rest of the line with it
+            self.errors += 1
+            self._start = self._end = 0
+            self._discarding = True
+
+    def eof_received(self) -> Optional[bool]:
+        if self._start < self._end and not self._discarding:
+            self.frames += 1
+            self.handler(self.decode(self._view[self._start:self._end]))
+            self._start = self._end = 0
+        return None
+
+    def _parse(self) -> None:
+        buffer, view, end, handler = self._buffer, self._view, self._end, self.handler
+        decode = self.decode
+        start = self._start
+        if self._discarding:
+            stop = buffer.find(b'\n', start, end)
+            if stop < 0:
+                self._start = end
+                return
+            self._discarding = False
+            start = stop + 1
+        while start < end:
+            space = self._octets(start)
+            if space is None:
+                break
+            if space:
+                length = int(buffer[start:space])
+                if length > self.max_size:
+                    self._error()
+                    return
+                stop = space + 1 + length
+                if stop > end:
+                    break
+                self.frames += 1
+                handler(decode(view[space + 1:stop]))
+                start = stop
+            else:
+                stop = buffer.find(b'\n', start, end)
+                if stop < 0:
+                    break
+                if stop > start:
+                    self.frames += 1
+                    handler(decode(view[start:stop]))
+                start = stop + 1
+        self._start = start
+
+    # The space after the MSG-LEN of an octet-counted frame at `start`, 0 for a line, None when
+    # that cannot be told until more is received
+    def _octets(self, start: int) -> Optional[int]:
+        buffer, end = self._buffer, self._end
+        if buffer[start] not in _DIGITS or buffer[start] == 0x30:
+            return 0
+        index, last = start + 1, min(end, start + _LENGTH_DIGITS + 1)
+        while index < last and buffer[index] in _DIGITS:
+            index += 1
+        if index - start > _LENGTH_DIGITS:
+            return 0
+        if index == end:
+            return None
+        return index if buffer[index] == 0x20 else 0
+
+    def _error(self) -> None:
+        self.errors += 1
+        self._start = self._end = 0
+        if self.transport is not None:
+            self.transport.close()
+
+
+# TCP connections can be paused while downstream queues are full, so that the backlog stays in
+# the kernel and the senders' buffers; UDP has no such backpressure and is never paused.
+# Messages are passed on as str, or with `binary` as the bytes received. Datagrams received on
+# `gelf_port` are passed to `gelf` as they are, see `src.gelf.Gelf`.
+class Listener:
+    def __init__(
+        self,
+        handler: Handler,
+        host: str = '0.0.0.0',
+        udp_port: Optional[int] = 514,
+        tcp_port: Optional[int] = 514,
+        binary: bool = False,
+        gelf_port: Optional[int] = None,
+        gelf: Optional[Handler] = None,
+    ) -> None:
+        self.handler = handler
+        self.host = host
+        self.udp_port = udp_port
+        self.tcp_port = tcp_port
+        self.binary = binary
+        self.gelf_port = gelf_port
+        self.gelf = gelf
+        self.reader: Optional[DatagramReader] = None
+        self.gelf_reader: Optional[DatagramReader] = None
+        self.server: Optional[asyncio.Server] = None
+        self.connections: Set[StreamProtocol] = set()
+        self.paused = False
+
+    @property
+    def udp_address(self) -> Optional[Tuple[str, int]]:
+        return self.reader.sock.getsockname() if self.reader is not None else None
+
+    @property
+    def gelf_address(self) -> Optional[Tuple[str, int]]:
+        return self.gelf_reader.sock.getsockname() if self.gelf_reader is not None else None
+
+    @property
+    def tcp_address(self) -> Optional[Tuple[str, int]]:
+        return self.server.sockets[0].getsockname() if self.server is not None else None
+
+    async def start(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self.udp_port is not None:
+            self.reader = DatagramReader(
+                self._bind(self.udp_port), self.handler, loop=loop, binary=self.binary,
+            )
+        if self.gelf_port is not None and self.gelf is not None:
+            self.gelf_reader = DatagramReader(
+                self._bind(self.gelf_port), self.gelf, loop=loop, decode=bytes,
+            )
+        if self.tcp_port is not None:
+            self.server = await loop.create_server(
+                lambda: StreamProtocol(self.handler, listener=self, binary=self.binary),
+                self.host, self.tcp_port,
+            )
+
+    def pause_reading(self) -> None:
+        self.paused = True
+        for protocol in self.connections:
+            if protocol.transport is not None:
+                protocol.transport.pause_reading()
+
+    def resume_reading(self) -> None:
+        self.paused = False
+        for protocol in self.connections:
+            if protocol.transport is not None:
+                protocol.transport.resume_reading()
+
+    def close(self) -> None:
+        if self.reader is not None:
+            self.reader.close()
+        if self.gelf_reader is not None:
+            self.gelf_reader.close()
+        if self.server is not None:
+            self.server.close()
+
+    def _bind(self, port: int) -> socket.socket:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * 1024 * 1024)
+        sock.bind((self.host, port))
+        return sock
+
+    async def wait_closed(self) -> None:
+        if self.server is not None:
+            await self.server.wait_closed()
@@ -0,0 +1,253 @@
+import asyncio
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List, Mapping, NamedTuple, Optional, Tuple, Union
+
+__all__ = (
+    'BUCKETS',
+    'Exporter',
+    'Histogram',
+    'Metrics',
+    'SlowLine',
+    'Stage',
+)
+
+PREFIX = 'docker_sentry_proxy_'
+
+# Upper bounds in seconds, from a fast regex match to a slow Sentry round trip
+BUCKETS = (
+    1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4,
+    1e-3, 2.5e-3, 5e-3, 1e-2, 2.5e-2, 5e-2, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+COUNTER = 'counter'
+GAUGE = 'gauge'
+
+Value = Union[int, float]
+Read = Callable[[], Union[Value, Mapping[str, Value]]]
+
+
+# A sampled line that took at least `Metrics.slow` seconds in `stage`, and the pattern that
+# took longest on it
+class SlowLine(NamedTuple):
+    stage: str
+    pattern: Optional[str]
+    seconds: float
+    line: str
+
+
+class _Collector(NamedTuple):
+    name: str
+    kind: str
+    help: str
+    label: Optional[str]
+    read: Read
+
+
+# Counts of observations per bucket of fixed upper bounds, not cumulative: an observation is
+# one bisect and two additions
+class Histogram:
+    __slots__ = ('bounds', 'counts', 'count', 'sum')
+
+    def __init__(self, bounds: Tuple[float, ...] = BUCKETS) -> None:
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    # Upper bound of the bucket the `quantile` falls in, inf beyond the last one
+    def quantile(self, quantile: float) -> float:
+        rank, seen = quantile * self.count, 0
+        for bound, count in zip((*self.bounds, float('inf')), self.counts):
+            seen += count
+            if count and seen >= rank:
+                return bound
+        return 0.0
+
+    def cumulative(self) -> List[Tuple[float, int]]:
+        result, seen = [], 0
+        for bound, count in zip((*self.bounds, float('inf')), self.counts):
+            seen += count
+            result.append((bound, seen))
+        return result
+
+
+# Latencies of one stage of a `Metrics`. Only every `sample`th call of a stage is timed, each
+# stage counting its own calls.
+class Stage:
+    __slots__ = ('name', 'metrics', 'histogram', '_countdown')
+
+    def __init__(self, name: str, metrics: 'Metrics') -> None:
+        self.name = name
+        self.metrics = metrics
+        self.histogram = Histogram()
+        self._countdown = metrics.sample
+
+    def sampled(self) -> bool:
+        self._countdown -= 1
+        if self._countdown:
+            return False
+        self._countdown = self.metrics.sample
+        return True
+
+    # `culprit` is called only for a slow line, to name the pattern that took longest on it
+    def observe(
+        self,
+        seconds: float,
+        line: Any = None,
+        culprit: Optional[Callable[[Any], Optional[str]]] = None,
+    ) -> None:
+        self.histogram.observe(seconds)
+        metrics = self.metrics
+        if metrics.slow is not None and seconds >= metrics.slow and line is not None:
+            metrics.flag(self.name, seconds, line, culprit)
+
+
+# Stage latencies and whatever counters the components already keep, read only when scraped or
+# snapshot so that the hot path pays for nothing but sampled timings. With an `on_slow` hook,
+# sampled lines that took `slow` seconds or more are reported with the pattern that took
+# longest on them.
+class Metrics:
+    def __init__(
+        self,
+        sample: int = 16,
+        slow: Optional[float] = None,
+        on_slow: Optional[Callable[[SlowLine], None]] = None,
+    ) -> None:
+        if sample < 1:
+            raise ValueError(f'Invalid sample rate: {sample}, expected 1 or more')
+        self.sample = sample
+        self.slow = slow
+        self.on_slow = on_slow
+        self.stages: Dict[str, Stage] = {}
+        self.slow_lines: Dict[str, int] = {}
+        self._collectors: List[_Collector] = []
+        self.counter(
+            'slow_lines_total', 'Sampled lines slower than the threshold, by slowest pattern',
+            'pattern', lambda: self.slow_lines,
+        )
+
+    def counter(self, name: str, help: str, label: Optional[str], read: Read) -> None:
+        self._collectors.append(_Collector(name, COUNTER, help, label, read))
+
+    def gauge(self, name: str, help: str, label: Optional[str], read: Read) -> None:
+        self._collectors.append(_Collector(name, GAUGE, help, label, read))
+
+    def stage(self, name: str) -> Stage:
+        result = self.stages.get(name)
+        if result is None:
+            result = self.stages[name] = Stage(name, self)
+        return result
+
+    def flag(
+        self,
+        stage: str,
+        seconds: float,
+        line: Any,
+        culprit: Optional[Callable[[Any], Optional[str]]] = None,
+    ) -> None:
+        pattern = culprit(line) if culprit is not None else None
+        self.slow_lines[pattern or ''] = self.slow_lines.get(pattern or '', 0) + 1
+        if self.on_slow is not None:
+            if not isinstance(line, str):
+                line = bytes(line).decode('utf-8', 'replace')
+            self.on_slow(SlowLine(stage, pattern, seconds, line))
+
+    # Everything at once, counters and gauges by name (and label), histograms by stage
+    def snapshot(self) -> Dict[str, Any]:
+        result: Dict[str, Any] = {
+            collector.name: _read(collector) for collector in self._collectors
+        }
+        result['stage_seconds'] = {
+            name: {
+                'count': stage.histogram.count,
+                'sum': stage.histogram.sum,
+                'p50': stage.histogram.quantile(0.5),
+                'p99': stage.histogram.quantile(0.99),
+                'buckets': dict(stage.histogram.cumulative()),
+            }
+            for name, stage in self.stages.items()
+        }
+        return result
+
+    # https://prometheus.io/docs/instrumenting/exposition_formats/#text-based-format
+    def render(self) -> str:
+        lines = []
+        for collector in self._collectors:
+            name = PREFIX + collector.name
+            lines.append(f'# HELP {name} {collector.help}')
+            lines.append(f'# TYPE {name} {collector.kind}')
+            value = _read(collector)
+            if isinstance(value, Mapping):
+                for key, item in sorted(value.items()):
+                    lines.append(f'{name}{{{collector.label}="{_escape(key)}"}} {item}')
+            else:
+                lines.append(f'{name} {value}')
+        name = PREFIX + 'stage_seconds'
+        lines.append(f'# HELP {name} Seconds per line or request of a stage, sampled')
+        lines.append(f'# TYPE {name} histogram')
+        for stage_name, stage in sorted(self.stages.items()):
+            histogram = stage.histogram
+            for bound, count in histogram.cumulative():
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f'{name}_bucket{{stage="{stage_name}",le="{le}"}} {count}')
+            lines.append(f'{name}_sum{{stage="{stage_name}"}} {histogram.sum}')
+            lines.append(f'{name}_count{{stage="{stage_name}"}} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+
+def _read(collector: _Collector) -> Union[Value, Dict[str, Value]]:
+    value = collector.read()
+    return dict(value) if isinstance(value, Mapping) else value
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+# Serves `Metrics.render` on GET /metrics, one request per connection
+class Exporter:
+    def __init__(self, metrics: Metrics, host: str = '0.0.0.0', port: int = 9090) -> None:
+        self.metrics = metrics
+        self.host = host
+        self.port = port
+        self.scrapes = 0
+        self.server: Optional[asyncio.Server] = None
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        assert self.server is not None, 'Not started'
+        return self.server.sockets[0].getsockname()[:2]
+
+    async def start(self) -> None:
+        self.server = await asyncio.start_server(self._handle, self.host, self.port)
+
+    async def close(self) -> None:
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), 5.0)
+            while (await asyncio.wait_for(reader.readline(), 5.0)) not in (b'\r\n', b'\n', b''):
+                pass
+            parts = request_line.split()
+            if len(parts) >= 2 and parts[0] == b'GET' and parts[1].split(b'?')[0] == b'/metrics':
+                self.scrapes += 1
+                status, body = b'200 OK', self.metrics.render().encode()
+            else:
+                status, body = b'404 Not Found', b'Not found\n'
+            writer.write(
+                b'HTTP/1.1 %s\r\nContent-Type: text/plain; version=0.0.4; charset=utf-8\r\n'
+                b'Content-Length: %d\r\nConnection: close\r\n\r\n%s' % (status, len(body), body)
+            )
+            await writer.drain()
+        except (ConnectionError, asyncio.TimeoutError):
+            pass
+        finally:
+            writer.close()
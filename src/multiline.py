@@ -0,0 +1,164 @@
+import time
+from collections import OrderedDict
+from typing import Callable, Hashable, List, Optional
+
+from src.pipeline import Event
+from src.wheel import TimerWheel
+
+__all__ = (
+    'Assembler',
+    'stream_key',
+)
+
+
+# Docker's lines are keyed by container, those of other senders by HOSTNAME and APP-NAME; PROCID
+# tells apart processes writing to the same stream
+def stream_key(event: Event) -> Hashable:
+    header = event.envelope
+    return (
+        header.group('container_id') or f'{header.group("hostname")} {header.group("appname")}',
+        header.group('proc_id'),
+    )
+
+
+class _Stream:
+    __slots__ = ('key', 'head', 'priority', 'lines', 'size', 'last')
+
+    def __init__(self, key: Hashable, head: Event, size: int, now: float) -> None:
+        self.key = key
+        self.head = head
+        self.priority = head.priority
+        self.lines: List[str] = []
+        self.size = size
+        self.last = now
+
+
+# Continuation lines of multi-line errors (stack traces, MariaDB's wrapped messages) reach us as
+# separate messages that no inner format matches. Every event an inner format matched is held
+# back as the head of its stream, and the following events of that stream that have the same
+# <PRI> and match no inner format are attached to it as `continuation`. The head is passed on
+# with its continuation lines when the next head of the stream arrives, when it has `max_lines`
+# lines or `max_bytes`, or after `idle` seconds without a line; a line that does not fit any
+# more starts a new event. All held events together take at most `max_memory` bytes, beyond
+# which the least recently active stream is passed on. Idle streams are found with one timer
+# wheel, whatever the number of streams, see `expire`. Events received with their continuation
+# lines, see `src.pipeline.Continued`, are complete: they are passed on as they are.
+class Assembler:
+    def __init__(
+        self,
+        consumer: Callable[[Event], None],
+        max_lines: int = 500,
+        max_bytes: int = 65536,
+        idle: float = 0.5,
+        max_memory: int = 64 * 1024 * 1024,
+        tick: float = 0.1,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.consumer = consumer
+        self.max_lines = max_lines
+        self.max_bytes = max_bytes
+        self.idle = idle
+        self.max_memory = max_memory
+        self.clock = clock
+        self.size = 0
+        self.events = 0
+        self.continued = 0
+        self.split = 0
+        self.expired = 0
+        self.evicted = 0
+        self._streams: 'OrderedDict[Hashable, _Stream]' = OrderedDict()
+        self._wheel: TimerWheel[_Stream] = TimerWheel(tick, now=clock())
+        self._next_tick = self._wheel.next_tick
+
+    def __len__(self) -> int:
+        return len(self._streams)
+
+    def __call__(self, event: Event) -> None:
+        now = self.clock()
+        if now >= self._next_tick:
+            self.expire(now)
+        key = stream_key(event)
+        stream = self._streams.get(key)
+        if event.continuation:
+            if stream is not None:
+                self._emit(self._streams.pop(key))
+            self._pass(event)
+            return
+        if stream is not None and event.inner is None and event.priority == stream.priority:
+            message = event.message or ''
+            if len(stream.lines) + 1 < self.max_lines and (
+                stream.size + len(message) <= self.max_bytes
+            ):
+                stream.lines.append(message)
+                stream.size += len(message)
+                stream.last = now
+                self.size += len(message)
+                self.continued += 1
+                self._streams.move_to_end(key)
+                self._evict()
+                return
+            self.split += 1
+            self._replace(stream, event, now)
+        elif stream is not None:
+            if event.inner is None:
+                self._emit(self._streams.pop(key))
+                self._pass(event)
+                return
+            self._replace(stream, event, now)
+        elif event.inner is None:
+            self._pass(event)
+            return
+        else:
+            stream = _Stream(key, event, len(event.line), now)
+            self._streams[key] = stream
+            self.size += stream.size
+            self._wheel.schedule(stream, now + self.idle)
+        self._streams.move_to_end(key)
+        self._evict()
+
+    # Passes on the streams idle for `idle` seconds; called for every line, and should also be
+    # called periodically so that the last events are not held while nothing is received
+    def expire(self, now: Optional[float] = None) -> int:
+        if now is None:
+            now = self.clock()
+        count = 0
+        for stream in self._wheel.advance(now):
+            if self._streams.get(stream.key) is not stream:
+                continue
+            deadline = stream.last + self.idle
+            if deadline > now:
+                self._wheel.schedule(stream, deadline)
+                continue
+            del self._streams[stream.key]
+            self._emit(stream)
+            count += 1
+        self.expired += count
+        self._next_tick = self._wheel.next_tick
+        return count
+
+    def flush(self) -> None:
+        while self._streams:
+            self._emit(self._streams.popitem(last=False)[1])
+
+    def _replace(self, stream: _Stream, head: Event, now: float) -> None:
+        self._emit(stream)
+        stream.head = head
+        stream.priority = head.priority
+        stream.lines = []
+        stream.size = len(head.line)
+        stream.last = now
+        self.size += stream.size
+
+    def _evict(self) -> None:
+        while self.size > self.max_memory and self._streams:
+            self.evicted += 1
+            self._emit(self._streams.popitem(last=False)[1])
+
+    def _emit(self, stream: _Stream) -> None:
+        self.size -= stream.size
+        stream.head.continuation = stream.lines
+        self._pass(stream.head)
+
+    def _pass(self, event: Event) -> None:
+        self.events += 1
+        self.consumer(event)
@@ -0,0 +1,324 @@
+import re
+import time
+from typing import Any, Callable, Dict, Generic, Optional, Sequence, TypeVar, Union
+
+from src import as_bytes, get_regex
+from src.cache import LRUCache
+from src.classifier import Classifier
+from src.metrics import Metrics
+from src.record import Decoded, Record, record_type
+from src.syslog.guard import well_formed, well_formed_bytes
+from src.syslog.regex import RFC5424
+from src.syslog.structured_data import StructuredData, parse_structured_data
+
+__all__ = (
+    'BytesPipeline',
+    'Continued',
+    'ContinuedBytes',
+    'Event',
+    'Pipeline',
+)
+
+_UNPARSED = object()
+
+Line = TypeVar('Line', str, bytes)
+
+# Longer lines are not parsed at all, whatever they contain
+MAX_PARSE_LENGTH = 8192
+
+
+# A line received together with the following lines of its event, e.g. a multi-line GELF
+# message: they become the event's `continuation` as they are, whatever `src.multiline` does
+class Continued(str):
+    continuation: Sequence[str] = ()
+
+
+class ContinuedBytes(bytes):
+    continuation: Sequence[str] = ()
+
+
+# https://tools.ietf.org/html/rfc5424#section-6.2.1
+# The syslog envelope is parsed once; MESSAGE is kept as a span of the line and the inner
+# application format is matched only on first access of `inner`. Messages of the following lines
+# that belong to the same event are kept in `continuation`, see `src.multiline` and `Continued`.
+class Event:
+    __slots__ = ('line', 'envelope', 'classifier', 'continuation', '_inner', '_structured_data')
+
+    def __init__(
+        self,
+        line: Union[str, bytes],
+        envelope: Record,
+        classifier: Optional[Classifier],
+        inner: Any = _UNPARSED,
+    ) -> None:
+        self.line = line
+        self.envelope = envelope
+        self.classifier = classifier
+        self.continuation: Sequence[str] = (
+            line.continuation if isinstance(line, (Continued, ContinuedBytes)) else ()
+        )
+        self._inner = inner
+        self._structured_data: Optional[StructuredData] = None
+
+    @property
+    def priority(self) -> int:
+        return int(self.envelope.group('severity'))
+
+    @property
+    def severity(self) -> int:
+        return self.priority & 7
+
+    @property
+    def facility(self) -> int:
+        return self.priority >> 3
+
+    @property
+    def container_id(self) -> Optional[str]:
+        return self.envelope.group('container_id')
+
+    # Tokenized on first access, for the payload and the filters alike
+    @property
+    def structured_data(self) -> StructuredData:
+        if self._structured_data is None:
+            value = getattr(self.envelope, 'structured_data', None)
+            try:
+                self._structured_data = parse_structured_data(value) if value else {}
+            except ValueError:
+                self._structured_data = {}
+        return self._structured_data
+
+    @property
+    def message(self) -> Optional[str]:
+        return self.envelope.group('message')
+
+    @property
+    def inner(self) -> Optional[Record]:
+        if self._inner is _UNPARSED:
+            message = self.message
+            if message is None or self.classifier is None:
+                self._inner = None
+            else:
+                self._inner = self.classifier.match(message, self.container_id)
+        return self._inner
+
+    # As printed to stdout as JSON lines when there is no Sentry DSN
+    def asdict(self) -> Dict[str, Any]:
+        inner = self.inner
+        return {
+            **self.envelope.asdict(),
+            'inner': {'format': inner.FORMAT, **inner.asdict()} if inner is not None else None,
+            'continuation': list(self.continuation),
+        }
+
+
+# Only events at least as severe as `severity` can have their inner format parsed, less severe
+# events reach the consumer with `inner` set to None and never pay for the second match.
+# Lines longer than `max_length` or failing the linear `prevalidate` check are never given to
+# the regular expressions, which could backtrack on them for seconds; these lines, like those
+# the envelope does not match, are counted as unparsed and passed to `fallback` as they are.
+# With `metrics`, sampled lines are timed as the "parse" stage, up to the consumer.
+class _Pipeline(Generic[Line]):
+    def __init__(
+        self,
+        consumer: Callable[[Event], None],
+        classifier: Optional[Classifier],
+        envelope: re.Pattern,
+        severity: int,
+        max_length: int,
+        prevalidate: Optional[Callable[[Line], bool]],
+        fallback: Optional[Callable[[str], None]],
+        metrics: Optional[Metrics],
+    ) -> None:
+        self.consumer = consumer
+        self.classifier = classifier
+        self.envelope = envelope
+        names = {item: name for name, item in get_regex()}
+        self._envelope = record_type(names.get(envelope, 'ENVELOPE'), envelope)
+        self.severity = severity
+        self.max_length = max_length
+        self.prevalidate: Optional[Callable[[Line], bool]] = prevalidate
+        self.fallback = fallback
+        self.parsed = 0
+        self.unparsed = 0
+        self.rejected = 0
+        self._stage = metrics.stage('parse') if metrics is not None else None
+
+    # Lines matched by the envelope and by every inner format, see `Classifier.hits`
+    @property
+    def hits(self) -> Dict[str, int]:
+        result = {self._envelope.FORMAT: self.parsed}
+        if self.classifier is not None:
+            result.update(self.classifier.hits)
+        return result
+
+    # The envelope is the only pattern run on a line before the consumer
+    def _culprit(self, line: Any) -> Optional[str]:
+        return self._envelope.FORMAT
+
+
+# Lines are matched as str, see `BytesPipeline` for bytes
+class Pipeline(_Pipeline[str]):
+    def __init__(
+        self,
+        consumer: Callable[[Event], None],
+        classifier: Optional[Classifier] = None,
+        envelope: re.Pattern = RFC5424,
+        severity: int = 7,
+        max_length: int = MAX_PARSE_LENGTH,
+        prevalidate: Optional[Callable[[str], bool]] = None,
+        fallback: Optional[Callable[[str], None]] = None,
+        metrics: Optional[Metrics] = None,
+    ) -> None:
+        super().__init__(
+            consumer, classifier, envelope, severity, max_length, prevalidate, fallback, metrics,
+        )
+
+    @classmethod
+    def from_registry(
+        cls,
+        consumer: Callable[[Event], None],
+        severity: int = 7,
+        cache: Optional[LRUCache] = None,
+        max_length: int = MAX_PARSE_LENGTH,
+        fallback: Optional[Callable[[str], None]] = None,
+        metrics: Optional[Metrics] = None,
+    ) -> 'Pipeline':
+        classifier = Classifier(
+            ((name, item) for name, item in get_regex() if item is not RFC5424),
+            cache,
+            metrics,
+        )
+        return cls(
+            consumer, classifier, RFC5424, severity, max_length, well_formed, fallback, metrics,
+        )
+
+    def __call__(self, line: str) -> None:
+        stage = self._stage
+        if stage is not None and stage.sampled():
+            started = time.perf_counter()
+            event = self._parse(line)
+            stage.observe(time.perf_counter() - started, line, self._culprit)
+        else:
+            event = self._parse(line)
+        if event is not None:
+            self.consumer(event)
+        elif self.fallback is not None:
+            self.fallback(line)
+
+    def _parse(self, line: str) -> Optional[Event]:
+        if len(line) > self.max_length or (
+            self.prevalidate is not None and not self.prevalidate(line)
+        ):
+            self.rejected += 1
+            self.unparsed += 1
+            return None
+        match = self.envelope.match(line)
+        if match is None:
+            self.unparsed += 1
+            return None
+        self.parsed += 1
+        severe = int(match.group('severity')) & 7 <= self.severity
+        return Event(line, self._envelope(match), self.classifier if severe else None)
+
+
+# Lines are matched as bytes, as received, and only the fields that are read are decoded, see
+# `src.record.Decoded`; `errors` is the policy for invalid UTF-8 of `bytes.decode`. With
+# "strict", lines that are not valid UTF-8 are not parsed at all but passed to `fallback`, like
+# every line not parsed, decoded with replacement characters; only lines the envelope matched
+# and that are not all ASCII are checked, the others are rejected or sliced as they are anyway.
+# A memoryview is copied (never decoded) first, as events outlive the buffer it was received
+# into. Inner formats are matched on the decoded MESSAGE, which is forwarded anyway: matching
+# them as bytes and decoding every field sent on is slower, see `benchmarks.bytes`.
+class BytesPipeline(_Pipeline[bytes]):
+    def __init__(
+        self,
+        consumer: Callable[[Event], None],
+        classifier: Optional[Classifier] = None,
+        envelope: re.Pattern = as_bytes(RFC5424),
+        severity: int = 7,
+        max_length: int = MAX_PARSE_LENGTH,
+        prevalidate: Optional[Callable[[bytes], bool]] = None,
+        fallback: Optional[Callable[[str], None]] = None,
+        errors: str = 'replace',
+        metrics: Optional[Metrics] = None,
+    ) -> None:
+        super().__init__(
+            consumer, classifier, envelope, severity, max_length, prevalidate, fallback, metrics,
+        )
+        names = {as_bytes(item): name for name, item in get_regex()}
+        self._envelope = record_type(names.get(envelope, 'ENVELOPE'), envelope)
+        self.errors = errors
+
+    @classmethod
+    def from_registry(
+        cls,
+        consumer: Callable[[Event], None],
+        severity: int = 7,
+        cache: Optional[LRUCache] = None,
+        max_length: int = MAX_PARSE_LENGTH,
+        fallback: Optional[Callable[[str], None]] = None,
+        errors: str = 'replace',
+        metrics: Optional[Metrics] = None,
+    ) -> 'BytesPipeline':
+        classifier = Classifier(
+            ((name, item) for name, item in get_regex() if item is not RFC5424),
+            cache,
+            metrics,
+        )
+        return cls(
+            consumer, classifier, as_bytes(RFC5424), severity, max_length, well_formed_bytes,
+            fallback, errors, metrics,
+        )
+
+    def __call__(self, line: Union[bytes, memoryview]) -> None:
+        if not isinstance(line, bytes):
+            line = bytes(line)
+        stage = self._stage
+        if stage is not None and stage.sampled():
+            started = time.perf_counter()
+            event = self._parse(line)
+            stage.observe(time.perf_counter() - started, line, self._culprit)
+        else:
+            event = self._parse(line)
+        if event is not None:
+            self.consumer(event)
+        elif self.fallback is not None:
+            text = line.decode('utf-8', 'replace')
+            if isinstance(line, ContinuedBytes):
+                continued = Continued(text)
+                continued.continuation = line.continuation
+                text = continued
+            self.fallback(text)
+
+    def _parse(self, line: bytes) -> Optional[Event]:
+        if len(line) > self.max_length or (
+            self.prevalidate is not None and not self.prevalidate(line)
+        ):
+            self.rejected += 1
+            self.unparsed += 1
+            return None
+        match = self.envelope.match(line)
+        if match is None:
+            self.unparsed += 1
+            return None
+        if self.errors == 'strict' and not _utf8(line):
+            self.rejected += 1
+            self.unparsed += 1
+            return None
+        self.parsed += 1
+        severe = int(match.group('severity')) & 7 <= self.severity
+        return Event(
+            line,
+            self._envelope(Decoded(match, self.errors)),
+            self.classifier if severe else None,
+        )
+
+
+def _utf8(line: bytes) -> bool:
+    if line.isascii():
+        return True
+    try:
+        line.decode('utf-8')
+    except UnicodeDecodeError:
+        return False
+    return True
@@ -0,0 +1,214 @@
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, NamedTuple, Optional, Tuple
+
+from src.aggregate import template
+from src.syslog.filter import CONTAINER, IMAGE, image_names
+
+__all__ = (
+    'Limit',
+    'RateLimiter',
+)
+
+FORMAT = 'format'
+SEVERITY = 'severity'
+ANY = '*'
+
+Payload = Dict[str, Any]
+
+
+# "KIND:NAME=COUNT/SECONDS": at most COUNT events, at once or spread over SECONDS, of the
+# container (by name, full or short id), image (by name, with or without its tag), inner format
+# or syslog severity (0..7, tagged by `src.sentry.payload`) NAME; "*=COUNT/SECONDS" applies to
+# every event
+class Limit(NamedTuple):
+    kind: str
+    name: str
+    events: int
+    period: float
+
+    @classmethod
+    def parse(cls, value: str) -> 'Limit':
+        target, _, rate = value.rpartition('=')
+        count, _, period = rate.partition('/')
+        kind, _, name = target.partition(':')
+        error = ValueError(
+            'Invalid rate limit, expected "container|image|format|severity:NAME=COUNT/SECONDS"'
+            f' or "*=COUNT/SECONDS": {value!r}'
+        )
+        try:
+            result = cls(kind, name, int(count), float(period))
+        except ValueError:
+            raise error from None
+        valid = result.events > 0 and result.period > 0 and (
+            (kind == ANY and not name)
+            or (kind in (CONTAINER, IMAGE, FORMAT) and name)
+            or (kind == SEVERITY and name in tuple('01234567'))
+        )
+        if not valid:
+            raise error
+        return result
+
+    def __str__(self) -> str:
+        return self.kind if self.kind == ANY else f'{self.kind}:{self.name}'
+
+    def matches(self, event: Payload) -> bool:
+        if self.kind == ANY:
+            return True
+        tags = event.get('tags', {})
+        if self.kind == SEVERITY:
+            return self.name == tags.get('severity')
+        if self.kind == CONTAINER:
+            container_id = tags.get('container_id') or ''
+            return self.name in (tags.get('container_name'), container_id, container_id[:12])
+        if self.kind == IMAGE:
+            return self.name in image_names(tags.get('image_name') or '')
+        return self.name == tags.get('format')
+
+
+class _Suppressed:
+    __slots__ = ('event', 'count', 'first_seen', 'last_seen', 'opened')
+
+    def __init__(self, event: Payload, seen: float, opened: float) -> None:
+        self.event = event
+        self.count = 1
+        self.first_seen = self.last_seen = seen
+        self.opened = opened
+
+
+# Token buckets of COUNT tokens refilled over SECONDS (see `Limit`): an event of a container goes
+# through the bucket of that container and of the first of `limits` matching it, and through the
+# bucket of that container, its fingerprint (format, level and message template, or the
+# fingerprint of an aggregated event) and the first of `fingerprint_limits` matching it, and is
+# sent on only if both have a token. A bucket is a single float, the time at which it will be
+# full again (GCRA), kept in the order it was last used: buckets full again are idle and evicted
+# from the front, and beyond `maxsize` the least recently used ones are. Events dropped by a
+# bucket are counted, per limit and container, into one "N events suppressed" event sent
+# `window` seconds after the first of them, or earlier for the oldest beyond `maxsize` of them.
+class RateLimiter:
+    def __init__(
+        self,
+        consumer: Callable[[Payload], object],
+        limits: Iterable[Limit] = (),
+        fingerprint_limits: Iterable[Limit] = (),
+        window: float = 60.0,
+        maxsize: int = 100000,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.consumer = consumer
+        self.limits = tuple(limits)
+        self.fingerprint_limits = tuple(fingerprint_limits)
+        self.window = window
+        self.maxsize = maxsize
+        self.clock = clock
+        self.passed = 0
+        self.suppressed = 0
+        self.summaries = 0
+        self.evicted = 0
+        self._buckets: 'OrderedDict[Hashable, float]' = OrderedDict()
+        self._suppressed: 'OrderedDict[Tuple[Limit, Any], _Suppressed]' = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def __call__(self, event: Payload) -> None:
+        now = self.clock()
+        self.expire(now)
+        tags = event.get('tags', {})
+        container = tags.get('container_id') or tags.get('container_name')
+        updates = []
+        for group, limits in enumerate((self.limits, self.fingerprint_limits)):
+            for index, limit in enumerate(limits):
+                if limit.matches(event):
+                    break
+            else:
+                continue
+            # Limits are hashed into keys by their index, a NamedTuple would be hashed field by
+            # field for every event
+            key: Tuple[Any, ...] = (group, index, container)
+            if group:
+                key += (_fingerprint(event),)
+            full = self._buckets.get(key, now)
+            interval = limit.period / limit.events
+            # Empty: the next token is refilled `interval` seconds before the bucket is full
+            if full - now > limit.period - interval:
+                self._suppress(limit, container, event, now)
+                return
+            updates.append((key, max(full, now) + interval))
+        for key, full in updates:
+            self._buckets[key] = full
+            self._buckets.move_to_end(key)
+        while len(self._buckets) > self.maxsize:
+            self._buckets.popitem(last=False)
+            self.evicted += 1
+        self.passed += 1
+        self.consumer(event)
+
+    def expire(self, now: Optional[float] = None) -> int:
+        if now is None:
+            now = self.clock()
+        buckets = self._buckets
+        while buckets:
+            key, full = next(iter(buckets.items()))
+            if full > now:
+                break
+            del buckets[key]
+            self.evicted += 1
+        count = 0
+        suppressed = self._suppressed
+        while suppressed:
+            item = next(iter(suppressed.items()))
+            if item[1].opened + self.window > now:
+                break
+            del suppressed[item[0]]
+            self._emit(item)
+            count += 1
+        return count
+
+    def flush(self) -> None:
+        while self._suppressed:
+            self._emit(self._suppressed.popitem(last=False))
+
+    def _suppress(self, limit: Limit, container: Any, event: Payload, now: float) -> None:
+        self.suppressed += 1
+        seen = event.get('timestamp', 0.0)
+        suppressed = self._suppressed
+        item = suppressed.get((limit, container))
+        if item is None:
+            suppressed[limit, container] = _Suppressed(event, seen, now)
+            while len(suppressed) > self.maxsize:
+                self._emit(suppressed.popitem(last=False))
+            return
+        item.count += 1
+        item.first_seen = min(item.first_seen, seen)
+        item.last_seen = max(item.last_seen, seen)
+
+    def _emit(self, item: Tuple[Tuple[Limit, Any], _Suppressed]) -> None:
+        (limit, _), suppressed = item
+        event = suppressed.event
+        self.summaries += 1
+        self.consumer({
+            'timestamp': suppressed.last_seen or time.time(),
+            'level': 'warning',
+            'logger': event.get('logger'),
+            'server_name': event.get('server_name'),
+            'platform': 'other',
+            'message': {
+                'formatted': f'{suppressed.count} events suppressed by rate limit {limit}',
+            },
+            'tags': {**event.get('tags', {}), 'rate_limit': str(limit)},
+            'extra': {
+                'suppressed': suppressed.count,
+                'first_seen': suppressed.first_seen,
+                'last_seen': suppressed.last_seen,
+                'example': event.get('message', {}).get('formatted'),
+            },
+        })
+
+
+def _fingerprint(event: Payload) -> Hashable:
+    fingerprint = event.get('fingerprint')
+    if fingerprint:
+        return tuple(fingerprint)
+    message = event.get('message', {}).get('formatted') or ''
+    return event.get('tags', {}).get('format'), event.get('level'), template(message)
@@ -0,0 +1,183 @@
+import re
+from typing import Any, Dict, Optional, Sequence, Tuple, Type, Union
+
+from src import Route, get_routes
+
+__all__ = (
+    'Decoded',
+    'Matched',
+    'Record',
+    'Spans',
+    'record_type',
+)
+
+Regs = Tuple[Tuple[int, int], ...]
+# What a record reads its groups from
+Matched = Union[re.Match, 'Spans', 'Decoded']
+
+__TYPES: Dict[Tuple[str, re.Pattern], Type['Record']] = {}
+
+
+# A record keeps only the match object: every named group of the pattern is a read-only
+# attribute that slices its string out of the matched line when it is read, not before.
+class Record:
+    __slots__ = ('_match',)
+
+    FORMAT: str = ''
+    FIELDS: Tuple[str, ...] = ()
+    INDEXES: Tuple[int, ...] = ()
+    PATTERN: re.Pattern
+    ROUTES: Tuple[Route, ...] = ()
+
+    def __init__(self, match: Matched) -> None:
+        self._match = match
+
+    def __repr__(self) -> str:
+        return f'<{type(self).__name__} {self.FORMAT} {self._match.group()!r}>'
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Record):
+            return NotImplemented
+        return self.FORMAT == other.FORMAT and self.astuple() == other.astuple()
+
+    def astuple(self) -> Tuple[Optional[str], ...]:
+        if len(self.INDEXES) > 1:
+            return self._match.group(*self.INDEXES)
+        return tuple(self._match.group(index) for index in self.INDEXES)
+
+    def asdict(self) -> Dict[str, Optional[str]]:
+        return self._match.groupdict()
+
+    # Values of the groups routed to every context, see `src.get_routes`; contexts without any
+    # value are left out
+    def contexts(self) -> Dict[str, Dict[str, str]]:
+        result = {}
+        group = self._match.group
+        for name, indexes, keys in self.ROUTES:
+            values = group(*indexes) if len(indexes) > 1 else (group(indexes[0]),)
+            context = {key: value for key, value in zip(keys, values) if value is not None}
+            if context:
+                result[name] = context
+        return result
+
+    def group(self, *indexes: Union[int, str]) -> Any:
+        return self._match.group(*indexes)
+
+    def span(self, field: str) -> Tuple[int, int]:
+        return self._match.span(field)
+
+    @property
+    def regs(self) -> Regs:
+        return self._match.regs
+
+
+# Stands in for the `re.Match` of a record matched somewhere else, e.g. in another process:
+# only the string and the flat (start, end) pairs of `re.Match.regs`, from `offset` on, are kept.
+class Spans:
+    __slots__ = ('re', 'string', 'spans', 'offset')
+
+    def __init__(
+        self,
+        pattern: re.Pattern,
+        string: str,
+        spans: Sequence[int],
+        offset: int = 0,
+    ) -> None:
+        self.re = pattern
+        self.string = string
+        self.spans = spans
+        self.offset = offset
+
+    def group(self, *indexes: Union[int, str]) -> Any:
+        if len(indexes) > 1:
+            return tuple(self._group(index) for index in indexes)
+        return self._group(indexes[0] if indexes else 0)
+
+    def groupdict(self) -> Dict[str, Optional[str]]:
+        return {key: self._group(index) for key, index in self.re.groupindex.items()}
+
+    def span(self, index: Union[int, str] = 0) -> Tuple[int, int]:
+        if isinstance(index, str):
+            index = self.re.groupindex[index]
+        offset = self.offset + 2 * index
+        return self.spans[offset], self.spans[offset + 1]
+
+    @property
+    def regs(self) -> Regs:
+        return tuple(self.span(index) for index in range(self.re.groups + 1))
+
+    def _group(self, index: Union[int, str]) -> Optional[str]:
+        start, end = self.span(index)
+        return self.string[start:end] if start >= 0 else None
+
+
+# Stands in for the `re.Match` of a bytes pattern: groups are decoded from UTF-8 when read, with
+# `errors` handling invalid bytes as in `bytes.decode`; spans stay in bytes. An ASCII line is
+# decoded as a whole on the first read, a copy in CPython, and its groups sliced out of that.
+class Decoded:
+    __slots__ = ('match', 'errors', '_text')
+
+    def __init__(self, match: re.Match, errors: str = 'replace') -> None:
+        self.match = match
+        self.errors = errors
+        self._text: Optional[str] = None
+
+    @property
+    def re(self) -> re.Pattern:
+        return self.match.re
+
+    @property
+    def string(self) -> bytes:
+        return self.match.string
+
+    @property
+    def regs(self) -> Regs:
+        return self.match.regs
+
+    def group(self, *indexes: Union[int, str]) -> Any:
+        if len(indexes) > 1:
+            return tuple(self._group(index) for index in indexes)
+        return self._group(indexes[0] if indexes else 0)
+
+    def groupdict(self) -> Dict[str, Optional[str]]:
+        return {key: self._group(index) for key, index in self.match.re.groupindex.items()}
+
+    def span(self, index: Union[int, str] = 0) -> Tuple[int, int]:
+        return self.match.span(index)
+
+    def _group(self, index: Union[int, str]) -> Optional[str]:
+        start, end = self.match.span(index)
+        if start < 0:
+            return None
+        text = self._text
+        if text is None:
+            string = self.match.string
+            # Empty when there is no ASCII text to slice groups out of
+            text = self._text = string.decode('ascii') if string.isascii() else ''
+        if text:
+            return text[start:end]
+        return self.match.string[start:end].decode('utf-8', self.errors)
+
+
+def _field(index: int) -> property:
+    return property(lambda self: self._match.group(index))
+
+
+def record_type(name: str, pattern: re.Pattern) -> Type[Record]:
+    try:
+        return __TYPES[name, pattern]
+    except KeyError:
+        pass
+    fields = tuple(sorted(pattern.groupindex, key=pattern.groupindex.__getitem__))
+    namespace: Dict[str, Any] = {key: _field(index) for key, index in pattern.groupindex.items()}
+    namespace.update(
+        __slots__=(),
+        FORMAT=name,
+        FIELDS=fields,
+        INDEXES=tuple(pattern.groupindex[key] for key in fields),
+        PATTERN=pattern,
+        ROUTES=get_routes(pattern),
+    )
+    result = type(f'{name.title().replace("_", "")}Record', (Record,), namespace)
+    __TYPES[name, pattern] = result
+    return result
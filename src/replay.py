@@ -0,0 +1,345 @@
+import argparse
+import asyncio
+import glob
+import json
+import mmap
+import os
+import socket
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Deque, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+import src.common_log_format  # noqa: F401
+import src.mariadb_mysql  # noqa: F401
+import src.nginx  # noqa: F401
+import src.syslog  # noqa: F401
+from src.multiline import Assembler
+from src.pipeline import MAX_PARSE_LENGTH, Event, Pipeline
+from src.sentry import Sender, payload, raw_payload
+from src.timestamp import Normalizer
+
+__all__ = (
+    'Chunk',
+    'Settings',
+    'chunks',
+    'container_tag',
+    'load_checkpoint',
+    'parse_chunk',
+    'save_checkpoint',
+    'to_syslog',
+)
+
+LOGS = '/var/lib/docker/containers/*/*-json.log'
+CHUNK_SIZE = 8 * 1024 * 1024
+# <PRI> of Docker's syslog logging driver: facility "daemon", stdout as info, stderr as err
+PRI = {'stdout': '<30>', 'stderr': '<27>'}
+
+# Contiguous bytes of every file already replayed, by path: (inode, offset)
+Checkpoint = Dict[str, Tuple[int, int]]
+
+
+# Bytes [start, end) of a json-file log, whole lines only; `appname` and `msgid` are those
+# Docker's syslog logging driver would have sent the container's lines with
+class Chunk(NamedTuple):
+    path: str
+    inode: int
+    start: int
+    end: int
+    appname: str
+    msgid: str
+
+
+class Settings(NamedTuple):
+    hostname: str
+    sentry: bool = False
+    severity: int = 7
+    max_length: int = MAX_PARSE_LENGTH
+    multiline_lines: int = 500
+    multiline_bytes: int = 65536
+
+
+# Docker's "DOCKER:{{.FullID}}~{{.Name}}~{{.ImageFullID}}~{{.ImageName}}~{{.DaemonName}}" MSGID
+# tag (see README), from the config.v2.json next to the log; a log copied without it keeps only
+# the container id found in its file name
+def container_tag(path: str) -> Tuple[str, str]:
+    container_id = os.path.basename(path).partition('-json.log')[0]
+    name = image_id = image = 'unknown'
+    try:
+        with open(os.path.join(os.path.dirname(path), 'config.v2.json'), 'rb') as file:
+            config = json.load(file)
+    except (OSError, ValueError):
+        pass
+    else:
+        container_id = config.get('ID') or container_id
+        name = config.get('Name', '').lstrip('/') or name
+        image_id = config.get('Image') or image_id
+        image = config.get('Config', {}).get('Image') or image
+    return container_id[:12], f'DOCKER:{container_id}~{name}~{image_id}~{image}~docker'
+
+
+# Docker splits lines longer than 16 KiB into several records, all but the last without the
+# trailing newline; chunks never end between them
+def _partial(line: bytes) -> bool:
+    try:
+        return not json.loads(line)['log'].endswith('\n')
+    except (ValueError, KeyError, TypeError, AttributeError):
+        return False
+
+
+def _line_start(data: mmap.mmap, start: int, end: int) -> int:
+    return data.rfind(b'\n', start, end - 1) + 1 or start
+
+
+# Cuts [start, end of file) of a mapped log into chunks of about `size` bytes, at newlines. The
+# last lines, not terminated yet or the first parts of a split line, are left for the next replay.
+def chunks(data: mmap.mmap, start: int = 0, size: int = CHUNK_SIZE) -> Iterator[Tuple[int, int]]:
+    length = len(data)
+    while start < length:
+        end = data.find(b'\n', min(start + size, length) - 1) + 1 or data.rfind(b'\n', start) + 1
+        forward = True
+        while end > start and _partial(data[_line_start(data, start, end):end]):
+            following = data.find(b'\n', end) + 1 if forward else 0
+            if following:
+                end = following
+            else:
+                forward = False
+                end = _line_start(data, start, end)
+        if end <= start:
+            return
+        yield start, end
+        start = end
+
+
+# RFC 3339 with nanoseconds, as Docker writes it, to at most the microseconds the syslog
+# envelope takes
+def _time(value: str) -> str:
+    head, dot, rest = value.partition('.')
+    if not dot:
+        return value
+    digits = len(rest) - len(rest.lstrip('0123456789'))
+    return f'{head}.{rest[:min(digits, 6)]}{rest[digits:]}'
+
+
+# One record of a json-file log as the line Docker's syslog logging driver ("rfc5424micro", with
+# the README's tag) would have sent, so that it goes through the same pipeline
+def to_syslog(record: Dict[str, Any], appname: str, msgid: str, hostname: str) -> str:
+    message = record['log'].rstrip('\r\n')
+    pri = PRI.get(record.get('stream') or 'stdout', PRI['stdout'])
+    return (
+        f'{pri}1 {_time(record["time"])} {hostname} '
+        f'{appname} - {msgid} -'
+    ) + (f' {message}' if message else '')
+
+
+class _Replayer:
+    def __init__(self, settings: Settings) -> None:
+        self.settings = settings
+        self.results: List[Any] = []
+        self.normalizer = Normalizer()
+        # Lines of the past: nothing is held for `idle` seconds, events are passed on when a
+        # limit is reached and at the end of every chunk
+        self.assembler = Assembler(
+            self._consume, settings.multiline_lines, settings.multiline_bytes, clock=lambda: 0.0,
+        )
+        self.pipeline = Pipeline.from_registry(
+            self.assembler, settings.severity, max_length=settings.max_length,
+            fallback=self._fallback,
+        )
+
+    def __call__(self, chunk: Chunk) -> Tuple[List[Any], int]:
+        with open(chunk.path, 'rb') as file, mmap.mmap(
+            file.fileno(), 0, access=mmap.ACCESS_READ,
+        ) as data:
+            lines = data[chunk.start:chunk.end].split(b'\n')
+        lines.pop()
+        hostname = self.settings.hostname
+        parts: List[str] = []
+        for line in lines:
+            try:
+                record = json.loads(line)
+                parts.append(record['log'])
+                if not record['log'].endswith('\n'):
+                    continue
+                if len(parts) > 1:
+                    record['log'] = ''.join(parts)
+                parts.clear()
+                self.pipeline(to_syslog(record, chunk.appname, chunk.msgid, hostname))
+            except (ValueError, KeyError, TypeError, AttributeError):
+                parts.clear()
+                self._fallback(line.decode('utf-8', 'replace'))
+        self.assembler.flush()
+        results, self.results = self.results, []
+        return results, len(lines)
+
+    def _consume(self, event: Event) -> None:
+        if self.settings.sentry:
+            self.results.append(payload(event, self.normalizer))
+        else:
+            self.results.append(json.dumps(event.asdict()))
+
+    def _fallback(self, line: str) -> None:
+        if self.settings.sentry:
+            self.results.append(raw_payload(line))
+        else:
+            self.results.append(json.dumps({'raw': line}))
+
+
+_REPLAYERS: Dict[Settings, _Replayer] = {}
+
+
+# Runs in the worker processes: Sentry payloads, or JSON lines, of a chunk and its line count
+def parse_chunk(chunk: Chunk, settings: Settings) -> Tuple[List[Any], int]:
+    replayer = _REPLAYERS.get(settings)
+    if replayer is None:
+        replayer = _REPLAYERS[settings] = _Replayer(settings)
+    return replayer(chunk)
+
+
+def load_checkpoint(path: Optional[str]) -> Checkpoint:
+    if not path:
+        return {}
+    try:
+        with open(path) as file:
+            return {key: (inode, offset) for key, (inode, offset) in json.load(file).items()}
+    except FileNotFoundError:
+        return {}
+
+
+def save_checkpoint(path: str, checkpoint: Checkpoint) -> None:
+    with open(f'{path}.tmp', 'w') as file:
+        json.dump(checkpoint, file)
+    os.replace(f'{path}.tmp', path)
+
+
+# A file rotated since the checkpoint (another inode at the same path) is replayed from the start
+def _chunks(paths: List[str], checkpoint: Checkpoint, size: int) -> Iterator[Chunk]:
+    for path in paths:
+        with open(path, 'rb') as file:
+            stat = os.fstat(file.fileno())
+            inode, offset = checkpoint.get(path, (stat.st_ino, 0))
+            start = offset if inode == stat.st_ino and offset <= stat.st_size else 0
+            if start >= stat.st_size:
+                continue
+            appname, msgid = container_tag(path)
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                for begin, end in chunks(data, start, size):
+                    yield Chunk(path, stat.st_ino, begin, end, appname, msgid)
+
+
+class _Progress:
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.lines = 0
+        self.bytes = 0
+
+    def __str__(self) -> str:
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        megabytes = self.bytes / 1024 / 1024
+        return (
+            f'{self.lines} lines, {megabytes:.1f} MB in {elapsed:.1f} s: '
+            f'{self.lines / elapsed:.0f} lines/s, {megabytes / elapsed:.1f} MB/s'
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog='python -m src.replay')
+    parser.add_argument('logs', nargs='*', default=[LOGS], help=f'files or patterns, {LOGS}')
+    parser.add_argument('--dsn', help='Sentry DSN, print events to stdout when omitted')
+    parser.add_argument('--checkpoint', help='file to resume from and to save progress to')
+    parser.add_argument('--processes', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    parser.add_argument('--hostname', default=socket.gethostname())
+    parser.add_argument('--severity', type=int, default=7, choices=range(8))
+    parser.add_argument('--max-parse-length', type=int, default=MAX_PARSE_LENGTH)
+    parser.add_argument('--multiline-lines', type=int, default=500)
+    parser.add_argument('--multiline-bytes', type=int, default=65536)
+    parser.add_argument(
+        '--batch-size', type=int, default=20,
+        help='envelopes of one event each pipelined per Sentry connection',
+    )
+    parser.add_argument('--connections', type=int, default=4)
+    parser.add_argument('--gzip', action='store_true')
+    parser.add_argument('--pending-size', type=int, default=100000)
+    parser.add_argument('--report-interval', type=float, default=10.0)
+    args = parser.parse_args()
+
+    paths = sorted({path for pattern in args.logs for path in glob.glob(pattern)})
+    settings = Settings(
+        args.hostname, bool(args.dsn), args.severity, args.max_parse_length,
+        args.multiline_lines, args.multiline_bytes,
+    )
+    checkpoint = load_checkpoint(args.checkpoint)
+    progress = _Progress()
+
+    # Whether every chunk was replayed
+    async def replay() -> bool:
+        loop = asyncio.get_running_loop()
+        sender = None
+        if args.dsn:
+            sender = Sender(
+                args.dsn, args.batch_size, connections=args.connections, compress=args.gzip,
+                max_pending=args.pending_size,
+            )
+            sender.start()
+        # Chunks are submitted and their results taken in order, and the checkpoint of a file
+        # only moves past a chunk once Sentry took all of its events: the replay stops at the
+        # first chunk with events that could not be sent, to be resumed from there
+        inflight: Deque[Tuple[Chunk, 'asyncio.Future[Tuple[List[Any], int]]']] = deque()
+        reported = time.perf_counter()
+        complete = True
+        todo = _chunks(paths, checkpoint, args.chunk_size)
+        with ProcessPoolExecutor(args.processes) as pool:
+            while True:
+                for chunk in todo:
+                    future = loop.run_in_executor(pool, parse_chunk, chunk, settings)
+                    inflight.append((chunk, future))
+                    if len(inflight) >= 2 * args.processes:
+                        break
+                if not inflight:
+                    break
+                chunk, future = inflight.popleft()
+                results, lines = await future
+                if sender is None:
+                    sys.stdout.write(''.join(f'{result}\n' for result in results))
+                else:
+                    failed = sender.failed
+                    for result in results:
+                        # Waits for room rather than letting the sender drop events
+                        while sender.pending >= args.pending_size:
+                            await asyncio.sleep(0.01)
+                        sender.send(result)
+                    await sender.flush()
+                    if sender.failed > failed:
+                        print(
+                            f'{sender.failed - failed} events of {chunk.path} could not be sent, '
+                            f'stopped at offset {chunk.start}',
+                            file=sys.stderr,
+                        )
+                        complete = False
+                        break
+                progress.lines += lines
+                progress.bytes += chunk.end - chunk.start
+                checkpoint[chunk.path] = chunk.inode, chunk.end
+                if args.checkpoint:
+                    save_checkpoint(args.checkpoint, checkpoint)
+                if time.perf_counter() - reported >= args.report_interval:
+                    reported = time.perf_counter()
+                    print(progress, file=sys.stderr)
+        if sender is not None:
+            await sender.close()
+        return complete
+
+    complete = True
+    try:
+        complete = asyncio.run(replay())
+    except KeyboardInterrupt:
+        pass
+    print(progress, file=sys.stderr)
+    if not complete:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
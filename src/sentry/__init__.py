@@ -0,0 +1,446 @@
+import asyncio
+import collections
+import gzip
+import json
+import ssl
+import time
+import uuid
+from typing import Any, Deque, Dict, List, NamedTuple, Optional, Set, Tuple
+from urllib.parse import urlsplit
+
+from src.buffer import DROP_OLDEST, BoundedQueue
+from src.metrics import Metrics
+from src.pipeline import Continued, Event
+from src.spool import Spool
+from src.syslog.pri import severity
+from src.timestamp import Normalizer
+
+__all__ = (
+    'Dsn',
+    'Sender',
+    'envelope',
+    'payload',
+    'raw_payload',
+)
+
+CLIENT = 'docker-logging-to-sentry-proxy/0.1'
+
+# https://tools.ietf.org/html/rfc5424#section-6.2.1 severity -> Sentry level
+LEVELS = ('fatal', 'fatal', 'fatal', 'error', 'warning', 'info', 'info', 'debug')
+SEVERITIES = {level: LEVELS.index(level) for level in LEVELS}
+# Contexts (see `src.add_context`) whose values are also tags, to be searchable in Sentry
+TAGGED_CONTEXTS = ('docker',)
+
+Payload = Dict[str, Any]
+
+
+# https://develop.sentry.dev/sdk/overview/#parsing-the-dsn
+class Dsn(NamedTuple):
+    scheme: str
+    key: str
+    host: str
+    port: int
+    path: str
+    project_id: str
+    raw: str
+
+    @classmethod
+    def parse(cls, value: str) -> 'Dsn':
+        url = urlsplit(value)
+        path, _, project_id = url.path.rpartition('/')
+        key, host = url.username, url.hostname
+        if url.scheme not in ('http', 'https') or not key or not host or not project_id:
+            raise ValueError(f'Invalid Sentry DSN: {value!r}')
+        return cls(
+            scheme=url.scheme,
+            key=key,
+            host=host,
+            port=url.port or (443 if url.scheme == 'https' else 80),
+            path=path,
+            project_id=project_id,
+            raw=value,
+        )
+
+    @property
+    def envelope_path(self) -> str:
+        return f'{self.path}/api/{self.project_id}/envelope/'
+
+    @property
+    def auth_header(self) -> str:
+        return f'Sentry sentry_version=7, sentry_client={CLIENT}, sentry_key={self.key}'
+
+
+# https://develop.sentry.dev/sdk/envelopes/
+# Sentry takes a single event item per envelope
+def envelope(dsn: Dsn, event: Payload) -> bytes:
+    event.setdefault('event_id', uuid.uuid4().hex)
+    payload = json.dumps(event, separators=(',', ':'), default=str).encode()
+    return b'\n'.join((
+        json.dumps({'dsn': dsn.raw, 'sent_at': _now()}).encode(),
+        b'{"type":"event","length":%d}' % len(payload),
+        payload,
+    )) + b'\n'
+
+
+# https://develop.sentry.dev/sdk/event-payloads/contexts/
+# Groups of the envelope and of the inner format are sent as the contexts they are routed to.
+# The syslog severity (0..7) is tagged as it is, several of them map to one Sentry level.
+def payload(event: Event, normalizer: Normalizer) -> Payload:
+    header, inner = event.envelope, event.inner
+    message = getattr(inner, 'message', None) or event.message
+    if event.continuation:
+        message = '\n'.join((message or '', *event.continuation))
+    contexts = header.contexts()
+    result: Payload = {
+        'timestamp': normalizer.epoch(header) or time.time(),
+        'level': LEVELS[event.severity],
+        'logger': header.group('appname'),
+        'server_name': header.group('hostname'),
+        'platform': 'other',
+        'message': {'formatted': message},
+        'tags': _tags(event, contexts),
+        'contexts': contexts,
+    }
+    result['tags']['severity'] = str(event.severity)
+    if inner is not None:
+        contexts.update(inner.contexts())
+        result['tags']['format'] = inner.FORMAT
+        result['extra'] = {
+            key: value for key, value in inner.asdict().items() if value is not None
+        }
+    return result
+
+
+# Params of STRUCTURED-DATA are tagged as "<SD-ID without @enterprise>.<PARAM-NAME>"
+def _tags(event: Event, contexts: Dict[str, Dict[str, str]]) -> Dict[str, str]:
+    result = {
+        f'{sd_id.partition("@")[0]}.{name}': value
+        for sd_id, params in event.structured_data.items()
+        for name, value in params.items()
+    }
+    for name in TAGGED_CONTEXTS:
+        if name in contexts:
+            result.update(contexts[name])
+    return result
+
+
+# Lines that were not parsed are still forwarded, as they are, at the severity of their <PRI>
+def raw_payload(line: str) -> Payload:
+    value = severity(line)
+    message = line
+    if isinstance(line, Continued):
+        message = '\n'.join((line, *line.continuation))
+    return {
+        'timestamp': time.time(),
+        'level': LEVELS[value],
+        'logger': 'syslog',
+        'platform': 'other',
+        'message': {'formatted': message},
+        'tags': {'format': 'RAW', 'severity': str(value)},
+    }
+
+
+# When it was queued, the event, and whether it was read from the spool
+Item = Tuple[float, Payload, bool]
+
+
+def _severity(item: Item) -> int:
+    return SEVERITIES.get(item[1].get('level', ''), 7)
+
+
+def _now() -> str:
+    return time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+
+
+class _Connection:
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def open(cls, dsn: Dsn) -> '_Connection':
+        context = ssl.create_default_context() if dsn.scheme == 'https' else None
+        return cls(*await asyncio.open_connection(dsn.host, dsn.port, ssl=context))
+
+    def write(self, data: bytes) -> None:
+        self.writer.write(data)
+
+    async def response(self) -> Tuple[int, bool]:
+        status_line = await self.reader.readuntil(b'\r\n')
+        status = int(status_line.split(None, 2)[1])
+        length, chunked, keep_alive = 0, False, True
+        while True:
+            line = await self.reader.readuntil(b'\r\n')
+            if line == b'\r\n':
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            name, value = name.strip().lower(), value.strip().lower()
+            if name == 'content-length':
+                length = int(value)
+            elif name == 'transfer-encoding':
+                chunked = 'chunked' in value
+            elif name == 'connection':
+                keep_alive = value != 'close'
+        if chunked:
+            while True:
+                size = int((await self.reader.readuntil(b'\r\n')).split(b';')[0], 16)
+                await self.reader.readexactly(size + 2)
+                if not size:
+                    break
+        elif length:
+            await self.reader.readexactly(length)
+        return status, keep_alive
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+# Every event is posted in an envelope of its own. Up to `batch_size` of them are pipelined on
+# one of at most `connections` persistent connections, once that many are queued or every
+# `flush_interval` seconds. A request is sent again on a new connection only if it cannot have
+# been processed: the connection could not be opened, a kept-alive connection was found closed
+# before any answer, or the server closed it after answering earlier requests. A request that
+# timed out or lost its connection otherwise may have been accepted and is counted as failed,
+# rather than sent twice. With a `spool`, events are spilled to it rather than dropped while the
+# queue is full, as are events Sentry could not be reached for or answered with 429 or 5xx; once
+# the queue is low and the last post went through (or at every flush while it is empty, to probe
+# a Sentry that was down), the queue is refilled from the spool, oldest first. Events read from
+# the spool are committed only once they were all posted, or read again after a rewind if any of
+# them is to be retried: a crash or an outage never loses them, though some may be sent twice.
+# Once the spool has a backlog, new events go through it too so that they are sent in order.
+# With `metrics`, every request is timed as the "send" stage.
+class Sender:
+    def __init__(
+        self,
+        dsn: str,
+        batch_size: int = 20,
+        flush_interval: float = 1.0,
+        connections: int = 4,
+        compress: bool = False,
+        timeout: float = 10.0,
+        max_pending: int = 100000,
+        policy: str = DROP_OLDEST,
+        spool: Optional[Spool] = None,
+        metrics: Optional[Metrics] = None,
+    ) -> None:
+        self.dsn = Dsn.parse(dsn)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.connections = connections
+        self.compress = compress
+        self.timeout = timeout
+        self.sent = 0
+        self.failed = 0
+        self.spilled = 0
+        self.unspooled = 0
+        self.requests = 0
+        self.spool = spool
+        self.latencies: Deque[float] = collections.deque(maxlen=100000)
+        self.queue = BoundedQueue(max_pending, policy, _severity)
+        self._idle: List[_Connection] = []
+        self._tasks: Set[asyncio.Task] = set()
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._runner: Optional[asyncio.Task] = None
+        self._closing = False
+        self._healthy = True
+        # Events read from the spool and not posted yet, and whether any of them is to be retried
+        self._unspooled = 0
+        self._rewind = False
+        self._stage = metrics.stage('send') if metrics is not None else None
+
+    @property
+    def pending(self) -> int:
+        return len(self.queue)
+
+    def start(self) -> None:
+        # Created here rather than in __init__, so that they bind to the running event loop
+        if self._runner is None:
+            self._slots = asyncio.Semaphore(self.connections)
+            self._wakeup = asyncio.Event()
+            self._runner = asyncio.get_running_loop().create_task(self._run())
+
+    def send(self, event: Payload) -> bool:
+        if self.spool is not None and (self.queue.full() or self.spool.backlog):
+            self._spill([event])
+            return True
+        accepted = self.queue.put((time.perf_counter(), event, False))
+        if len(self.queue) >= self.batch_size and self._wakeup is not None:
+            self._wakeup.set()
+        return accepted
+
+    async def flush(self) -> None:
+        self.start()
+        while self.queue:
+            await self._dispatch()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    # What is left in the spool is sent after the next start
+    async def close(self) -> None:
+        self._closing = True
+        if self._runner is not None:
+            self._started()[1].set()
+            await self._runner
+        await self.flush()
+        while self._idle:
+            self._idle.pop().close()
+        if self.spool is not None:
+            self.spool.close()
+
+    def latency(self, quantile: float) -> float:
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(quantile * len(ordered)))]
+
+    def _started(self) -> Tuple[asyncio.Semaphore, asyncio.Event]:
+        assert self._slots is not None and self._wakeup is not None, 'Sender was not started'
+        return self._slots, self._wakeup
+
+    async def _run(self) -> None:
+        _, wakeup = self._started()
+        while not self._closing:
+            try:
+                await asyncio.wait_for(wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            wakeup.clear()
+            refilled = self._refill()
+            while self.queue and not self._closing:
+                await self._dispatch()
+            if refilled and self._healthy:
+                wakeup.set()
+
+    # Nothing more is read from the spool until what was read is committed or rewound
+    def _refill(self) -> int:
+        if self.spool is None or not self.spool.backlog or self._unspooled:
+            return 0
+        if self._healthy:
+            room = min(self.batch_size * self.connections, self.queue.maxsize - len(self.queue))
+        else:
+            room = 0 if self.queue else self.batch_size
+        if room <= 0:
+            return 0
+        events = self.spool.read_events(room)
+        enqueued = time.perf_counter()
+        for event in events:
+            self.queue.put((enqueued, event, True))
+        self._unspooled = len(events)
+        self.unspooled += len(events)
+        return len(events)
+
+    # Events from the spool are done with once sent, rejected for good or possibly accepted, see
+    # the class comment; the others are read again
+    def _settle(self, done: int, rewind: bool) -> None:
+        assert self.spool is not None, 'No spool'
+        self._unspooled -= done
+        self._rewind = self._rewind or rewind
+        if not self._unspooled:
+            if self._rewind:
+                self.spool.rewind()
+            else:
+                self.spool.commit()
+            self._rewind = False
+
+    def _request(self, event: Payload) -> bytes:
+        body = envelope(self.dsn, event)
+        headers = [
+            f'POST {self.dsn.envelope_path} HTTP/1.1',
+            f'Host: {self.dsn.host}:{self.dsn.port}',
+            f'User-Agent: {CLIENT}',
+            f'X-Sentry-Auth: {self.dsn.auth_header}',
+            'Content-Type: application/x-sentry-envelope',
+        ]
+        if self.compress:
+            body = gzip.compress(body, 6)
+            headers.append('Content-Encoding: gzip')
+        headers.append(f'Content-Length: {len(body)}')
+        return ('\r\n'.join(headers) + '\r\n\r\n').encode() + body
+
+    # Whether the answer is final: sent, or rejected for good; 429 and 5xx are worth a retry
+    def _outcome(self, item: Item, status: int) -> bool:
+        if 200 <= status < 300:
+            self._healthy = True
+            self.sent += 1
+            self.latencies.append(time.perf_counter() - item[0])
+            return True
+        if status == 429 or status >= 500:
+            return False
+        self.failed += 1
+        return True
+
+    def _spill(self, events: List[Payload]) -> None:
+        assert self.spool is not None, 'No spool'
+        self.spilled += self.spool.append(events)
+
+    async def _dispatch(self) -> None:
+        await self._started()[0].acquire()
+        batch = self.queue.get_batch(self.batch_size)
+        task = asyncio.get_running_loop().create_task(self._post(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _post(self, batch: List[Item]) -> None:
+        try:
+            requests = [self._request(item[1]) for item in batch]
+            answered, lost, retry = 0, 0, []
+            for _ in range(2):
+                connection = self._idle.pop() if self._idle else None
+                reused = connection is not None
+                if connection is None:
+                    try:
+                        connection = await asyncio.wait_for(
+                            _Connection.open(self.dsn), self.timeout,
+                        )
+                    except (OSError, asyncio.TimeoutError):
+                        continue
+                connection.write(b''.join(requests[answered:]))
+                self.requests += len(requests) - answered
+                first, keep_alive = answered, True
+                try:
+                    while answered < len(batch) and keep_alive:
+                        started = time.perf_counter()
+                        status, keep_alive = await asyncio.wait_for(
+                            connection.response(), self.timeout,
+                        )
+                        if self._stage is not None:
+                            self._stage.observe(time.perf_counter() - started)
+                        if not self._outcome(batch[answered], status):
+                            retry.append(batch[answered])
+                        answered += 1
+                except (OSError, asyncio.IncompleteReadError, ValueError):
+                    connection.close()
+                    # A kept-alive connection the server closed meanwhile answers nothing
+                    if reused and answered == first:
+                        continue
+                    lost = len(batch) - answered
+                    break
+                except asyncio.TimeoutError:
+                    connection.close()
+                    lost = len(batch) - answered
+                    break
+                if keep_alive:
+                    self._idle.append(connection)
+                else:
+                    connection.close()
+                if answered == len(batch):
+                    break
+            if lost:
+                self._healthy = False
+                self.failed += lost
+            else:
+                retry.extend(batch[answered:])
+            if retry:
+                self._healthy = False
+            spooled = sum(item[2] for item in batch)
+            if spooled:
+                self._settle(spooled, any(item[2] for item in retry))
+            retry = [item for item in retry if not item[2]]
+            if retry:
+                if self.spool is not None:
+                    self._spill([item[1] for item in retry])
+                else:
+                    self.failed += len(retry)
+        finally:
+            self._started()[0].release()
@@ -0,0 +1,123 @@
+import asyncio
+import collections
+import gzip
+import json
+import zlib
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+
+__all__ = (
+    'StubServer',
+    'parse_envelope',
+)
+
+
+def parse_envelope(body: bytes) -> Tuple[Dict[str, Any], List[Tuple[Dict[str, Any], bytes]]]:
+    header, _, rest = body.partition(b'\n')
+    items = []
+    while rest.strip():
+        item_header, _, rest = rest.partition(b'\n')
+        item = json.loads(item_header)
+        if 'length' in item:
+            payload, rest = rest[:item['length']], rest[item['length'] + 1:]
+        else:
+            payload, _, rest = rest.partition(b'\n')
+        items.append((item, payload))
+    return json.loads(header), items
+
+
+# Local stand-in for the Sentry envelope endpoint, for tests and benchmarks without network
+# access: accepts keep-alive HTTP/1.1 POSTs and counts the events of every envelope. Like
+# Sentry, it answers 400 to an envelope of more than one event, and keeps none of them.
+class StubServer:
+    def __init__(
+        self,
+        host: str = '127.0.0.1',
+        port: int = 0,
+        status: int = 200,
+        delay: float = 0.0,
+        keep: int = 1000,
+    ) -> None:
+        self.host = host
+        self.port = port
+        self.status = status
+        self.delay = delay
+        self.requests = 0
+        self.events = 0
+        self.rejected = 0
+        self.bytes = 0
+        self.connections = 0
+        self.received: Deque[Dict[str, Any]] = collections.deque(maxlen=keep)
+        self.server: Optional[asyncio.Server] = None
+        self._handlers: Set[asyncio.Task] = set()
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        assert self.server is not None, 'Not started'
+        return self.server.sockets[0].getsockname()[:2]
+
+    def dsn(self, key: str = 'public', project_id: str = '1') -> str:
+        host, port = self.address
+        return f'http://{key}@{host}:{port}/{project_id}'
+
+    async def start(self) -> None:
+        self.server = await asyncio.start_server(self._handle, self.host, self.port)
+
+    async def close(self) -> None:
+        if self.server is not None:
+            self.server.close()
+            for task in self._handlers:
+                task.cancel()
+            await asyncio.gather(*self._handlers, return_exceptions=True)
+            await self.server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        task = asyncio.current_task()
+        assert task is not None
+        self._handlers.add(task)
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readuntil(b'\r\n')
+                    if line == b'\r\n':
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get('content-length', 0)))
+                self.requests += 1
+                self.bytes += len(body)
+                encoding = headers.get('content-encoding')
+                if encoding == 'gzip':
+                    body = gzip.decompress(body)
+                elif encoding == 'deflate':
+                    body = zlib.decompress(body)
+                _, items = parse_envelope(body)
+                events = [
+                    json.loads(payload) for item, payload in items if item.get('type') == 'event'
+                ]
+                status, event_id = self.status, None
+                if len(events) > 1:
+                    self.rejected += 1
+                    status = 400
+                else:
+                    for event in events:
+                        self.events += 1
+                        event_id = event.get('event_id')
+                        self.received.append(event)
+                if self.delay:
+                    await asyncio.sleep(self.delay)
+                response = json.dumps({'id': event_id}).encode()
+                writer.write(
+                    b'HTTP/1.1 %d STUB\r\nContent-Type: application/json\r\n'
+                    b'Content-Length: %d\r\n\r\n%s' % (status, len(response), response)
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, asyncio.CancelledError, ConnectionError):
+            pass
+        finally:
+            self._handlers.discard(task)
+            writer.close()
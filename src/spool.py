@@ -0,0 +1,286 @@
+import json
+import mmap
+import os
+import struct
+import time
+import zlib
+from collections import deque
+from typing import Any, BinaryIO, Callable, Deque, Dict, Iterable, List, Optional, Tuple
+
+__all__ = (
+    'FSYNC_ALWAYS',
+    'FSYNC_INTERVAL',
+    'FSYNC_NEVER',
+    'FSYNC_POLICIES',
+    'Spool',
+)
+
+FSYNC_ALWAYS = 'always'
+FSYNC_INTERVAL = 'interval'
+FSYNC_NEVER = 'never'
+
+FSYNC_POLICIES = (FSYNC_ALWAYS, FSYNC_INTERVAL, FSYNC_NEVER)
+
+SUFFIX = '.spool'
+CURSOR = 'cursor'
+
+# Length and CRC-32 of the JSON that follows
+_HEADER = struct.Struct('<II')
+# Segment and offset of the first record not committed
+_CURSOR = struct.Struct('<QQ')
+
+Payload = Dict[str, Any]
+Cursor = Tuple[int, int]
+
+
+def _record(event: Payload) -> bytes:
+    data = json.dumps(event, separators=(',', ':')).encode()
+    return _HEADER.pack(len(data), zlib.crc32(data)) + data
+
+
+# Offset after the last whole and valid record of `data` from `offset` on, and the events of
+# those records, at most `limit` of them
+def _scan(
+    data: Any,
+    offset: int,
+    limit: Optional[int] = None,
+    decode: bool = True,
+) -> Tuple[int, List[Payload]]:
+    events: List[Payload] = []
+    size = len(data)
+    count = 0
+    while limit is None or count < limit:
+        start = offset + _HEADER.size
+        if start > size:
+            break
+        length, crc = _HEADER.unpack_from(data, offset)
+        end = start + length
+        if end > size or zlib.crc32(data[start:end]) != crc:
+            break
+        if decode:
+            events.append(json.loads(data[start:end]))
+        count += 1
+        offset = end
+    return offset, events
+
+
+# Append-only log of events on disk, for while Sentry cannot take them: segments of about
+# `segment_bytes` named by their sequence number, of records framed by their length and CRC-32.
+# Appends are written through at once and made durable by `fsync` policy: after every append,
+# at most every `fsync_interval` seconds (and on `sync`), or whenever the OS gets to it. Events
+# are read back oldest first through mmap, and are gone for good only once `commit`ted: read
+# segments are deleted then, and the read position is kept in a cursor file. The oldest
+# segments, read or not, are evicted beyond `max_bytes` or once nothing was appended to them
+# for `max_age` seconds. On open, records of the last segment after its last valid one, torn by
+# a crash in the middle of an append, are cut off; a record not valid in another segment ends
+# reading that segment.
+class Spool:
+    def __init__(
+        self,
+        directory: str,
+        max_bytes: int = 1024 * 1024 * 1024,
+        max_age: Optional[float] = 24 * 60 * 60,
+        segment_bytes: int = 64 * 1024 * 1024,
+        fsync: str = FSYNC_INTERVAL,
+        fsync_interval: float = 1.0,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f'Unknown fsync policy: {fsync!r}, expected one of {FSYNC_POLICIES}')
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.segment_bytes = segment_bytes
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self.clock = clock
+        self.appended = 0
+        self.read = 0
+        self.evicted_bytes = 0
+        self.truncated_bytes = 0
+        self.syncs = 0
+        self._file: Optional[BinaryIO] = None
+        self._dirty = False
+        self._synced = clock()
+        self._sizes: Dict[int, int] = {}
+        self._modified: Dict[int, float] = {}
+        os.makedirs(directory, exist_ok=True)
+        self._cursor = self._committed = self._load_cursor()
+        self._segments: Deque[int] = deque()
+        for name in sorted(os.listdir(directory)):
+            if not name.endswith(SUFFIX) or not name[:-len(SUFFIX)].isdigit():
+                continue
+            segment, path = int(name[:-len(SUFFIX)]), os.path.join(directory, name)
+            if segment < self._cursor[0] or not os.path.getsize(path):
+                os.remove(path)
+                continue
+            self._segments.append(segment)
+            self._sizes[segment] = os.path.getsize(path)
+            self._modified[segment] = os.path.getmtime(path)
+        if self._cursor[0] not in self._sizes:
+            self._cursor = self._committed = (
+                self._segments[0] if self._segments else self._cursor[0] + 1, 0,
+            )
+        if self._segments:
+            self._recover(self._segments[-1])
+
+    # Bytes of all segments
+    @property
+    def bytes(self) -> int:
+        return sum(self._sizes.values())
+
+    # Bytes not read yet
+    @property
+    def backlog(self) -> int:
+        segment, offset = self._cursor
+        return sum(size for key, size in self._sizes.items() if key >= segment) - (
+            offset if segment in self._sizes else 0
+        )
+
+    def append(self, events: Iterable[Payload]) -> int:
+        records = [_record(event) for event in events]
+        if not records:
+            return 0
+        now = self.clock()
+        file = self._file
+        if file is None or self._sizes[self._segments[-1]] >= self.segment_bytes or (
+            self.max_age is not None and self._modified[self._segments[-1]] + self.max_age <= now
+        ):
+            file = self._rotate()
+        data = b''.join(records)
+        file.write(data)
+        file.flush()
+        segment = self._segments[-1]
+        self._sizes[segment] += len(data)
+        self._modified[segment] = now
+        self._dirty = True
+        self.appended += len(records)
+        if self.fsync == FSYNC_ALWAYS:
+            self.sync()
+        self.expire(now)
+        return len(records)
+
+    # Syncs what was appended `fsync_interval` seconds ago or more and evicts segments over the
+    # caps; called after every append, and should also be called periodically
+    def expire(self, now: Optional[float] = None) -> None:
+        if now is None:
+            now = self.clock()
+        if self._dirty and self.fsync == FSYNC_INTERVAL and (
+            now - self._synced >= self.fsync_interval
+        ):
+            self.sync()
+        self._evict(now)
+
+    def sync(self) -> None:
+        self._synced = self.clock()
+        if self._file is not None and self._dirty and self.fsync != FSYNC_NEVER:
+            os.fsync(self._file.fileno())
+            self.syncs += 1
+        self._dirty = False
+
+    # Up to `limit` events from the read position on, which moves past them
+    def read_events(self, limit: int) -> List[Payload]:
+        self.expire()
+        result: List[Payload] = []
+        while len(result) < limit:
+            segment, offset = self._cursor
+            size = self._sizes.get(segment, 0)
+            if offset < size:
+                with open(self._path(segment), 'rb') as file, mmap.mmap(
+                    file.fileno(), size, access=mmap.ACCESS_READ,
+                ) as data:
+                    end, events = _scan(data, offset, limit - len(result))
+                result.extend(events)
+                if len(result) >= limit:
+                    self._cursor = segment, end
+                    break
+                # The rest of the segment, after a record that is not valid, is lost
+                self.truncated_bytes += size - end
+                self._cursor = segment, size
+            later = next((key for key in self._segments if key > segment), None)
+            if later is None:
+                break
+            self._cursor = later, 0
+        self.read += len(result)
+        return result
+
+    # Events read so far are not to be read again, even after a restart
+    def commit(self) -> None:
+        self._committed = self._cursor
+        while len(self._segments) > 1 and self._segments[0] < self._cursor[0]:
+            self._remove(self._segments.popleft())
+        temporary = os.path.join(self.directory, f'{CURSOR}.tmp')
+        with open(temporary, 'wb') as file:
+            file.write(_CURSOR.pack(*self._cursor))
+            if self.fsync != FSYNC_NEVER:
+                os.fsync(file.fileno())
+        os.replace(temporary, os.path.join(self.directory, CURSOR))
+
+    # Back to the last commit, to read again the events that could not be sent after all
+    def rewind(self) -> None:
+        self._cursor = self._committed
+
+    def close(self) -> None:
+        if self._file is not None:
+            self.sync()
+            self._file.close()
+            self._file = None
+
+    def _path(self, segment: int) -> str:
+        return os.path.join(self.directory, f'{segment:020d}{SUFFIX}')
+
+    def _load_cursor(self) -> Cursor:
+        try:
+            with open(os.path.join(self.directory, CURSOR), 'rb') as file:
+                segment, offset = _CURSOR.unpack(file.read(_CURSOR.size))
+                return segment, offset
+        except (OSError, struct.error):
+            return 0, 0
+
+    def _recover(self, segment: int) -> None:
+        path, size = self._path(segment), self._sizes[segment]
+        with open(path, 'rb') as file, mmap.mmap(
+            file.fileno(), size, access=mmap.ACCESS_READ,
+        ) as data:
+            end, _ = _scan(data, 0, decode=False)
+        if end < size:
+            self.truncated_bytes += size - end
+            with open(path, 'r+b') as segment_file:
+                segment_file.truncate(end)
+                os.fsync(segment_file.fileno())
+            self._sizes[segment] = end
+
+    # Every run appends to a segment of its own, the segments of the last run are only read
+    def _rotate(self) -> BinaryIO:
+        if self._file is not None:
+            self.sync()
+            self._file.close()
+        segment = self._segments[-1] + 1 if self._segments else self._cursor[0]
+        file = self._file = open(self._path(segment), 'ab')
+        self._segments.append(segment)
+        self._sizes[segment] = 0
+        self._modified[segment] = self.clock()
+        return file
+
+    def _remove(self, segment: int) -> None:
+        os.remove(self._path(segment))
+        del self._sizes[segment]
+        del self._modified[segment]
+
+    # Oldest segment first, never the one being appended to
+    def _evict(self, now: float) -> None:
+        while len(self._segments) > (1 if self._file is not None else 0):
+            segment = self._segments[0]
+            if self.bytes <= self.max_bytes and (
+                self.max_age is None or self._modified[segment] + self.max_age > now
+            ):
+                break
+            self.evicted_bytes += self._sizes[segment] - (
+                self._cursor[1] if self._cursor[0] == segment else 0
+            )
+            self._remove(self._segments.popleft())
+            following = self._segments[0] if self._segments else segment + 1
+            if self._cursor[0] <= segment:
+                self._cursor = following, 0
+            if self._committed[0] <= segment:
+                self._committed = following, 0
@@ -3,7 +3,7 @@ from src import add_context, add_regex
 from .regex import RFC5424
 
 
-add_regex(RFC5424)
+add_regex('RFC5424', RFC5424)
 
 add_context('syslog', [
     'appname',
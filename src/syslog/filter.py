@@ -0,0 +1,121 @@
+from typing import Callable, Dict, Iterable, NamedTuple, Optional, Tuple, Union
+
+from .pri import parse_pri
+
+__all__ = (
+    'CONTAINER',
+    'IMAGE',
+    'PriFilter',
+    'Rule',
+    'image_names',
+    'msgid',
+)
+
+CONTAINER = 'container'
+IMAGE = 'image'
+SEVERITY = 'severity'
+FACILITY = 'facility'
+
+# Distinct MSGIDs whose threshold is remembered, one per running container
+MAX_CACHED = 10000
+
+
+# "container:NAME=SEVERITY" or "image:NAME=SEVERITY": lines of the container (by name, full or
+# short id) or of the image (by name, with or without its tag) less severe than SEVERITY are
+# dropped
+class Rule(NamedTuple):
+    kind: str
+    name: str
+    severity: int
+
+    @classmethod
+    def parse(cls, value: str) -> 'Rule':
+        target, _, level = value.rpartition('=')
+        kind, _, name = target.partition(':')
+        if kind not in (CONTAINER, IMAGE) or not name or not level.isdigit() or int(level) > 7:
+            raise ValueError(f'Invalid rule, expected "container|image:NAME=0..7": {value!r}')
+        return cls(kind, name, int(level))
+
+    def __str__(self) -> str:
+        return f'{self.kind}:{self.name}'
+
+
+# https://tools.ietf.org/html/rfc5424#section-6
+# "<PRI>VERSION TIMESTAMP HOSTNAME APP-NAME PROCID MSGID ...", MSGID found by splitting only
+def msgid(line: Union[str, bytes]) -> Optional[str]:
+    if isinstance(line, bytes):
+        fields = line.split(b' ', 6)
+        return fields[5].decode('utf-8', 'replace') if len(fields) > 5 else None
+    parts = line.split(' ', 6)
+    return parts[5] if len(parts) > 5 else None
+
+
+# The name of an image with and without its tag
+def image_names(image: str) -> Tuple[str, ...]:
+    name, _, tag = image.rpartition(':')
+    return (image, name) if name and '/' not in tag else (image,)
+
+
+# Drops lines, str or bytes, by their <PRI> alone, before they are queued or parsed: those of a
+# facility in `facilities` and those less severe than `severity`, or than the threshold of the
+# first rule that matches their container or their image. Containers and images are told by
+# Docker's MSGID tag ("DOCKER:{{.FullID}}~{{.Name}}~{{.ImageFullID}}~{{.ImageName}}~..."), which
+# is only looked at when there are rules and the PRI alone does not decide; thresholds are
+# cached by MSGID. Lines without a valid PRI are passed on, to be handled as unparsed.
+# `discarded` counts the lines each rule dropped, by "severity", "facility" or the rule.
+class PriFilter:
+    def __init__(
+        self,
+        consumer: Callable[[Union[str, bytes]], object],
+        severity: int = 7,
+        facilities: Iterable[int] = (),
+        rules: Iterable[Rule] = (),
+    ) -> None:
+        self.consumer = consumer
+        self.severity = severity
+        self.facilities = frozenset(facilities)
+        self.rules = tuple(rules)
+        self.passed = 0
+        self.discarded: Dict[str, int] = {SEVERITY: 0, FACILITY: 0}
+        self.discarded.update((str(rule), 0) for rule in self.rules)
+        # A line this severe or more is kept whatever its container
+        self._keep = min((self.severity, *(rule.severity for rule in self.rules)))
+        self._cache: Dict[Optional[str], Tuple[int, str]] = {}
+
+    def __call__(self, line: Union[str, bytes]) -> None:
+        pri = parse_pri(line)
+        if pri is not None:
+            if pri >> 3 in self.facilities:
+                self.discarded[FACILITY] += 1
+                return
+            if pri & 7 > self._keep:
+                threshold, name = (self.severity, SEVERITY) if not self.rules else (
+                    self._threshold(line)
+                )
+                if pri & 7 > threshold:
+                    self.discarded[name] += 1
+                    return
+        self.passed += 1
+        self.consumer(line)
+
+    def _threshold(self, line: Union[str, bytes]) -> Tuple[int, str]:
+        key = msgid(line)
+        try:
+            return self._cache[key]
+        except KeyError:
+            pass
+        result = self.severity, SEVERITY
+        tag = key[7:].split('~') if key is not None and key.startswith('DOCKER:') else []
+        if len(tag) > 3:
+            names = {
+                CONTAINER: (tag[1], tag[0], tag[0][:12]),
+                IMAGE: image_names(tag[3]),
+            }
+            for rule in self.rules:
+                if rule.name in names[rule.kind]:
+                    result = rule.severity, str(rule)
+                    break
+        if len(self._cache) >= MAX_CACHED:
+            self._cache.clear()
+        self._cache[key] = result
+        return result
@@ -0,0 +1,33 @@
+import re
+
+from src import as_bytes
+
+from .regex import Atom
+
+__all__ = (
+    'WELL_FORMED',
+    'WELL_FORMED_BYTES',
+    'well_formed',
+    'well_formed_bytes',
+)
+
+# https://tools.ietf.org/html/rfc5424#section-6
+# What `RFC5424` could otherwise only find out by backtracking: a valid <PRI>, all six header
+# fields separated by single spaces, and STRUCTURED-DATA followed by either the end of the line
+# or a space. No character can be matched in more than one way here, so the time it takes is
+# linear in the length of the line.
+WELL_FORMED = re.compile(
+    r'<(?:0?\d?\d|1[0-8]\d|19[01])>\S+ \S+ \S+ \S+ \S+ \S+ '
+    r'(?:-|(?:%s)+)'
+    r'(?: |$)' % Atom.RFC5424_SD_ELEMENT
+)
+WELL_FORMED_BYTES = as_bytes(WELL_FORMED)
+
+
+# A single line only: MESSAGE cannot match a line feed
+def well_formed(line: str) -> bool:
+    return '\n' not in line and WELL_FORMED.match(line) is not None
+
+
+def well_formed_bytes(line: bytes) -> bool:
+    return b'\n' not in line and WELL_FORMED_BYTES.match(line) is not None
@@ -0,0 +1,39 @@
+from typing import Dict, Optional, Union
+
+__all__ = (
+    'parse_pri',
+    'severity',
+)
+
+# https://tools.ietf.org/html/rfc5424#section-6.2.1
+MAX_PRI = 191
+
+
+# Every PRIVAL of one to three digits, leading zeros included, so that it is looked up instead
+# of being validated and converted, both as str and as bytes
+def _privals() -> Dict[Union[str, bytes], int]:
+    result: Dict[Union[str, bytes], int] = {}
+    for width in (1, 2, 3):
+        for pri in range(min(MAX_PRI + 1, 10 ** width)):
+            key = format(pri, f'0{width}d')
+            result[key] = result[key.encode()] = pri
+    return result
+
+
+_PRIVALS = _privals()
+
+
+def parse_pri(line: Union[str, bytes]) -> Optional[int]:
+    if isinstance(line, str):
+        end = line.find('>', 2, 5) if line.startswith('<') else -1
+    else:
+        end = line.find(b'>', 2, 5) if line.startswith(b'<') else -1
+    if end < 0:
+        return None
+    return _PRIVALS.get(line[1:end])
+
+
+# Lines without a valid PRI are treated as the least severe ones
+def severity(line: Union[str, bytes]) -> int:
+    pri = parse_pri(line)
+    return pri & 7 if pri is not None else 7
@@ -16,7 +16,13 @@ class Atom(_base.BaseAtom):
         r')'
     )
     RFC5424_SEVERITY = r'(?P<severity>\d{1,3})'
-    RFC5424_STRUCTURED_DATA = r'(?P<structured_data>-|(?:\[.+?(?<!\\)\])+)'
+    # https://tools.ietf.org/html/rfc5424#section-6.3
+    # SD-ID *(SP PARAM-NAME="PARAM-VALUE"), where a PARAM-VALUE can escape '"', '\' and ']'.
+    # Every character can be matched in one way only, so a mismatch never backtracks into it.
+    RFC5424_SD_ELEMENT = r'\[[^\s="\]]{1,32}(?: [^\s="\]]{1,32}="(?:[^"\\\n]|\\.)*")*\]'
+    # The envelope only tells where STRUCTURED-DATA ends, having checked it is well-formed; its
+    # params are tokenized from that text when read, see `src.pipeline.Event.structured_data`
+    RFC5424_STRUCTURED_DATA = r'(?P<structured_data>-|(?:%s)+)' % RFC5424_SD_ELEMENT
     RFC5424_VERSION = r'(?P<version>\d{1,2})'
 
 
@@ -0,0 +1,70 @@
+import re
+from typing import Dict, List
+
+__all__ = (
+    'StructuredData',
+    'parse_structured_data',
+)
+
+StructuredData = Dict[str, Dict[str, str]]
+
+_NAME_END = re.compile(r'[\s="\]]')
+_VALUE_SPECIAL = re.compile(r'["\\\n]')
+
+# https://tools.ietf.org/html/rfc5424#section-6.3.3
+_ESCAPED = ('"', '\\', ']')
+
+
+def _name(text: str, start: int) -> int:
+    match = _NAME_END.search(text, start)
+    end = match.start() if match is not None else len(text)
+    if not 0 < end - start <= 32:
+        raise ValueError(f'Invalid SD-NAME at {start}: {text!r}')
+    return end
+
+
+def _value(text: str, start: int, parts: List[str]) -> int:
+    index = start
+    while True:
+        match = _VALUE_SPECIAL.search(text, index)
+        if match is None or match.group() == '\n':
+            raise ValueError(f'Unterminated PARAM-VALUE at {start}: {text!r}')
+        end = match.start()
+        parts.append(text[index:end])
+        if match.group() == '"':
+            return end + 1
+        # Only '"', '\' and ']' are escaped, a backslash before anything else is kept
+        escaped = text[end + 1:end + 2]
+        parts.append(escaped if escaped in _ESCAPED else f'\\{escaped}')
+        index = end + 2
+
+
+# https://tools.ietf.org/html/rfc5424#section-6.3
+# One pass over STRUCTURED-DATA: names end at the first character that cannot be part of them
+# and values at the first unescaped quote, both found with a forward search, so every character
+# is looked at once. SD-ELEMENTs with the same SD-ID are merged.
+def parse_structured_data(text: str) -> StructuredData:
+    result: StructuredData = {}
+    if text == '-':
+        return result
+    index, length = 0, len(text)
+    if not length:
+        raise ValueError('Empty STRUCTURED-DATA')
+    while index < length:
+        if text[index] != '[':
+            raise ValueError(f'Expected "[" at {index}: {text!r}')
+        end = _name(text, index + 1)
+        params = result.setdefault(text[index + 1:end], {})
+        index = end
+        while text.startswith(' ', index):
+            end = _name(text, index + 1)
+            if not text.startswith('="', end):
+                raise ValueError(f'Expected \'="\' at {end}: {text!r}')
+            name = text[index + 1:end]
+            parts: List[str] = []
+            index = _value(text, end + 2, parts)
+            params[name] = ''.join(parts)
+        if not text.startswith(']', index):
+            raise ValueError(f'Expected "]" at {index}: {text!r}')
+        index += 1
+    return result
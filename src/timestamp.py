@@ -0,0 +1,116 @@
+import calendar
+import datetime as dt
+from typing import Dict, Optional, Tuple, Type
+
+from src.record import Record
+
+__all__ = (
+    'Normalizer',
+)
+
+MONTHS: Dict[str, int] = {
+    **{f'{month:02d}': month for month in range(1, 13)},
+    **{name: month for month, name in enumerate(calendar.month_abbr) if name},
+}
+
+Second = Tuple[int, dt.datetime]
+
+FIELDS = ('year', 'month', 'day', 'hour', 'minute', 'second', 'microsecond', 'timezone')
+
+
+def _offset(timezone: str) -> int:
+    if timezone == 'Z':
+        return 0
+    sign = -1 if timezone[0] == '-' else 1
+    digits = timezone[1:].replace(':', '')
+    return sign * (int(digits[:-2]) * 3600 + int(digits[-2:]) * 60)
+
+
+# Logs arrive in bursts within the same second, so everything down to the second, including the
+# timezone arithmetic, is computed once per distinct second and only microseconds are added on.
+class Normalizer:
+    def __init__(self, default_timezone: dt.tzinfo = dt.timezone.utc, maxsize: int = 256) -> None:
+        self.default_timezone = default_timezone
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._seconds: Dict[tuple, Second] = {}
+        self._indexes: Dict[Type[Record], Tuple[Tuple[int, ...], int]] = {}
+
+    def __call__(
+        self,
+        year: str,
+        month: str,
+        day: str,
+        hour: str,
+        minute: str,
+        second: str,
+        microsecond: Optional[str] = None,
+        timezone: Optional[str] = None,
+    ) -> Optional[dt.datetime]:
+        result = self._get((year, month, day, hour, minute, second, timezone))
+        if result is None:
+            return None
+        if microsecond:
+            return result[1].replace(microsecond=int(microsecond.ljust(6, '0')))
+        return result[1]
+
+    def _get(self, key: tuple) -> Optional[Second]:
+        try:
+            result = self._seconds[key]
+        except KeyError:
+            return self._second(key)
+        self.hits += 1
+        return result
+
+    def _second(self, key: tuple) -> Optional[Second]:
+        self.misses += 1
+        year, month, day, hour, minute, second, timezone = key
+        try:
+            fields = (int(year), MONTHS[month], int(day), int(hour), int(minute), int(second))
+            epoch = calendar.timegm(fields)
+            if timezone is not None:
+                epoch -= _offset(timezone)
+            else:
+                naive = dt.datetime(*fields[:5])
+                offset = self.default_timezone.utcoffset(naive)
+                epoch -= int(offset.total_seconds()) if offset is not None else 0
+        except (KeyError, ValueError):
+            return None
+        result = (epoch, dt.datetime.fromtimestamp(epoch, dt.timezone.utc))
+        if len(self._seconds) >= self.maxsize:
+            self._seconds.clear()
+        self._seconds[key] = result
+        return result
+
+    def datetime(self, record: Record) -> Optional[dt.datetime]:
+        return self(*self._fields(record))
+
+    def epoch(self, record: Record) -> Optional[float]:
+        *key, microsecond, timezone = self._fields(record)
+        result = self._get((*key, timezone))
+        if result is None:
+            return None
+        if microsecond:
+            return result[0] + int(microsecond.ljust(6, '0')) / 1e6
+        return float(result[0])
+
+    # Exact, as an integer: microseconds since the epoch
+    def microseconds(self, record: Record) -> Optional[int]:
+        *key, microsecond, timezone = self._fields(record)
+        result = self._get((*key, timezone))
+        if result is None:
+            return None
+        return result[0] * 1000000 + (int(microsecond.ljust(6, '0')) if microsecond else 0)
+
+    def _fields(self, record: Record) -> tuple:
+        try:
+            indexes, missing = self._indexes[type(record)]
+        except KeyError:
+            groupindex = record.PATTERN.groupindex
+            if not groupindex.keys() >= set(FIELDS[:-1]):
+                raise ValueError(f'{record.FORMAT} records have no timestamp fields')
+            indexes = tuple(groupindex[key] for key in FIELDS if key in groupindex)
+            missing = len(FIELDS) - len(indexes)
+            self._indexes[type(record)] = indexes, missing
+        return record.group(*indexes) + (None,) * missing
@@ -0,0 +1,58 @@
+from typing import Generic, List, Tuple, TypeVar
+
+__all__ = (
+    'TimerWheel',
+)
+
+T = TypeVar('T')
+
+
+# A hashed timing wheel: a deadline is put in the slot of its tick, so scheduling is an append
+# and advancing the clock only looks at the slots of the ticks that passed. Deadlines further
+# away than a full turn of the wheel wait in their slot until it comes round with them due.
+# Timers are never cancelled; owners check whether what they get back is still theirs.
+class TimerWheel(Generic[T]):
+    def __init__(self, tick: float = 0.1, slots: int = 64, now: float = 0.0) -> None:
+        if tick <= 0 or slots < 1:
+            raise ValueError('tick and slots must be positive')
+        self.tick = tick
+        self._slots: List[List[Tuple[float, T]]] = [[] for _ in range(slots)]
+        self._current = int(now // tick)
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    # The time at which `advance` can first return anything
+    @property
+    def next_tick(self) -> float:
+        return (self._current + 1) * self.tick
+
+    def schedule(self, item: T, deadline: float) -> None:
+        index = max(int(deadline // self.tick), self._current + 1)
+        self._slots[index % len(self._slots)].append((deadline, item))
+        self._count += 1
+
+    def advance(self, now: float) -> List[T]:
+        target = int(now // self.tick)
+        steps = target - self._current
+        if steps <= 0:
+            return []
+        slots = self._slots
+        if steps > len(slots):
+            self._current = target - len(slots)
+        due: List[T] = []
+        while self._current < target:
+            self._current += 1
+            index = self._current % len(slots)
+            timers = slots[index]
+            if not timers:
+                continue
+            slots[index] = []
+            self._count -= len(timers)
+            for deadline, item in timers:
+                if deadline <= now:
+                    due.append(item)
+                else:
+                    self.schedule(item, deadline)
+        return due
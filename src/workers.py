@@ -0,0 +1,332 @@
+import asyncio
+import importlib
+import multiprocessing
+import os
+import re
+import struct
+import zlib
+from array import array
+from collections import deque
+from itertools import chain
+from multiprocessing.connection import Connection
+from typing import Callable, Deque, Dict, List, Optional, Sequence, Tuple
+
+from src import get_regex
+from src.cache import LRUCache
+from src.pipeline import MAX_PARSE_LENGTH, Event, Pipeline
+from src.record import Record, Spans, record_type
+from src.syslog.regex import RFC5424
+
+__all__ = (
+    'Workers',
+    'shard_key',
+)
+
+FORMATS = ('src.common_log_format', 'src.mariadb_mysql', 'src.nginx', 'src.syslog')
+
+# Format of every line of a batch: None when the envelope did not match, '' when the inner
+# format was not parsed, and the flat (start, end) spans of all matched groups, as native ints
+Batch = Tuple[List[Optional[str]], bytes]
+
+
+# https://tools.ietf.org/html/rfc5424#section-6
+# "<PRI>VERSION TIMESTAMP HOSTNAME APP-NAME PROCID MSGID ...", where Docker's MSGID tag starts
+# with "DOCKER:{{.FullID}}~"; lines of other senders are keyed by HOSTNAME and APP-NAME.
+def shard_key(line: str) -> str:
+    parts = line.split(' ', 6)
+    if len(parts) > 5 and parts[5].startswith('DOCKER:'):
+        return parts[5][7:].partition('~')[0]
+    return ' '.join(parts[2:4])
+
+
+class _Encoder:
+    def __init__(self) -> None:
+        self.formats: List[Optional[str]] = []
+        self.spans: List[bytes] = []
+        self._structs: Dict[re.Pattern, struct.Struct] = {}
+
+    def __call__(self, event: Event) -> None:
+        self._pack(event.envelope)
+        inner = event.inner
+        if inner is None:
+            self.formats.append('')
+        else:
+            self.formats.append(inner.FORMAT)
+            self._pack(inner)
+
+    def _pack(self, record: Record) -> None:
+        try:
+            packer = self._structs[record.PATTERN]
+        except KeyError:
+            packer = struct.Struct(f'{2 * (record.PATTERN.groups + 1)}i')
+            self._structs[record.PATTERN] = packer
+        self.spans.append(packer.pack(*chain.from_iterable(record.regs)))
+
+    def batch(self) -> Batch:
+        result = self.formats, b''.join(self.spans)
+        self.formats, self.spans = [], []
+        return result
+
+
+def _work(
+    lines: multiprocessing.Queue,
+    results: Connection,
+    severity: int,
+    max_length: int,
+    modules: Sequence[str],
+    cache_size: int,
+) -> None:
+    for module in modules:
+        importlib.import_module(module)
+    encoder = _Encoder()
+    pipeline = Pipeline.from_registry(
+        encoder, severity, LRUCache(cache_size), max_length=max_length,
+    )
+    formats = encoder.formats
+    while True:
+        batch = lines.get()
+        if batch is None:
+            break
+        for line in batch:
+            count = len(formats)
+            pipeline(line)
+            if len(formats) == count:
+                formats.append(None)
+        results.send(encoder.batch())
+        formats = encoder.formats
+    results.close()
+
+
+# Lines are sharded by container, so that every container's lines are parsed in order by one
+# worker, which also keeps that container's classifier cache. SO_REUSEPORT cannot do this: the
+# kernel balances by source address and every container's lines come from the same daemon.
+# Lines in flight are kept here and workers send back only the spans of the matched groups as
+# one bytes object per batch; records are rebuilt around them lazily, see `src.record.Spans`.
+# A worker that dies is replaced and the lines it had in flight are parsed in-process.
+class Workers:
+    def __init__(
+        self,
+        consumer: Callable[[Event], None],
+        workers: Optional[int] = None,
+        severity: int = 7,
+        batch: int = 256,
+        max_inflight: int = 4,
+        modules: Sequence[str] = FORMATS,
+        max_length: int = MAX_PARSE_LENGTH,
+        fallback: Optional[Callable[[str], None]] = None,
+        cache_size: int = 1024,
+    ) -> None:
+        self.consumer = consumer
+        self.fallback = fallback
+        self.max_length = max_length
+        self.workers = workers or os.cpu_count() or 1
+        self.severity = severity
+        self.batch = batch
+        self.max_inflight = max_inflight
+        self.modules = modules
+        self.cache_size = cache_size
+        self.lines = 0
+        self.unparsed = 0
+        self.dropped = 0
+        self.batches = 0
+        self.restarts = 0
+        self._pending: List[List[str]] = [[] for _ in range(self.workers)]
+        self._inflight: List[Deque[List[str]]] = [deque() for _ in range(self.workers)]
+        self._queues: List[multiprocessing.Queue] = []
+        self._results: List[Connection] = []
+        self._processes: List[multiprocessing.Process] = []
+        self._scheduled = False
+        self._closing = False
+        self._parser: Optional[Pipeline] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._room: Optional[asyncio.Event] = None
+        self._envelope = record_type('RFC5424', RFC5424)
+        self._envelope_size = 2 * (RFC5424.groups + 1)
+        self._types = {
+            name: (record_type(name, pattern), pattern, 2 * (pattern.groups + 1))
+            for name, pattern in get_regex()
+        }
+
+    @property
+    def inflight(self) -> int:
+        return sum(len(batches) for batches in self._inflight)
+
+    @property
+    def pending(self) -> int:
+        return sum(len(pending) for pending in self._pending)
+
+    # Whether another `batch` lines can be taken without dropping any, even if all of them
+    # belong to the same container
+    def ready(self) -> bool:
+        limit = self.batch * (self.max_inflight - 1)
+        return all(len(pending) <= limit for pending in self._pending)
+
+    # Workers are checked while waiting, in case one died without closing its pipe
+    async def wait(self, interval: float = 1.0) -> None:
+        _, room = self._started()
+        while not self.ready():
+            room.clear()
+            try:
+                await asyncio.wait_for(room.wait(), interval)
+            except asyncio.TimeoutError:
+                self.check()
+
+    def start(self) -> None:
+        self._loop = asyncio.get_event_loop()
+        self._room = asyncio.Event()
+        for index in range(self.workers):
+            queue, receiver, process = self._spawn(index)
+            self._queues.append(queue)
+            self._results.append(receiver)
+            self._processes.append(process)
+
+    # Replaces every worker that died
+    def check(self) -> None:
+        for index, process in enumerate(self._processes):
+            if not process.is_alive() and not self._results[index].closed:
+                self._restart(index)
+
+    def __call__(self, line: str) -> None:
+        index = zlib.crc32(shard_key(line).encode()) % self.workers
+        pending = self._pending[index]
+        if len(pending) >= self.batch * self.max_inflight:
+            self.dropped += 1
+            return
+        self.lines += 1
+        pending.append(line)
+        if len(pending) >= self.batch:
+            self._send(index)
+        elif not self._scheduled and self._loop is not None:
+            # Lines received in the same event loop iteration go out as one batch
+            self._scheduled = True
+            self._loop.call_soon(self.flush)
+
+    def flush(self) -> None:
+        self._scheduled = False
+        for index, pending in enumerate(self._pending):
+            if pending:
+                self._send(index)
+
+    async def close(self, timeout: float = 10.0) -> None:
+        for index, pending in enumerate(self._pending):
+            while pending:
+                self._submit(index, pending[:self.batch])
+                del pending[:self.batch]
+        self._closing = True
+        for queue in self._queues:
+            queue.put(None)
+        for _ in range(int(timeout / 0.01)):
+            if not self.inflight:
+                break
+            await asyncio.sleep(0.01)
+        loop, _ = self._started()
+        for receiver in self._results:
+            if not receiver.closed:
+                loop.remove_reader(receiver.fileno())
+                receiver.close()
+        for process in self._processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+                process.join()
+        self._results.clear()
+        self._processes.clear()
+
+    def _send(self, index: int) -> None:
+        if len(self._inflight[index]) >= self.max_inflight:
+            return
+        pending = self._pending[index]
+        self._submit(index, pending[:self.batch])
+        del pending[:self.batch]
+
+    def _submit(self, index: int, lines: List[str]) -> None:
+        self._inflight[index].append(lines)
+        self.batches += 1
+        self._queues[index].put(lines)
+
+    def _started(self) -> Tuple[asyncio.AbstractEventLoop, asyncio.Event]:
+        assert self._loop is not None and self._room is not None, 'Workers were not started'
+        return self._loop, self._room
+
+    def _spawn(
+        self, index: int,
+    ) -> Tuple[multiprocessing.Queue, Connection, multiprocessing.Process]:
+        queue: multiprocessing.Queue = multiprocessing.Queue()
+        receiver, sender = multiprocessing.Pipe(duplex=False)
+        process = multiprocessing.Process(
+            target=_work,
+            args=(queue, sender, self.severity, self.max_length, self.modules, self.cache_size),
+            daemon=True,
+        )
+        process.start()
+        sender.close()
+        self._started()[0].add_reader(receiver.fileno(), self._receive, index)
+        return queue, receiver, process
+
+    # Results the worker sent before it died are taken as usual, the lines of the batches it
+    # never finished are parsed in-process, in order, before the lines still pending
+    def _restart(self, index: int) -> None:
+        loop, room = self._started()
+        receiver = self._results[index]
+        try:
+            while receiver.poll():
+                self._deliver(index, *receiver.recv())
+        except (EOFError, OSError):
+            pass
+        loop.remove_reader(receiver.fileno())
+        receiver.close()
+        if not self._closing:
+            process = self._processes[index]
+            process.kill()
+            process.join()
+        queue = self._queues[index]
+        queue.cancel_join_thread()
+        queue.close()
+        if self._parser is None:
+            self._parser = Pipeline.from_registry(
+                self.consumer, self.severity, LRUCache(self.cache_size),
+                max_length=self.max_length, fallback=self.fallback,
+            )
+        inflight = self._inflight[index]
+        while inflight:
+            for line in inflight.popleft():
+                self._parser(line)
+        if not self._closing:
+            self.restarts += 1
+            self._queues[index], self._results[index], self._processes[index] = self._spawn(index)
+            if self._pending[index]:
+                self._send(index)
+        room.set()
+
+    def _receive(self, index: int) -> None:
+        try:
+            formats, packed = self._results[index].recv()
+        except (EOFError, OSError):
+            self._restart(index)
+            return
+        self._deliver(index, formats, packed)
+        if self._pending[index]:
+            self._send(index)
+        self._started()[1].set()
+
+    def _deliver(self, index: int, formats: List[Optional[str]], packed: bytes) -> None:
+        lines = self._inflight[index].popleft()
+        spans = array('i')
+        spans.frombytes(packed)
+        offset = 0
+        consumer, envelope, size = self.consumer, self._envelope, self._envelope_size
+        for line, name in zip(lines, formats):
+            if name is None:
+                self.unparsed += 1
+                if self.fallback is not None:
+                    self.fallback(line)
+                continue
+            record = envelope(Spans(RFC5424, line, spans, offset))
+            offset += size
+            inner: Optional[Record] = None
+            if name:
+                start, end = record.span('message')
+                inner_type, pattern, inner_size = self._types[name]
+                inner = inner_type(Spans(pattern, line[start:end], spans, offset))
+                offset += inner_size
+            consumer(Event(line, record, None, inner))
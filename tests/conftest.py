@@ -0,0 +1,15 @@
+import pytest
+
+
+# Time of components that take a `clock`, moved only by the test
+class Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock() -> Clock:
+    return Clock()
@@ -0,0 +1,103 @@
+from collections import namedtuple
+from typing import Any, Dict, List
+
+import pytest
+
+from src.aggregate import Aggregator, template
+
+TestCase = namedtuple('TestCase', 'given_string expected_result')
+
+
+@pytest.mark.parametrize(
+    'given_string, expected_result', (
+        TestCase('stat() "/var/www/html/index.php" failed (13: Permission denied), client: 127.0.0.1, server: example.com', 'stat() "/var/www/html/index.php" failed (<num>: Permission denied), client: <ip>, server: example.com'),
+        TestCase('Aborted connection 1234 to db: unconnected user: host: 10.0.0.5:3306 (Got timeout reading)', 'Aborted connection <num> to db: unconnected user: host: <ip> (Got timeout reading)'),
+        TestCase('container 6e8ef9a56b54 pointer 0xdeadBEEF request 123e4567-e89b-12d3-a456-426614174000', 'container <hex> pointer <hex> request <uuid>'),
+        TestCase('took 1.5s, 20ms', 'took <num>s, <num>ms'),
+        TestCase('InnoDB: DDL log recovery : begin', 'InnoDB: DDL log recovery : begin'),
+        TestCase('deadbeef and facade are words', 'deadbeef and facade are words'),
+        TestCase('', ''),
+    ),
+)
+def test_template(given_string: str, expected_result: str) -> None:
+    assert template(given_string) == expected_result
+
+
+def event(message: str, timestamp: float = 0.0, container: str = 'mariadb_1', level: str = 'error') -> Dict[str, Any]:
+    return {
+        'timestamp': timestamp,
+        'level': level,
+        'message': {'formatted': message},
+        'tags': {'container_name': container, 'format': 'MYSQL'},
+    }
+
+
+def test_aggregate_within_window(clock) -> None:
+    result: List[Dict[str, Any]] = []
+    aggregator = Aggregator(result.append, window=10.0, clock=clock)
+
+    for index in range(100):
+        clock.now = index / 100
+        aggregator(event(f'Aborted connection {index} to db', timestamp=1000 + index))
+    aggregator(event('Aborted connection 1 to db', container='mariadb_2'))
+    aggregator(event('Aborted connection 1 to db', level='warning'))
+    aggregator(event('Unable to lock ./ibdata1'))
+
+    assert [item['message']['formatted'] for item in result] == [
+        'Aborted connection 0 to db',
+        'Aborted connection 1 to db',
+        'Aborted connection 1 to db',
+        'Unable to lock ./ibdata1',
+    ]
+    assert all('extra' not in item for item in result)
+    assert len(aggregator) == 4
+    clock.now = 10.5
+    assert aggregator.expire() == 1
+    clock.now = 11.0
+    assert aggregator.expire() == 0
+    assert len(aggregator) == 0
+
+    assert len(result) == 5
+    assert result[4]['message'] == {'formatted': 'Aborted connection 1 to db'}
+    assert result[4]['extra'] == {
+        'count': 99,
+        'first_seen': 1001,
+        'last_seen': 1099,
+        'template': 'Aborted connection <num> to db',
+    }
+    assert result[4]['fingerprint'] == ['mariadb_1', 'error', 'MYSQL', 'Aborted connection <num> to db']
+    assert (aggregator.received, aggregator.emitted) == (103, 5)
+
+
+def test_window_reopens(clock) -> None:
+    result: List[Dict[str, Any]] = []
+    aggregator = Aggregator(result.append, window=1.0, clock=clock)
+
+    aggregator(event('error 1'))
+    aggregator(event('error 2'))
+    clock.now = 2.0
+    aggregator(event('error 3'))
+
+    assert [item['message']['formatted'] for item in result] == ['error 1', 'error 2', 'error 3']
+    assert result[1]['extra']['count'] == 1
+    aggregator.flush()
+    assert len(result) == 3
+    assert len(aggregator) == 0
+
+
+def test_maxsize_closes_oldest_group(clock) -> None:
+    result: List[Dict[str, Any]] = []
+    aggregator = Aggregator(result.append, maxsize=2, clock=clock)
+
+    aggregator(event('first'))
+    aggregator(event('first'))
+    aggregator(event('second'))
+    aggregator(event('third'))
+
+    assert len(aggregator) == 2
+    assert aggregator.evicted == 1
+    assert [item['message']['formatted'] for item in result] == [
+        'first', 'second', 'first', 'third',
+    ]
+    assert 'extra' not in result[0]
+    assert result[2]['extra']['count'] == 1
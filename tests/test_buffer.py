@@ -0,0 +1,158 @@
+import asyncio
+from collections import namedtuple
+from typing import List, Optional
+
+import pytest
+
+from src.buffer import DROP_LOWEST_SEVERITY, DROP_NEWEST, DROP_OLDEST, BoundedQueue
+from src.syslog.pri import parse_pri, severity
+
+TestCase = namedtuple('TestCase', 'given_string expected_result')
+
+
+@pytest.mark.parametrize(
+    'given_string, expected_result', (
+        TestCase('<0>1 2020-01-01T00:00:00Z', 0),
+        TestCase('<27>1 2020-01-01T00:00:00Z', 27),
+        TestCase('<191>1 2020-01-01T00:00:00Z', 191),
+        TestCase('<192>1 2020-01-01T00:00:00Z', None),
+        TestCase('<1234>1 2020-01-01T00:00:00Z', None),
+        TestCase('<>1 2020-01-01T00:00:00Z', None),
+        TestCase('<a>1 2020-01-01T00:00:00Z', None),
+        TestCase('<٣>1 2020-01-01T00:00:00Z', None),
+        TestCase('27>1 2020-01-01T00:00:00Z', None),
+        TestCase('', None),
+    ),
+)
+def test_parse_pri(given_string: str, expected_result: Optional[int]) -> None:
+    assert parse_pri(given_string) == expected_result
+
+
+def test_severity() -> None:
+    assert severity('<27>1 -') == 3
+    assert severity('garbage') == 7
+    assert severity(b'<27>1 -') == 3
+    assert severity(b'<1234>1 -') == 7
+
+
+def test_drop_newest() -> None:
+    queue = BoundedQueue(3, DROP_NEWEST)
+
+    assert [queue.put(item) for item in range(5)] == [True, True, True, False, False]
+    assert queue.full()
+    assert queue.get_batch(10) == [0, 1, 2]
+    assert queue.accepted == 3
+    assert queue.dropped == {DROP_NEWEST: 2, DROP_OLDEST: 0, DROP_LOWEST_SEVERITY: 0}
+
+
+def test_drop_oldest() -> None:
+    queue = BoundedQueue(3, DROP_OLDEST)
+
+    assert all(queue.put(item) for item in range(5))
+    assert len(queue) == 3
+    assert queue.get_batch(10) == [2, 3, 4]
+    assert queue.accepted == 5
+    assert queue.dropped[DROP_OLDEST] == 2
+
+
+def test_drop_lowest_severity() -> None:
+    queue = BoundedQueue(4, DROP_LOWEST_SEVERITY, severity)
+
+    for line in ('<7>a', '<3>b', '<6>c', '<7>d'):
+        assert queue.put(line)
+    assert queue.put('<3>e')
+    assert queue.put('<0>f')
+    # Less severe than anything left in the queue
+    assert not queue.put('<7>g')
+    # As severe as the least severe items, the oldest of them goes
+    assert queue.put('<6>h')
+
+    assert queue.get_batch(10) == ['<3>b', '<3>e', '<0>f', '<6>h']
+    assert queue.dropped[DROP_LOWEST_SEVERITY] == 4
+
+
+@pytest.mark.parametrize('given_policy', ('drop-random', ''))
+def test_unknown_policy(given_policy: str) -> None:
+    with pytest.raises(ValueError):
+        BoundedQueue(10, given_policy)
+
+
+@pytest.mark.parametrize('given_maxsize', (0, -1))
+def test_invalid_maxsize(given_maxsize: int) -> None:
+    with pytest.raises(ValueError, match='queue size'):
+        BoundedQueue(given_maxsize, DROP_OLDEST)
+
+
+def test_drop_lowest_severity_requires_severity() -> None:
+    with pytest.raises(ValueError):
+        BoundedQueue(10, DROP_LOWEST_SEVERITY)
+
+
+def test_watermarks() -> None:
+    result: List[str] = []
+    queue = BoundedQueue(
+        10, high=8, low=2, on_high=lambda: result.append('high'), on_low=lambda: result.append('low'),
+    )
+
+    for item in range(9):
+        queue.put(item)
+    assert result == ['high']
+    assert queue.above_high
+    queue.get_batch(6)
+    assert result == ['high']
+    queue.get()
+    assert result == ['high', 'low']
+    assert not queue.above_high
+
+
+def test_consume() -> None:
+    result: List[int] = []
+
+    async def run() -> None:
+        queue = BoundedQueue(1000)
+        task = asyncio.ensure_future(queue.consume(result.append, batch=16))
+        await asyncio.sleep(0)
+        for item in range(100):
+            queue.put(item)
+        for _ in range(100):
+            if len(result) == 100:
+                break
+            await asyncio.sleep(0)
+        queue.put(100)
+        await asyncio.sleep(0.01)
+        task.cancel()
+
+    asyncio.run(run())
+
+    assert result == list(range(101))
+
+
+def test_consume_survives_handler_errors() -> None:
+    result: List[int] = []
+    errors: List[int] = []
+
+    def handler(item: int) -> None:
+        if item % 10 == 3:
+            raise ValueError(item)
+        result.append(item)
+
+    async def run() -> BoundedQueue:
+        queue = BoundedQueue(1000)
+        task = asyncio.ensure_future(
+            queue.consume(handler, batch=16, on_error=lambda item, _: errors.append(item)),
+        )
+        for item in range(100):
+            queue.put(item)
+        for _ in range(100):
+            if len(result) + len(errors) == 100:
+                break
+            await asyncio.sleep(0)
+        assert not task.done()
+        task.cancel()
+        return queue
+
+    queue = asyncio.run(run())
+
+    assert errors == list(range(3, 100, 10))
+    assert queue.errors == 10
+    assert result == [item for item in range(100) if item % 10 != 3]
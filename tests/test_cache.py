@@ -0,0 +1,95 @@
+import pytest
+
+from src.cache import LRUCache
+
+
+def test_get_set() -> None:
+    cache = LRUCache(maxsize=2)
+
+    cache.set('a', 1)
+
+    assert cache.get('a') == 1
+    assert cache.get('b') is None
+    assert cache.get('b', 2) == 2
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_maxsize_evicts_least_recently_used() -> None:
+    cache = LRUCache(maxsize=2)
+
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+
+    assert len(cache) == 2
+    assert 'a' in cache
+    assert 'b' not in cache
+    assert 'c' in cache
+    assert cache.evictions == 1
+
+
+def test_ttl_expires_idle_entries(clock) -> None:
+    cache = LRUCache(maxsize=10, ttl=10.0, clock=clock)
+
+    cache.set('a', 1)
+    cache.set('b', 2)
+    clock.now = 9.0
+    assert cache.get('a') == 1
+    clock.now = 15.0
+
+    assert cache.get('a') == 1
+    assert cache.get('b') is None
+    assert 'b' not in cache
+    assert len(cache) == 1
+
+
+def test_expire(clock) -> None:
+    cache = LRUCache(maxsize=10, ttl=10.0, clock=clock)
+    for key in range(5):
+        clock.now = key
+        cache.set(key, key)
+
+    clock.now = 12.5
+
+    assert cache.expire() == 3
+    assert len(cache) == 2
+    assert cache.evictions == 3
+
+
+def test_set_expires_stale_entries(clock) -> None:
+    cache = LRUCache(maxsize=10, ttl=1.0, clock=clock)
+    for key in range(5):
+        cache.set(key, key)
+
+    clock.now = 2.0
+    cache.set('new', 0)
+
+    assert len(cache) == 1
+
+
+def test_no_ttl(clock) -> None:
+    cache = LRUCache(maxsize=10, ttl=None, clock=clock)
+
+    cache.set('a', 1)
+    clock.now = 1e9
+
+    assert cache.get('a') == 1
+    assert cache.expire() == 0
+
+
+def test_pop_and_clear() -> None:
+    cache = LRUCache()
+    cache.set('a', 1)
+    cache.set('b', 2)
+
+    assert cache.pop('a') == 1
+    assert cache.pop('a') is None
+    cache.clear()
+    assert len(cache) == 0
+
+
+@pytest.mark.parametrize('given_maxsize', (0, -1))
+def test_invalid_maxsize(given_maxsize: int) -> None:
+    with pytest.raises(ValueError):
+        LRUCache(maxsize=given_maxsize)
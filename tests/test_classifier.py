@@ -0,0 +1,112 @@
+import re
+from collections import namedtuple
+from typing import Optional
+
+import pytest
+
+import src.common_log_format  # noqa: F401
+import src.mariadb_mysql  # noqa: F401
+import src.nginx  # noqa: F401
+import src.syslog  # noqa: F401
+from src import get_regex
+from src.cache import LRUCache
+from src.classifier import Classifier
+from src.common_log_format.regex import HTTPD
+from src.mariadb_mysql.regex import MYSQL
+from src.nginx.regex import NGINX_ERROR
+from src.syslog.regex import RFC5424
+
+TestCase = namedtuple('TestCase', 'given_string expected_format')
+
+REGEX = (
+    ('RFC5424', RFC5424),
+    ('HTTPD', HTTPD),
+    ('MYSQL', MYSQL),
+    ('NGINX_ERROR', NGINX_ERROR),
+)
+
+
+@pytest.mark.parametrize(
+    'given_string, expected_format', (
+        TestCase('<30>1 2020-03-22T12:35:47.385660+02:00 host.localdomain 6e8ef9a56b54 927 6e8ef9a56b54 - 2020-03-22T12:35:47.538083Z 0 [Note] [MY-012487] [InnoDB] InnoDB: DDL log recovery : begin', 'RFC5424'),
+        TestCase('<165>1 2003-10-11T22:14:15.003Z mymachine.example.com evntslog - ID47 [exampleSDID@32473 iut="3" eventSource="Application" eventID="1011"][examplePriority@32473 class="high"]', 'RFC5424'),
+        TestCase('127.0.0.1 - frank [10/Oct/2000:13:55:36 -0700] "GET /apache_pb.gif HTTP/1.0" 200 2326', 'HTTPD'),
+        TestCase('2020-03-22T12:35:47.538083Z 0 [Note] [MY-012487] [InnoDB] InnoDB: DDL log recovery : begin', 'MYSQL'),
+        TestCase('2020-03-22 12:35:47 140310100753288 [Note] InnoDB:  Percona XtraDB (http://www.percona.com) 5.6.38-83.0 started', 'MYSQL'),
+        TestCase('2020/03/21 23:30:24 [crit] 30016#0: *4 stat() "/var/www/html/index.php" failed (13: Permission denied)', 'NGINX_ERROR'),
+        TestCase('Traceback (most recent call last):', None),
+        TestCase('', None),
+    ),
+)
+def test_classify(given_string: str, expected_format: Optional[str]) -> None:
+    result = Classifier(REGEX).classify(given_string)
+
+    if expected_format is None:
+        assert result is None, f'Expected no match, but got: {repr(result)}'
+    else:
+        assert result is not None, 'Expected match, but got: None'
+        assert result[0] == expected_format
+        assert result[1] == dict(REGEX)[expected_format].match(given_string).groupdict()
+
+
+def test_classify_first_registered_wins() -> None:
+    given_regex = (
+        ('FIRST', re.compile(r'(?P<word>[a-z]+)$')),
+        ('SECOND', re.compile(r'(?P<letters>[a-z]+)$')),
+    )
+
+    assert Classifier(given_regex).classify('foo') == ('FIRST', {'word': 'foo'})
+    assert Classifier(given_regex[::-1]).classify('foo') == ('SECOND', {'letters': 'foo'})
+
+
+def test_classify_brackets_and_escapes() -> None:
+    given_regex = (
+        ('ESCAPED', re.compile(r'\((?P<value>[(]\d+)\)$')),
+    )
+
+    assert Classifier(given_regex).classify('((42)') == ('ESCAPED', {'value': '(42'})
+
+
+def test_from_registry() -> None:
+    classifier = Classifier.from_registry()
+
+    assert classifier.regex == get_regex()
+    assert {name for name, _ in classifier.regex} >= set(dict(REGEX))
+
+
+def test_empty() -> None:
+    assert Classifier(()).classify('foo') is None
+
+
+def test_mixed_flags() -> None:
+    classifier = Classifier((('A', re.compile('(?P<a>a)')), ('B', re.compile('(?P<b>b)', re.I))))
+
+    assert classifier.classify('B') == ('B', {'b': 'B'})
+
+
+def test_classify_cached_by_key() -> None:
+    given_regex = (
+        ('WORD', re.compile(r'(?P<word>[a-z]+)$')),
+        ('ANY', re.compile(r'(?P<any>.+)$')),
+    )
+    cache = LRUCache(maxsize=10)
+    classifier = Classifier(given_regex, cache=cache)
+
+    assert classifier.classify('foo', key='container') == ('WORD', {'word': 'foo'})
+    assert (cache.hits, cache.misses) == (0, 1)
+    assert classifier.classify('bar', key='container') == ('WORD', {'word': 'bar'})
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert classifier.classify('FOO', key='container') == ('ANY', {'any': 'FOO'})
+    assert cache.get('container').FORMAT == 'ANY'
+    assert classifier.classify('foo', key='container') == ('ANY', {'any': 'foo'})
+    assert classifier.classify('foo') == ('WORD', {'word': 'foo'})
+
+
+def test_classify_cached_no_match_keeps_entry() -> None:
+    cache = LRUCache(maxsize=10)
+    classifier = Classifier(REGEX, cache)
+
+    classifier.classify('2020-03-22 12:35:47 1 [Note] foo', key='mariadb')
+    assert classifier.classify('Traceback (most recent call last):', key='mariadb') is None
+
+    assert cache.get('mariadb').FORMAT == 'MYSQL'
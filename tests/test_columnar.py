@@ -0,0 +1,73 @@
+from array import array
+
+import pytest
+
+import src.common_log_format  # noqa: F401
+import src.mariadb_mysql  # noqa: F401
+import src.nginx  # noqa: F401
+import src.syslog  # noqa: F401
+from benchmarks import corpus
+from src.classifier import Classifier
+from src.columnar import NO_TIMESTAMP, UNPARSED, parse_many
+from src.timestamp import Normalizer
+
+LINES = (
+    '127.0.0.1 - frank [10/Oct/2000:13:55:36 -0700] "GET /apache_pb.gif HTTP/1.0" 200 2326',
+    '2020/03/21 23:30:24 [crit] 30016#0: *4 stat() failed',
+    'Traceback (most recent call last):',
+    '127.0.0.1 - - [10/Oct/2000:13:55:37 -0700] "GET / HTTP/1.0" 404 0',
+)
+
+
+def test_parse_many() -> None:
+    result = parse_many(LINES)
+
+    assert len(result) == 4
+    assert result.formats == ('HTTPD', 'NGINX_ERROR')
+    assert result.format == array('b', [0, 1, UNPARSED, 0])
+    assert result.timestamp == array('q', [971211336000000, 1584833424000000, NO_TIMESTAMP, 971211337000000])
+    assert result['authuser'] == ['frank', None, None, '-']
+    assert result['http_status'] == ['200', None, None, '404']
+    assert result['level'] == [None, 'crit', None, None]
+    assert 'year' not in result.fields
+    assert result.row(1) == {
+        'format': 'NGINX_ERROR',
+        'timestamp': 1584833424000000,
+        'level': 'crit',
+        'proc_id': '30016',
+        'thread_id': '0',
+        'connection_counter': '4',
+        'message': 'stat() failed',
+    }
+    assert result.row(2) == {'format': None, 'timestamp': None}
+
+
+def test_parse_many_corpus() -> None:
+    lines = corpus.mixed(500)
+    classifier = Classifier.from_registry()
+    normalizer = Normalizer()
+
+    result = parse_many(iter(lines))
+
+    for index, line in enumerate(lines):
+        record = classifier.match(line)
+        if record is None:
+            assert result.format[index] == UNPARSED
+            continue
+        row = result.row(index)
+        assert row['format'] == record.FORMAT
+        assert row['timestamp'] == normalizer.microseconds(record)
+        expected_result = {key: value for key, value in record.asdict().items() if value is not None}
+        assert {key: value for key, value in row.items() if key in expected_result} == {
+            key: value for key, value in expected_result.items() if key in row
+        }
+
+
+def test_to_numpy() -> None:
+    numpy = pytest.importorskip('numpy')
+
+    result = parse_many(LINES).to_numpy()
+
+    assert result['format'].tolist() == [0, 1, UNPARSED, 0]
+    assert numpy.isnat(result['timestamp'].astype('datetime64[us]')).tolist() == [False, False, True, False]
+    assert result['level'].tolist() == [None, 'crit', None, None]
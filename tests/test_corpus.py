@@ -0,0 +1,38 @@
+import pytest
+
+import src.common_log_format  # noqa: F401
+import src.mariadb_mysql  # noqa: F401
+import src.nginx  # noqa: F401
+import src.syslog  # noqa: F401
+from benchmarks import corpus
+from src import get_regex
+
+REGEX = dict(get_regex())
+
+
+def test_generate_is_seeded() -> None:
+    assert corpus.generate('HTTPD', 10) == corpus.generate('HTTPD', 10)
+    assert corpus.generate('HTTPD', 10, seed=1) != corpus.generate('HTTPD', 10)
+    assert corpus.mixed(100) == corpus.mixed(100)
+
+
+@pytest.mark.parametrize('given_name', sorted(corpus.INNER))
+def test_generated_lines_match_only_their_format(given_name: str) -> None:
+    for line in corpus.generate(given_name, 500):
+        result = [name for name, item in REGEX.items() if item.match(line)]
+        assert result == ([] if given_name == 'NOISE' else [given_name]), line
+
+
+@pytest.mark.parametrize('given_name', sorted(corpus.INNER))
+def test_generated_docker_lines(given_name: str) -> None:
+    for line in corpus.generate(f'DOCKER_{given_name}', 500):
+        match = REGEX['RFC5424'].match(line)
+        assert match is not None, line
+        assert match.group('container_id') and match.group('image_name')
+        message = match.group('message') or ''
+        assert (given_name == 'NOISE') is (REGEX.get(given_name, REGEX['RFC5424']).match(message) is None)
+
+
+def test_generated_syslog_lines() -> None:
+    for line in corpus.generate('RFC5424', 500):
+        assert REGEX['RFC5424'].match(line) is not None, line
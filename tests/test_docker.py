@@ -0,0 +1,190 @@
+import asyncio
+import os
+import tempfile
+from collections import namedtuple
+from typing import Any, Dict, List
+
+import pytest
+
+from src.docker import Client, Enricher, Metadata
+from src.docker.stub import StubServer
+
+TestCase = namedtuple('TestCase', 'given_data expected_result')
+
+CONTAINER_ID = 'd8e210ec875a' + '0' * 52
+LABELS = {
+    'com.docker.compose.project': 'shop',
+    'com.docker.compose.service': 'web',
+    'team': 'payments',
+}
+
+
+def event(container_id: str = CONTAINER_ID) -> Dict[str, Any]:
+    return {
+        'message': {'formatted': 'foo'},
+        'tags': {'container_id': container_id},
+        'contexts': {'docker': {'container_id': container_id}},
+    }
+
+
+@pytest.mark.parametrize(
+    'given_data, expected_result', (
+        TestCase({'Name': '/web_1', 'Config': {'Labels': LABELS, 'Env': ['PATH=/bin', 'SECRET=x', 'ENVIRONMENT=production']}}, ('web_1', LABELS, 'shop', 'web', 'production')),
+        TestCase({'Name': '/web_1', 'Config': {'Labels': {'com.docker.stack.namespace': 'shop', 'com.docker.swarm.service.name': 'shop_web'}, 'Env': ['SENTRY_ENVIRONMENT=staging', 'ENVIRONMENT=production']}}, ('web_1', {'com.docker.stack.namespace': 'shop', 'com.docker.swarm.service.name': 'shop_web'}, 'shop', 'shop_web', 'staging')),
+        TestCase({'Name': '/web_1', 'Config': {'Labels': None, 'Env': None}}, ('web_1', {}, None, None, None)),
+        TestCase({}, ('', {}, None, None, None)),
+    ),
+)
+def test_metadata(given_data: Dict[str, Any], expected_result: tuple) -> None:
+    assert Metadata.from_inspect(given_data) == expected_result
+
+
+def run(test: Any, delay: float = 0.0) -> None:
+    async def main() -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            server = StubServer(os.path.join(directory, 'docker.sock'), delay)
+            server.add(CONTAINER_ID, 'web_1', LABELS, ['ENVIRONMENT=production', 'SECRET=x'])
+            await server.start()
+            try:
+                await test(server)
+            finally:
+                await server.close()
+
+    asyncio.run(main())
+
+
+def test_client() -> None:
+    async def test(server: StubServer) -> None:
+        client = Client(server.path)
+
+        assert (await client.inspect(CONTAINER_ID[:12]))['Name'] == '/web_1'
+        assert await client.inspect('unknown') is None
+
+        events = client.events()
+        task = asyncio.ensure_future(events.__anext__())
+        while not server.streams:
+            await asyncio.sleep(0.01)
+        await server.emit({'Action': 'start', 'Actor': {'ID': CONTAINER_ID}})
+
+        assert (await task)['Action'] == 'start'
+
+        await events.aclose()
+
+    run(test)
+
+
+def test_enricher() -> None:
+    async def test(server: StubServer) -> None:
+        result: List[Dict[str, Any]] = []
+        enricher = Enricher(result.append, Client(server.path), tag_labels=['team', 'missing'])
+
+        for _ in range(3):
+            enricher(event())
+        enricher(event('unknown'))
+        enricher({'message': {'formatted': 'no container'}})
+
+        assert len(result) == 1
+        assert enricher.waiting == 4
+
+        while enricher.waiting:
+            await asyncio.sleep(0.01)
+        enricher(event())
+        enricher(event('unknown'))
+
+        assert server.requests == {
+            f'/containers/{CONTAINER_ID}/json': 1,
+            '/containers/unknown/json': 1,
+        }
+        assert enricher.lookups == 2
+        assert enricher.coalesced == 2
+        assert len(result) == 7
+        enriched = [item for item in result if item.get('tags', {}).get('container_id') == CONTAINER_ID]
+        assert len(enriched) == 4
+        for item in enriched:
+            assert item['tags'] == {
+                'container_id': CONTAINER_ID,
+                'compose.project': 'shop',
+                'compose.service': 'web',
+                'label.team': 'payments',
+            }
+            assert item['environment'] == 'production'
+            assert item['contexts']['docker_labels'] == LABELS
+        assert [item for item in result if item.get('tags', {}).get('container_id') == 'unknown'] == [
+            event('unknown'), event('unknown'),
+        ]
+        assert enricher.hit_rate == 2 / 6
+
+    run(test, delay=0.05)
+
+
+def test_enricher_unavailable() -> None:
+    async def test() -> None:
+        result: List[Dict[str, Any]] = []
+        enricher = Enricher(result.append, Client('/nonexistent/docker.sock'))
+
+        enricher(event())
+        while enricher.waiting:
+            await asyncio.sleep(0.01)
+        enricher(event())
+
+        assert result == [event(), event()]
+        assert enricher.failed == 1
+        assert enricher.lookups == 1
+        assert enricher.unenriched == 2
+
+    asyncio.run(test())
+
+
+def test_enricher_limits() -> None:
+    async def test(server: StubServer) -> None:
+        result: List[Dict[str, Any]] = []
+        enricher = Enricher(result.append, Client(server.path), timeout=0.05, max_waiting=2)
+
+        for _ in range(3):
+            enricher(event())
+
+        assert len(result) == 1
+
+        await enricher.close()
+
+        assert len(result) == 3
+        assert enricher.unenriched == 3
+
+    run(test, delay=1.0)
+
+
+def test_enricher_events() -> None:
+    async def test(server: StubServer) -> None:
+        result: List[Dict[str, Any]] = []
+        enricher = Enricher(result.append, Client(server.path))
+        enricher.start()
+        while not server.streams:
+            await asyncio.sleep(0.01)
+
+        await server.emit({'Type': 'container', 'Action': 'start', 'Actor': {'ID': CONTAINER_ID}})
+        while CONTAINER_ID not in enricher.cache:
+            await asyncio.sleep(0.01)
+        enricher(event())
+
+        assert result[0]['tags']['compose.service'] == 'web'
+
+        server.containers[CONTAINER_ID]['Config']['Labels'] = {'com.docker.compose.service': 'api'}
+        await server.emit({'Type': 'container', 'Action': 'rename', 'Actor': {'ID': CONTAINER_ID}})
+        while enricher.cache.get(CONTAINER_ID).service != 'api':
+            await asyncio.sleep(0.01)
+        await server.emit({'Type': 'container', 'Action': 'destroy', 'Actor': {'ID': CONTAINER_ID}})
+        while CONTAINER_ID in enricher.cache:
+            await asyncio.sleep(0.01)
+
+        assert enricher.refreshed == 2
+
+        enricher.cache.set(CONTAINER_ID, Metadata('web_1', {}, None, None, None))
+        await server.emit({'Type': 'container', 'Action': 'die', 'Actor': {'ID': CONTAINER_ID}}, drop=True)
+        while enricher.cache.get(CONTAINER_ID).service != 'api':
+            await asyncio.sleep(0.01)
+
+        assert server.requests['/events'] == 2
+
+        await enricher.close()
+
+    run(test)
@@ -0,0 +1,90 @@
+from collections import namedtuple
+from typing import List
+
+import pytest
+
+from src.syslog.filter import CONTAINER, IMAGE, PriFilter, Rule, msgid
+
+TestCase = namedtuple('TestCase', 'given_string expected_result')
+
+LINE = '<{pri}>1 2020-03-22T12:35:47.385660+02:00 host.localdomain {name} 927 DOCKER:{id}~{name}_1~sha256:20da7ed64a1e~{image}~docker - message'
+MARIADB = dict(name='mariadb', id='d8e210ec875a0871880e004f8fc37e0bf56140093155b8d55aec93d9dc66a53e', image='million12/mariadb:10.4')
+NGINX = dict(name='nginx', id='6e8ef9a56b54', image='nginx:latest')
+REGISTRY = dict(name='app', id='0123456789ab', image='registry.example.com:5000/app')
+
+
+@pytest.mark.parametrize(
+    'given_string, expected_result', (
+        TestCase('container:mariadb_1=4', Rule(CONTAINER, 'mariadb_1', 4)),
+        TestCase('image:nginx:latest=0', Rule(IMAGE, 'nginx:latest', 0)),
+        TestCase('image:registry.example.com:5000/app=3', Rule(IMAGE, 'registry.example.com:5000/app', 3)),
+    ),
+)
+def test_rule(given_string: str, expected_result: Rule) -> None:
+    assert Rule.parse(given_string) == expected_result
+
+
+@pytest.mark.parametrize(
+    'given_string', ('container:mariadb_1', 'host:x=1', 'image:=1', 'image:nginx=8', 'image:nginx=-1'),
+)
+def test_rule_invalid(given_string: str) -> None:
+    with pytest.raises(ValueError):
+        Rule.parse(given_string)
+
+
+def test_msgid() -> None:
+    assert msgid(LINE.format(pri=27, **NGINX)).startswith('DOCKER:6e8ef9a56b54~nginx_1~')
+    assert msgid(LINE.format(pri=27, **NGINX).encode()) == msgid(LINE.format(pri=27, **NGINX))
+    assert msgid('<27>1 2020-03-22T12:35:47Z') is None
+
+
+def run(lines: List[str], **kwargs) -> PriFilter:
+    result: List[str] = []
+    pri_filter = PriFilter(result.append, **kwargs)
+    for line in lines:
+        pri_filter(line)
+    assert pri_filter.passed == len(result)
+    return pri_filter
+
+
+def test_severity() -> None:
+    lines = [LINE.format(pri=24 + severity, **NGINX) for severity in range(8)] + ['garbage']
+
+    pri_filter = run(lines, severity=4)
+
+    assert pri_filter.passed == 6
+    assert pri_filter.discarded == {'severity': 3, 'facility': 0}
+
+
+def test_facility() -> None:
+    lines = [LINE.format(pri=pri, **NGINX) for pri in (3, 27, 35, 131)]
+
+    pri_filter = run(lines, facilities=(3, 16))
+
+    assert pri_filter.passed == 2
+    assert pri_filter.discarded == {'severity': 0, 'facility': 2}
+
+
+def test_rules() -> None:
+    rules = [
+        Rule.parse('container:d8e210ec875a=3'),
+        Rule.parse('container:mariadb_1=7'),
+        Rule.parse('image:nginx=6'),
+        Rule.parse('image:registry.example.com:5000/app=0'),
+    ]
+    lines = [
+        LINE.format(pri=24 + severity, **container)
+        for container in (MARIADB, NGINX, REGISTRY) for severity in range(8)
+    ] + [LINE.format(pri=31, name='other', id='fedcba987654', image='other')]
+
+    pri_filter = run(lines + [line.encode() for line in lines], severity=5, rules=rules)
+
+    assert pri_filter.passed == 2 * (4 + 7 + 1)
+    assert pri_filter.discarded == {
+        'severity': 2,
+        'facility': 0,
+        'container:d8e210ec875a': 8,
+        'container:mariadb_1': 0,
+        'image:nginx': 2,
+        'image:registry.example.com:5000/app': 14,
+    }
@@ -0,0 +1,207 @@
+import asyncio
+import gzip
+import json
+import socket
+import zlib
+from collections import namedtuple
+from typing import Any, Callable, Dict, List, Tuple
+
+import pytest
+
+import src.nginx  # noqa: F401
+from src.gelf import Gelf, decompress, to_syslog
+from src.listener import Listener
+from src.multiline import Assembler
+from src.pipeline import BytesPipeline, Event, Pipeline
+from src.sentry import raw_payload
+
+TestCase = namedtuple('TestCase', 'given_message expected_result')
+
+CONTAINER_ID = 'd8e210ec875a' + '0' * 52
+NGINX_ERROR = '2020/03/21 23:30:24 [crit] 30016#0: *4 stat() failed'
+DOCKER = {
+    'version': '1.1',
+    'host': 'host.localdomain',
+    'short_message': NGINX_ERROR,
+    'timestamp': 1584880547.38566,
+    'level': 3,
+    '_container_id': CONTAINER_ID,
+    '_container_name': 'nginx_1',
+    '_image_id': 'sha256:20da7ed64a1e',
+    '_image_name': 'nginx:latest',
+    '_tag': 'd8e210ec875a',
+}
+HEADER = f'<27>1 2020-03-22T12:35:47.385660Z host.localdomain d8e210ec875a - DOCKER:{CONTAINER_ID}~nginx_1~sha256:20da7ed64a1e~nginx:latest~docker -'
+
+
+def chunked(data: bytes, count: int, key: bytes = b'\x01' * 8) -> List[bytes]:
+    size = -(-len(data) // count)
+    return [
+        b'\x1e\x0f' + key + bytes((index, count)) + data[index * size:(index + 1) * size]
+        for index in range(count)
+    ]
+
+
+@pytest.mark.parametrize(
+    'given_message, expected_result', (
+        TestCase(DOCKER, (f'{HEADER} {NGINX_ERROR}', [])),
+        TestCase({**DOCKER, 'level': 6, '_container_name': '/nginx 1'}, (f'{HEADER.replace("<27>", "<30>").replace("nginx_1", "nginx1")} {NGINX_ERROR}', [])),
+        TestCase({**DOCKER, 'short_message': 'Traceback:\r\n  File "a.py"\n'}, (f'{HEADER} Traceback:', ['  File "a.py"'])),
+        TestCase({**DOCKER, 'short_message': 'Error', 'full_message': 'Error\nat line 1'}, (f'{HEADER} Error', ['at line 1'])),
+        TestCase({**DOCKER, 'short_message': 'Error', 'full_message': 'at line 1'}, (f'{HEADER} Error', ['at line 1'])),
+        TestCase({**DOCKER, 'short_message': ''}, (HEADER, [])),
+        TestCase({'host': 'other', 'short_message': 'hello', 'timestamp': 0, '_tag': 'web'}, ('<25>1 1970-01-01T00:00:00.000000Z other web - - - hello', [])),
+        TestCase({'short_message': 'hello', 'timestamp': 0, 'level': 'x'}, ('<25>1 1970-01-01T00:00:00.000000Z - - - - - hello', [])),
+    ),
+)
+def test_to_syslog(given_message: Dict[str, Any], expected_result: Tuple[str, List[str]]) -> None:
+    result = to_syslog(given_message)
+
+    assert (result, result.continuation) == expected_result
+
+
+def test_to_syslog_parses_like_docker_syslog() -> None:
+    result: List[Event] = []
+
+    Pipeline.from_registry(result.append)(to_syslog(DOCKER))
+
+    assert result[0].envelope.asdict()['container_name'] == 'nginx_1'
+    assert result[0].container_id == CONTAINER_ID
+    assert result[0].severity == 3
+    assert result[0].inner.FORMAT == 'NGINX_ERROR'
+
+
+@pytest.mark.parametrize('given_binary', (False, True))
+@pytest.mark.parametrize('given_assembler', (False, True))
+def test_multiline_message_is_one_event(given_binary: bool, given_assembler: bool, clock) -> None:
+    result: List[Event] = []
+    consumer: Callable[[Event], None] = result.append
+    if given_assembler:
+        consumer = assembler = Assembler(consumer, clock=clock)
+    pipeline_type = BytesPipeline if given_binary else Pipeline
+    gelf = Gelf(pipeline_type.from_registry(consumer), binary=given_binary)
+
+    gelf(json.dumps({**DOCKER, 'short_message': 'Traceback:\n  File "a.py"\nValueError'}).encode())
+    gelf(json.dumps({**DOCKER, 'short_message': 'at line 1'}).encode())
+    if given_assembler:
+        assembler.flush()
+
+    assert [(event.message, list(event.continuation)) for event in result] == [
+        ('Traceback:', ['  File "a.py"', 'ValueError']),
+        ('at line 1', []),
+    ]
+
+
+def test_multiline_message_not_parsed() -> None:
+    result: List[str] = []
+    gelf = Gelf(BytesPipeline.from_registry(lambda event: None, max_length=10, fallback=result.append), binary=True)
+
+    gelf(json.dumps({**DOCKER, 'short_message': 'Error\nat line 1'}).encode())
+
+    assert raw_payload(result[0])['message']['formatted'] == f'{HEADER} Error\nat line 1'
+
+
+@pytest.mark.parametrize('given_compress', (lambda data: data, zlib.compress, gzip.compress))
+def test_decompress(given_compress) -> None:
+    data = json.dumps(DOCKER).encode()
+
+    assert decompress(given_compress(data)) == data
+
+
+@pytest.mark.parametrize('given_data', (b'\x78\x9c garbage', zlib.compress(b' ' * (2 * 1024 * 1024))))
+def test_decompress_invalid(given_data: bytes) -> None:
+    with pytest.raises(ValueError):
+        decompress(given_data)
+
+
+@pytest.mark.parametrize('given_binary', (False, True))
+def test_unchunked(given_binary: bool) -> None:
+    lines: List[Any] = []
+    gelf = Gelf(lines.append, binary=given_binary)
+
+    gelf(zlib.compress(json.dumps(DOCKER).encode()))
+    gelf(b'not json')
+    gelf(b'[1, 2]')
+
+    expected = f'{HEADER} {NGINX_ERROR}'
+    assert lines == [expected.encode() if given_binary else expected]
+    assert (gelf.messages, gelf.invalid) == (1, 2)
+
+
+def test_chunks_out_of_order() -> None:
+    lines: List[str] = []
+    gelf = Gelf(lines.append)
+    first = chunked(gzip.compress(json.dumps(DOCKER).encode()), 5)
+    second = chunked(json.dumps({**DOCKER, 'short_message': 'second'}).encode(), 3, b'\x02' * 8)
+
+    for chunk in (first[4], second[2], first[0], first[0], second[0], first[3], first[1], second[1]):
+        gelf(chunk)
+    assert lines == [f'{HEADER} second']
+    gelf(first[2])
+
+    assert lines == [f'{HEADER} second', f'{HEADER} {NGINX_ERROR}']
+    assert (gelf.chunks, gelf.duplicates, len(gelf), gelf.size) == (9, 1, 0, 0)
+
+
+@pytest.mark.parametrize(
+    'given_chunk', (
+        b'\x1e\x0f\x01',
+        b'\x1e\x0f' + b'\x01' * 8 + bytes((0, 0)),
+        b'\x1e\x0f' + b'\x01' * 8 + bytes((0, 129)),
+        b'\x1e\x0f' + b'\x01' * 8 + bytes((3, 3)),
+    ),
+)
+def test_invalid_chunk(given_chunk: bytes) -> None:
+    gelf = Gelf(lambda line: None)
+
+    gelf(given_chunk)
+
+    assert (gelf.invalid, len(gelf)) == (1, 0)
+
+
+def test_chunks_expire(clock) -> None:
+    lines: List[str] = []
+    gelf = Gelf(lines.append, timeout=5.0, clock=clock)
+    chunks = chunked(json.dumps(DOCKER).encode(), 2)
+
+    gelf(chunks[0])
+    clock.now += 4.9
+    assert gelf.expire() == 0
+    clock.now += 0.1
+    gelf(chunks[1])
+
+    assert (lines, gelf.expired, len(gelf)) == ([], 1, 1)
+
+
+def test_table_is_bounded() -> None:
+    gelf = Gelf(lambda line: None, maxsize=3, max_bytes=50)
+    for index in range(5):
+        gelf(chunked(b'{"short_message": "x"}', 2, bytes((index,)) * 8)[0])
+
+    assert (len(gelf), gelf.evicted) == (3, 2)
+
+    gelf(b'\x1e\x0f' + b'\x09' * 8 + bytes((0, 2)) + b' ' * 45)
+
+    assert len(gelf) == 1
+    assert gelf.size == 45
+
+
+def test_listener() -> None:
+    async def run() -> None:
+        lines: List[str] = []
+        gelf = Gelf(lines.append)
+        listener = Listener(lambda line: None, '127.0.0.1', None, None, gelf_port=0, gelf=gelf)
+        await listener.start()
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        for chunk in chunked(zlib.compress(json.dumps(DOCKER).encode()), 3):
+            sock.sendto(chunk, listener.gelf_address)
+        for _ in range(100):
+            if lines:
+                break
+            await asyncio.sleep(0.01)
+        sock.close()
+        listener.close()
+
+        assert lines == [f'{HEADER} {NGINX_ERROR}']
+
+    asyncio.run(run())
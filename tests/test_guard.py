@@ -0,0 +1,100 @@
+import re
+from typing import Any, List, Optional
+
+import pytest
+
+import src.common_log_format  # noqa: F401
+import src.mariadb_mysql  # noqa: F401
+import src.nginx  # noqa: F401
+from src.pipeline import Event, Pipeline
+from src.syslog.guard import well_formed
+from src.syslog.regex import RFC5424
+
+HEADER = '<165>1 2003-10-11T22:14:15.003Z mymachine.example.com evntslog - ID47'
+
+
+@pytest.mark.parametrize(
+    'given_string', (
+        f'{HEADER} -',
+        f'{HEADER} - BOM An application event log entry...',
+        f'{HEADER} [exampleSDID@32473 iut="3" eventSource="Application" eventID="1011"] BOM',
+        f'{HEADER} [exampleSDID@32473 iut="3"][examplePriority@32473 class="high"]',
+        f'{HEADER} [a b="\\]"] message',
+        f'<0>1 2003-10-11T22:14:15.003Z mymachine.example.com evntslog - ID47 -',
+        f'<191>1 2003-10-11T22:14:15.003Z mymachine.example.com evntslog - ID47 -',
+    ),
+)
+def test_well_formed(given_string: str) -> None:
+    assert well_formed(given_string)
+    assert RFC5424.match(given_string) is not None
+
+
+@pytest.mark.parametrize(
+    'given_string', (
+        f'{HEADER} ' + '[a]' * 30 + 'x',
+        f'{HEADER} ' + '[a]' * 30 + ' message\ncontinued',
+        f'{HEADER} [' + 'a' * 10000,
+        f'{HEADER} [a b=c]',
+        f'{HEADER} []',
+        f'{HEADER} [a]] message',
+        f'{HEADER} -message',
+        f'{HEADER}',
+        '<192>1 2003-10-11T22:14:15.003Z mymachine.example.com evntslog - ID47 -',
+        '<165>1 2003-10-11T22:14:15.003Z  evntslog - ID47 -',
+        'message',
+    ),
+)
+def test_not_well_formed(given_string: str) -> None:
+    assert not well_formed(given_string)
+
+
+# The envelope, counting the lines it is run on
+class Envelope:
+    def __init__(self) -> None:
+        self.lines: List[str] = []
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(RFC5424, name)
+
+    def match(self, line: str) -> Optional[re.Match]:
+        self.lines.append(line)
+        return RFC5424.match(line)
+
+
+def test_pipeline_fallback() -> None:
+    result: List[Event] = []
+    fallback: List[str] = []
+    envelope = Envelope()
+    pipeline = Pipeline(
+        result.append, envelope=envelope, max_length=200, prevalidate=well_formed,  # type: ignore
+        fallback=fallback.append,
+    )
+    lines = [
+        f'{HEADER} ' + '[a]' * 30 + 'x',
+        f'{HEADER} - ' + 'a' * 200,
+        f'{HEADER} - message',
+        'message',
+    ]
+
+    for line in lines:
+        pipeline(line)
+
+    assert envelope.lines == [lines[2]]
+    assert [event.line for event in result] == [lines[2]]
+    assert fallback == [lines[0], lines[1], lines[3]]
+    assert (pipeline.parsed, pipeline.unparsed, pipeline.rejected) == (1, 3, 3)
+
+
+# Whether the quotes cost a backtracking match is measured by `benchmarks.adversarial`
+def test_inner_format_quotes() -> None:
+    result: List[Event] = []
+    pipeline = Pipeline.from_registry(result.append)
+    escaped = f'{HEADER} - 1.1.1.1 - - [10/Oct/2000:13:55:36 -0700] "GET /\\"q\\" HTTP/1.0" 200 1'
+    line = f'{HEADER} - 1.1.1.1 - - [10/Oct/2000:13:55:36 -0700] "' + '" 200 1 ' * 1000
+
+    pipeline(line)
+    pipeline(escaped)
+
+    assert result[0].inner is None
+    assert result[1].inner.FORMAT == 'HTTPD'
+    assert result[1].inner.message == 'GET /\\"q\\" HTTP/1.0'
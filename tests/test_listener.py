@@ -0,0 +1,199 @@
+import asyncio
+import socket
+from collections import namedtuple
+from typing import List, Sequence, Tuple
+
+import pytest
+
+from src.listener import Listener, StreamProtocol
+
+TestCase = namedtuple('TestCase', 'given_chunks expected_result')
+
+RFC5424_1 = '<30>1 2020-03-22T12:35:47.385660+02:00 host.localdomain 6e8ef9a56b54 927 6e8ef9a56b54 - 2020-03-22T12:35:47.538083Z 0 [Note] [MY-012487] [InnoDB] InnoDB: DDL log recovery : begin'
+RFC5424_2 = '<165>1 2003-10-11T22:14:15.003Z mymachine.example.com evntslog - ID47 [exampleSDID@32473 iut="3" eventSource="Application" eventID="1011"] BOM An application event log entry...'
+
+
+def octet(line: str) -> bytes:
+    data = line.encode()
+    return b'%d %s' % (len(data), data)
+
+
+def feed(protocol: StreamProtocol, chunks: Sequence[bytes]) -> None:
+    for chunk in chunks:
+        while chunk:
+            buffer = protocol.get_buffer(-1)
+            size = min(len(buffer), len(chunk))
+            buffer[:size] = chunk[:size]
+            protocol.buffer_updated(size)
+            chunk = chunk[size:]
+
+
+@pytest.mark.parametrize(
+    'given_chunks, expected_result', (
+        # Octet-counting
+        TestCase([octet(RFC5424_1)], [RFC5424_1]),
+        TestCase([octet(RFC5424_1) + octet(RFC5424_2)], [RFC5424_1, RFC5424_2]),
+        TestCase([octet(RFC5424_1)[:1], octet(RFC5424_1)[1:10], octet(RFC5424_1)[10:]], [RFC5424_1]),
+        TestCase([b'5 ab\ncd'], ['ab\ncd']),
+        TestCase([b'4 <1>1', b'3 <2>'], ['<1>1', '<2>']),
+        # Non-transparent framing
+        TestCase([f'{RFC5424_1}\n{RFC5424_2}\n'.encode()], [RFC5424_1, RFC5424_2]),
+        TestCase([f'{RFC5424_1}\r\n'.encode()], [RFC5424_1]),
+        TestCase([RFC5424_1[:50].encode(), f'{RFC5424_1[50:]}\n'.encode()], [RFC5424_1]),
+        TestCase([b'\n\n<1>1 foo\n'], ['<1>1 foo']),
+        TestCase([b'<1>1 foo'], []),
+        # Lines that start with digits but no MSG-LEN
+        TestCase([b'2020-03-22 boot ok\n'], ['2020-03-22 boot ok']),
+        TestCase([b'12a4 hello\n'], ['12a4 hello']),
+        TestCase([b'05 hello\n'], ['05 hello']),
+        TestCase([b'12', b'345678901 <1>1\n'], ['12345678901 <1>1']),
+        TestCase([b'2020', b'-03-22 boot ok\n', octet('<1>1')], ['2020-03-22 boot ok', '<1>1']),
+        # Mixed
+        TestCase([octet(RFC5424_1) + f'{RFC5424_2}\n'.encode() + octet('<1>1')], [RFC5424_1, RFC5424_2, '<1>1']),
+        # Invalid UTF-8
+        TestCase([b'<1>1 \xff\n'], ['<1>1 �']),
+    ),
+)
+def test_stream_framing(given_chunks: List[bytes], expected_result: List[str]) -> None:
+    result: List[str] = []
+    protocol = StreamProtocol(result.append)
+
+    feed(protocol, given_chunks)
+
+    assert result == expected_result
+    assert protocol.frames == len(expected_result)
+    assert protocol.errors == 0
+
+
+def test_stream_eof_flushes_unterminated_line() -> None:
+    result: List[str] = []
+    protocol = StreamProtocol(result.append)
+
+    feed(protocol, [b'<1>1 foo\n<2>1 bar'])
+    protocol.eof_received()
+
+    assert result == ['<1>1 foo', '<2>1 bar']
+
+
+def test_stream_buffer_is_reused() -> None:
+    result: List[str] = []
+    protocol = StreamProtocol(result.append, max_size=64)
+
+    feed(protocol, [octet('<1>1 %02d' % index) for index in range(1000)])
+
+    assert len(result) == 1000
+    assert result[-1] == '<1>1 999'
+    assert protocol.errors == 0
+
+
+@pytest.mark.parametrize(
+    'given_chunks', (
+        [b'100 <1>1 foo'],
+        [b'1234567890 <1>1'],
+        [b'x' * 100],
+    ),
+)
+def test_stream_oversized_frame(given_chunks: List[bytes]) -> None:
+    result: List[str] = []
+    protocol = StreamProtocol(result.append, max_size=64)
+
+    feed(protocol, given_chunks + [b'<1>1 next\n'])
+
+    assert protocol.errors >= 1
+
+
+@pytest.mark.parametrize(
+    'given_chunks, expected_result', (
+        TestCase([b'x' * 100 + b' TAIL\n<27>1 next\n'], (['<27>1 next'], 1)),
+        TestCase([b'x' * 70, b'x' * 70, b'x' * 70 + b' TAIL', b'\n<27>1 next\n'], (['<27>1 next'], 1)),
+        TestCase([b'x' * 100, b'\n<27>1 next\n', b'y' * 100 + b'\n<27>1 last\n'], (['<27>1 next', '<27>1 last'], 2)),
+    ),
+)
+def test_stream_overlong_line(given_chunks: List[bytes], expected_result: Tuple[List[str], int]) -> None:
+    result: List[str] = []
+    protocol = StreamProtocol(result.append, max_size=64)
+
+    feed(protocol, given_chunks)
+    protocol.eof_received()
+
+    assert (result, protocol.errors) == expected_result
+
+
+def test_stream_overlong_line_at_eof() -> None:
+    result: List[str] = []
+    protocol = StreamProtocol(result.append, max_size=64)
+
+    feed(protocol, [b'x' * 100])
+    protocol.eof_received()
+
+    assert (result, protocol.errors) == ([], 1)
+
+
+def test_stream_binary() -> None:
+    result: List[bytes] = []
+    protocol = StreamProtocol(result.append, binary=True)
+
+    feed(protocol, [octet(RFC5424_1) + b'<1>1 \xff\r\n'])
+
+    assert result == [RFC5424_1.encode(), b'<1>1 \xff']
+
+
+@pytest.mark.parametrize('given_binary', (False, True))
+def test_listener(given_binary: bool) -> None:
+    result: List[str] = []
+
+    async def run() -> None:
+        listener = Listener(result.append, '127.0.0.1', udp_port=0, tcp_port=0, binary=given_binary)
+        await listener.start()
+
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            for line in (RFC5424_1, RFC5424_2):
+                sock.sendto(line.encode(), listener.udp_address)
+        _, writer = await asyncio.open_connection(*listener.tcp_address)
+        writer.write(octet(RFC5424_1) + f'{RFC5424_2}\n'.encode())
+        await writer.drain()
+        writer.close()
+
+        for _ in range(100):
+            if len(result) == 4:
+                break
+            await asyncio.sleep(0.01)
+        listener.close()
+        await listener.wait_closed()
+
+    asyncio.run(run())
+
+    expected_result = [RFC5424_1, RFC5424_2] * 2
+    assert sorted(result) == sorted(line.encode() if given_binary else line for line in expected_result)
+
+
+def test_listener_pause_reading() -> None:
+    result: List[str] = []
+
+    async def wait(count: int) -> None:
+        for _ in range(100):
+            if len(result) >= count:
+                break
+            await asyncio.sleep(0.01)
+
+    async def run() -> None:
+        listener = Listener(result.append, '127.0.0.1', udp_port=None, tcp_port=0)
+        await listener.start()
+        _, writer = await asyncio.open_connection(*listener.tcp_address)
+        writer.write(f'{RFC5424_1}\n'.encode())
+        await wait(1)
+
+        listener.pause_reading()
+        writer.write(f'{RFC5424_2}\n'.encode())
+        await asyncio.sleep(0.05)
+        assert result == [RFC5424_1]
+
+        listener.resume_reading()
+        await wait(2)
+        writer.close()
+        listener.close()
+        await listener.wait_closed()
+
+    asyncio.run(run())
+
+    assert result == [RFC5424_1, RFC5424_2]
@@ -0,0 +1,138 @@
+import asyncio
+from collections import namedtuple
+from typing import List
+
+import pytest
+
+import src.common_log_format  # noqa: F401
+import src.mariadb_mysql  # noqa: F401
+import src.nginx  # noqa: F401
+from src.metrics import Exporter, Histogram, Metrics, SlowLine
+from src.pipeline import BytesPipeline, Event, Pipeline
+from src.sentry import Sender
+from src.sentry.stub import StubServer
+
+TestCase = namedtuple('TestCase', 'given_values expected_result')
+
+RFC5424_DOCKER = '<27>1 2020-03-21T23:30:24Z host.localdomain nginx 927 DOCKER:d8e210ec875a~nginx_1~sha256:20da7ed64a1e~nginx:latest~docker - 2020/03/21 23:30:24 [crit] 30016#0: *4 stat() failed (13: Permission denied)'
+RFC5424_NOISE = '<30>1 2020-03-21T23:30:24Z host.localdomain nginx 927 DOCKER:d8e210ec875a~nginx_1~sha256:20da7ed64a1e~nginx:latest~docker - Traceback (most recent call last):'
+
+
+def consume(event: Event) -> None:
+    event.inner
+
+
+@pytest.mark.parametrize(
+    'given_values, expected_result', (
+        TestCase([], (0, 0.0, 0.0)),
+        TestCase([2e-6] * 9 + [0.3], (10, 2.5e-6, 0.5)),
+        TestCase([1e-6, 1e-6, 20.0], (3, 1e-6, float('inf'))),
+    ),
+)
+def test_histogram(given_values: List[float], expected_result: tuple) -> None:
+    histogram = Histogram()
+    for value in given_values:
+        histogram.observe(value)
+
+    assert (histogram.count, histogram.quantile(0.5), histogram.quantile(0.99)) == expected_result
+    assert histogram.cumulative()[-1] == (float('inf'), len(given_values))
+
+
+def test_stage_samples_every_nth_call() -> None:
+    metrics = Metrics(sample=4)
+    first, second = metrics.stage('first'), metrics.stage('second')
+
+    assert [first.sampled() for _ in range(8)] == [False, False, False, True] * 2
+    assert second.sampled() is False
+    assert metrics.stage('first') is first
+
+
+def test_invalid_sample() -> None:
+    with pytest.raises(ValueError, match='sample'):
+        Metrics(sample=0)
+
+
+@pytest.mark.parametrize('given_bytes', (False, True))
+def test_pipeline_counts_and_times(given_bytes: bool) -> None:
+    metrics = Metrics(sample=1)
+    if given_bytes:
+        pipeline = BytesPipeline.from_registry(consume, metrics=metrics)
+        lines = [line.encode() for line in (RFC5424_DOCKER, RFC5424_DOCKER, RFC5424_NOISE, 'garbage')]
+    else:
+        pipeline = Pipeline.from_registry(consume, metrics=metrics)
+        lines = [RFC5424_DOCKER, RFC5424_DOCKER, RFC5424_NOISE, 'garbage']
+
+    for line in lines:
+        pipeline(line)
+
+    assert pipeline.hits == {'RFC5424': 3, 'MYSQL': 0, 'NGINX_ERROR': 2, 'HTTPD': 0}
+    assert (pipeline.unparsed, pipeline.classifier.misses) == (1, 1)
+    assert metrics.stages['parse'].histogram.count == 4
+    assert metrics.stages['classify'].histogram.count == 3
+
+
+def test_slow_lines_name_their_pattern() -> None:
+    slow: List[SlowLine] = []
+    metrics = Metrics(sample=1, slow=0.0, on_slow=slow.append)
+    pipeline = Pipeline.from_registry(consume, metrics=metrics)
+
+    pipeline(RFC5424_DOCKER)
+
+    assert [(line.stage, line.line) for line in slow] == [
+        ('parse', RFC5424_DOCKER), ('classify', RFC5424_DOCKER.split(' - ', 1)[1]),
+    ]
+    assert slow[0].pattern == 'RFC5424'
+    # Whichever inner pattern happened to take longest on this run
+    assert slow[1].pattern in pipeline.classifier.hits
+    assert sum(metrics.slow_lines.values()) == 2
+
+
+def test_snapshot_and_render() -> None:
+    metrics = Metrics(sample=1)
+    pipeline = Pipeline.from_registry(consume, metrics=metrics)
+    metrics.counter('pattern_matches_total', 'Lines matched', 'pattern', lambda: pipeline.hits)
+    metrics.gauge('queue_depth', 'Lines waiting', None, lambda: 7)
+    pipeline(RFC5424_DOCKER)
+
+    snapshot = metrics.snapshot()
+    text = metrics.render()
+
+    assert snapshot['pattern_matches_total']['NGINX_ERROR'] == 1
+    assert snapshot['queue_depth'] == 7
+    assert snapshot['stage_seconds']['parse']['count'] == 1
+    assert snapshot['stage_seconds']['parse']['buckets'][float('inf')] == 1
+    assert '# TYPE docker_sentry_proxy_queue_depth gauge\ndocker_sentry_proxy_queue_depth 7\n' in text
+    assert 'docker_sentry_proxy_pattern_matches_total{pattern="NGINX_ERROR"} 1\n' in text
+    assert 'docker_sentry_proxy_stage_seconds_bucket{stage="parse",le="+Inf"} 1\n' in text
+    assert 'docker_sentry_proxy_stage_seconds_count{stage="classify"} 1\n' in text
+
+
+def test_exporter_and_sender() -> None:
+    async def get(address: tuple, path: str) -> bytes:
+        reader, writer = await asyncio.open_connection(*address)
+        writer.write(f'GET {path} HTTP/1.1\r\nHost: metrics\r\n\r\n'.encode())
+        response = await reader.read()
+        writer.close()
+        return response
+
+    async def run() -> None:
+        metrics = Metrics()
+        stub = StubServer()
+        await stub.start()
+        sender = Sender(stub.dsn(), batch_size=1, metrics=metrics)
+        sender.send({'message': 'foo'})
+        await sender.close()
+        await stub.close()
+        exporter = Exporter(metrics, '127.0.0.1', 0)
+        await exporter.start()
+
+        found = await get(exporter.address, '/metrics')
+        missing = await get(exporter.address, '/')
+        await exporter.close()
+
+        assert found.startswith(b'HTTP/1.1 200 OK\r\n')
+        assert b'docker_sentry_proxy_stage_seconds_count{stage="send"} 1\n' in found
+        assert missing.startswith(b'HTTP/1.1 404 ')
+        assert exporter.scrapes == 1
+
+    asyncio.run(run())
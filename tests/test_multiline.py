@@ -0,0 +1,124 @@
+from typing import List
+
+import src.mariadb_mysql  # noqa: F401
+from src.multiline import Assembler
+from src.pipeline import Event, Pipeline
+from src.sentry import payload
+from src.timestamp import Normalizer
+
+HEADER = '<27>1 2020-03-22T12:35:47.385660+02:00 host.localdomain {name} {proc_id} DOCKER:{id}~{name}_1~sha256:20da7ed64a1e~{name}:latest~docker -'
+MARIADB = HEADER.format(name='mariadb', proc_id=927, id='d8e210ec875a')
+PYTHON = HEADER.format(name='python', proc_id=928, id='6e8ef9a56b54')
+HEAD = f'{MARIADB} 2020-03-22 12:35:47 0 [ERROR] InnoDB: Unable to lock ./ibdata1 error: 11'
+CONTINUATION = (
+    f'{MARIADB} InnoDB: Check that you do not already have another mysqld process',
+    f'{MARIADB} InnoDB: using the same InnoDB data or log files.',
+)
+
+
+def assemble(lines: List[str], **kwargs) -> List[Event]:
+    result: List[Event] = []
+    assembler = Assembler(result.append, **kwargs)
+    pipeline = Pipeline.from_registry(assembler)
+    for line in lines:
+        pipeline(line)
+    assembler.flush()
+    return result
+
+
+def messages(events: List[Event]) -> List[list]:
+    return [[event.message, *event.continuation] for event in events]
+
+
+def test_continuation() -> None:
+    result = assemble([HEAD, *CONTINUATION, HEAD])
+
+    assert messages(result) == [
+        [HEAD[len(MARIADB) + 1:], *(line[len(MARIADB) + 1:] for line in CONTINUATION)],
+        [HEAD[len(MARIADB) + 1:]],
+    ]
+    assert payload(result[0], Normalizer())['message']['formatted'] == '\n'.join((
+        'InnoDB: Unable to lock ./ibdata1 error: 11',
+        'InnoDB: Check that you do not already have another mysqld process',
+        'InnoDB: using the same InnoDB data or log files.',
+    ))
+
+
+def test_continuation_per_stream() -> None:
+    other = f'{PYTHON} Traceback (most recent call last):'
+    result = assemble([HEAD, other, CONTINUATION[0], other.replace('<27>', '<30>'), HEAD])
+
+    assert [(event.container_id, len(event.continuation)) for event in result] == [
+        ('6e8ef9a56b54', 0),
+        ('6e8ef9a56b54', 0),
+        ('d8e210ec875a', 1),
+        ('d8e210ec875a', 0),
+    ]
+
+
+def test_continuation_without_head() -> None:
+    result = assemble([*CONTINUATION, HEAD, CONTINUATION[0].replace('<27>', '<30>')])
+
+    assert [len(event.continuation) for event in result] == [0, 0, 0, 0]
+
+
+def test_max_lines() -> None:
+    result = assemble([HEAD] + [CONTINUATION[0]] * 6, max_lines=3)
+
+    assert [len(event.continuation) for event in result] == [2, 2, 0]
+    assert result[1].inner is None
+
+
+def test_max_bytes() -> None:
+    result = assemble([HEAD] + [CONTINUATION[0]] * 6, max_bytes=len(HEAD) + 150)
+
+    assert [len(event.continuation) for event in result] == [2, 2, 0]
+
+
+def test_idle(clock) -> None:
+    result: List[Event] = []
+    assembler = Assembler(result.append, idle=1.0, clock=clock)
+    pipeline = Pipeline.from_registry(assembler)
+
+    pipeline(HEAD)
+    clock.now = 0.9
+    pipeline(CONTINUATION[0])
+    clock.now = 1.5
+    assert assembler.expire() == 0
+    pipeline(CONTINUATION[1])
+    clock.now = 2.4
+    assert assembler.expire() == 0
+    assert result == []
+
+    clock.now = 2.7
+    assert assembler.expire() == 1
+    assert [len(event.continuation) for event in result] == [2]
+    assert len(assembler) == 0
+    assert assembler.size == 0
+
+
+def test_idle_on_line(clock) -> None:
+    result: List[Event] = []
+    assembler = Assembler(result.append, idle=1.0, clock=clock)
+    pipeline = Pipeline.from_registry(assembler)
+
+    pipeline(HEAD)
+    clock.now = 5.0
+    pipeline(CONTINUATION[0])
+
+    assert [len(event.continuation) for event in result] == [0, 0]
+    assert assembler.expired == 1
+
+
+def test_max_memory() -> None:
+    result: List[Event] = []
+    assembler = Assembler(result.append, max_memory=3 * len(HEAD))
+    pipeline = Pipeline.from_registry(assembler)
+
+    for index in range(10):
+        pipeline(HEAD.replace('927', str(index)))
+
+    assert len(assembler) == 3
+    assert assembler.evicted == 7
+    assert [event.envelope.proc_id for event in result] == [str(index) for index in range(7)]
+    assert assembler.size == 3 * (len(HEAD) - 2)
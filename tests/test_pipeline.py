@@ -0,0 +1,173 @@
+from collections import namedtuple
+from typing import List, Optional
+
+import pytest
+
+import src.common_log_format  # noqa: F401
+import src.mariadb_mysql  # noqa: F401
+import src.nginx  # noqa: F401
+from src.cache import LRUCache
+from src.pipeline import BytesPipeline, Event, Pipeline
+
+TestCase = namedtuple('TestCase', 'given_string expected_result')
+
+RFC5424_1 = '<30>1 2020-03-22T12:35:47.385660+02:00 host.localdomain 6e8ef9a56b54 927 6e8ef9a56b54 - 2020-03-22T12:35:47.538083Z 0 [Note] [MY-012487] [InnoDB] InnoDB: DDL log recovery : begin'
+RFC5424_2 = '<165>1 2003-10-11T22:14:15.003Z mymachine.example.com evntslog - ID47 [exampleSDID@32473 iut="3" eventSource="Application" eventID="1011"] BOM An application event log entry...'
+RFC5424_3 = '<165>1 2003-10-11T22:14:15.003Z mymachine.example.com evntslog - ID47 [exampleSDID@32473 iut="3" eventSource="Application" eventID="1011"][examplePriority@32473 class="high"]'
+RFC5424_DOCKER = '<27>1 2020-03-21T23:30:24Z host.localdomain nginx 927 DOCKER:d8e210ec875a~nginx_1~sha256:20da7ed64a1e~nginx:latest~docker - 2020/03/21 23:30:24 [crit] 30016#0: *4 stat() failed (13: Permission denied)'
+
+
+def parse(line: str, severity: int = 7) -> Optional[Event]:
+    result: List[Event] = []
+    Pipeline.from_registry(result.append, severity)(line)
+    return result[0] if result else None
+
+
+@pytest.mark.parametrize(
+    'given_string, expected_result', (
+        TestCase(RFC5424_1, (30, 6, 3, None, '2020-03-22T12:35:47.538083Z 0 [Note] [MY-012487] [InnoDB] InnoDB: DDL log recovery : begin', 'MYSQL')),
+        TestCase(RFC5424_2, (165, 5, 20, None, 'BOM An application event log entry...', None)),
+        TestCase(RFC5424_3, (165, 5, 20, None, None, None)),
+        TestCase(RFC5424_DOCKER, (27, 3, 3, 'd8e210ec875a', '2020/03/21 23:30:24 [crit] 30016#0: *4 stat() failed (13: Permission denied)', 'NGINX_ERROR')),
+    ),
+)
+def test_event(given_string: str, expected_result: tuple) -> None:
+    event = parse(given_string)
+
+    assert event is not None
+    assert (
+        event.priority,
+        event.severity,
+        event.facility,
+        event.container_id,
+        event.message,
+        event.inner.FORMAT if event.inner else None,
+    ) == expected_result
+
+
+def test_event_inner_groups() -> None:
+    event = parse(RFC5424_1)
+
+    assert event.inner.FORMAT == 'MYSQL'
+    assert event.inner.asdict() == {
+        'year': '2020', 'month': '03', 'day': '22',
+        'hour': '12', 'minute': '35', 'second': '47', 'microsecond': '538083',
+        'timezone': 'Z',
+        'thread_id': '0',
+        'level': 'Note',
+        'err_code': 'MY-012487',
+        'subsystem': 'InnoDB',
+        'message': 'InnoDB: DDL log recovery : begin',
+    }
+
+
+def test_event_inner_is_lazy() -> None:
+    class Classifier:
+        calls = 0
+
+        def match(self, line, key=None):
+            self.calls += 1
+            return 'FOO', line
+
+    classifier = Classifier()
+    result: List[Event] = []
+    Pipeline(result.append, classifier)(RFC5424_2)  # type: ignore
+
+    assert classifier.calls == 0
+    assert result[0].inner == ('FOO', 'BOM An application event log entry...')
+    assert result[0].inner == ('FOO', 'BOM An application event log entry...')
+    assert classifier.calls == 1
+
+
+def test_event_structured_data_is_cached() -> None:
+    event = parse(RFC5424_3)
+
+    result = event.structured_data
+
+    assert result == {'exampleSDID@32473': {'iut': '3', 'eventSource': 'Application', 'eventID': '1011'}, 'examplePriority@32473': {'class': 'high'}}
+    assert event.structured_data is result
+    assert parse(RFC5424_1).structured_data == {}
+
+
+@pytest.mark.parametrize(
+    'given_severity, expected_result', (
+        (7, 'MYSQL'),
+        (6, 'MYSQL'),
+        (5, None),
+        (0, None),
+    ),
+)
+def test_severity_threshold(given_severity: int, expected_result: Optional[str]) -> None:
+    event = parse(RFC5424_1, given_severity)
+
+    assert (event.inner.FORMAT if event.inner else None) == expected_result
+
+
+def test_unparsed() -> None:
+    result: List[Event] = []
+    pipeline = Pipeline.from_registry(result.append)
+
+    pipeline('foo')
+    pipeline(RFC5424_1)
+
+    assert (pipeline.parsed, pipeline.unparsed) == (1, 1)
+    assert len(result) == 1
+
+
+def test_container_cache() -> None:
+    cache = LRUCache(maxsize=10)
+    result: List[Event] = []
+    pipeline = Pipeline.from_registry(result.append, cache=cache)
+
+    pipeline(RFC5424_DOCKER)
+    pipeline(RFC5424_DOCKER)
+
+    assert [event.inner.FORMAT for event in result] == ['NGINX_ERROR', 'NGINX_ERROR']
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+@pytest.mark.parametrize('given_string', (RFC5424_1, RFC5424_2, RFC5424_3, RFC5424_DOCKER))
+def test_bytes_pipeline(given_string: str) -> None:
+    expected_result = parse(given_string)
+    result: List[Event] = []
+    pipeline = BytesPipeline.from_registry(result.append)
+
+    pipeline(given_string.encode())
+    pipeline(memoryview(bytearray(given_string.encode())))
+
+    for event in result:
+        assert event.line == given_string.encode()
+        assert event.envelope.FORMAT == 'RFC5424'
+        assert event.envelope.asdict() == expected_result.envelope.asdict()
+        assert event.message == expected_result.message
+        assert event.structured_data == expected_result.structured_data
+        assert event.inner == expected_result.inner
+    assert (pipeline.parsed, pipeline.unparsed) == (2, 0)
+
+
+INVALID_UTF8 = b'<165>1 2003-10-11T22:14:15.003Z mymachine.example.com evntslog\xff - ID47 - BOM \xc3\x28 \xc5\xbc'
+
+
+@pytest.mark.parametrize(
+    'given_errors, expected_result', (
+        TestCase('replace', ('evntslog\ufffd', 'BOM \ufffd( ż')),
+        TestCase('backslashreplace', ('evntslog\\xff', 'BOM \\xc3( ż')),
+        TestCase('strict', None),
+    ),
+)
+def test_bytes_pipeline_invalid_utf8(given_errors: str, expected_result: Optional[tuple]) -> None:
+    result: List[Event] = []
+    fallback: List[str] = []
+    pipeline = BytesPipeline.from_registry(result.append, fallback=fallback.append, errors=given_errors)
+
+    pipeline(INVALID_UTF8)
+    pipeline(RFC5424_2.encode())
+
+    assert len(result) == (1 if expected_result is None else 2)
+    assert result[-1].message == 'BOM An application event log entry...'
+    if expected_result is None:
+        assert fallback == [INVALID_UTF8.decode('utf-8', 'replace')]
+        assert (pipeline.rejected, pipeline.unparsed) == (1, 1)
+    else:
+        assert (result[0].envelope.appname, result[0].message) == expected_result
+        assert fallback == []
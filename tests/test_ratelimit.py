@@ -0,0 +1,184 @@
+from collections import namedtuple
+from typing import Any, Dict, List
+
+import pytest
+
+from src.ratelimit import Limit, RateLimiter
+
+TestCase = namedtuple('TestCase', 'given_string expected_result')
+
+CONTAINER_ID = 'd8e210ec875a' + '0' * 52
+
+
+def event(message: str = 'Unable to lock ./ibdata1', container: str = 'mariadb_1', level: str = 'error', fmt: str = 'MYSQL', severity: int = 3) -> Dict[str, Any]:
+    return {
+        'timestamp': 1000.0,
+        'level': level,
+        'message': {'formatted': message},
+        'tags': {
+            'container_id': f'{container}-{CONTAINER_ID}',
+            'container_name': container,
+            'image_name': 'mariadb:10.4',
+            'format': fmt,
+            'severity': str(severity),
+        },
+    }
+
+
+@pytest.mark.parametrize(
+    'given_string, expected_result', (
+        TestCase('container:mariadb_1=10/60', Limit('container', 'mariadb_1', 10, 60.0)),
+        TestCase('image:mariadb:10.4=1/0.5', Limit('image', 'mariadb:10.4', 1, 0.5)),
+        TestCase('format:MYSQL=100/1', Limit('format', 'MYSQL', 100, 1.0)),
+        TestCase('severity:3=5/60', Limit('severity', '3', 5, 60.0)),
+        TestCase('*=1000/60', Limit('*', '', 1000, 60.0)),
+        TestCase('severity:8=5/60', None),
+        TestCase('container:=5/60', None),
+        TestCase('pod:foo=5/60', None),
+        TestCase('*=0/60', None),
+        TestCase('*=5/0', None),
+        TestCase('*=5', None),
+        TestCase('*:foo=5/60', None),
+    ),
+)
+def test_limit_parse(given_string: str, expected_result: Limit) -> None:
+    if expected_result is None:
+        with pytest.raises(ValueError):
+            Limit.parse(given_string)
+    else:
+        assert Limit.parse(given_string) == expected_result
+
+
+@pytest.mark.parametrize(
+    'given_string, expected_result', (
+        TestCase('container:mariadb_1=1/1', True),
+        TestCase('container:mariadb_2=1/1', False),
+        TestCase('image:mariadb=1/1', True),
+        TestCase('image:mariadb:10.4=1/1', True),
+        TestCase('image:mysql=1/1', False),
+        TestCase('format:MYSQL=1/1', True),
+        TestCase('format:HTTPD=1/1', False),
+        TestCase('severity:3=1/1', True),
+        TestCase('severity:0=1/1', False),
+        TestCase('*=1/1', True),
+    ),
+)
+def test_limit_matches(given_string: str, expected_result: bool) -> None:
+    assert Limit.parse(given_string).matches(event()) is expected_result
+
+
+def test_limit_matches_severities_of_one_level() -> None:
+    # emergency, alert and critical are all "fatal" in Sentry
+    given_events = [event(level='fatal', severity=severity) for severity in (0, 1, 2)]
+
+    assert [Limit.parse('severity:1=1/1').matches(item) for item in given_events] == [
+        False, True, False,
+    ]
+
+
+def test_rate_limit(clock) -> None:
+    result: List[Dict[str, Any]] = []
+    limiter = RateLimiter(
+        result.append, [Limit.parse('container:mariadb_1=10/10'), Limit.parse('*=100/10')],
+        window=60.0, clock=clock,
+    )
+
+    for index in range(25):
+        limiter(event(f'Aborted connection {index}'))
+    limiter(event(container='mariadb_2'))
+
+    assert len(result) == 11
+    assert limiter.suppressed == 15
+
+    clock.now = 5.0
+    for index in range(10):
+        limiter(event(f'Aborted connection {index}'))
+
+    assert len(result) == 16
+
+    clock.now = 60.0
+    assert limiter.expire() == 1
+    assert len(limiter) == 0
+    summary = result[-1]
+    assert summary['message']['formatted'] == '20 events suppressed by rate limit container:mariadb_1'
+    assert summary['level'] == 'warning'
+    assert summary['tags']['rate_limit'] == 'container:mariadb_1'
+    assert summary['tags']['container_name'] == 'mariadb_1'
+    assert summary['extra']['suppressed'] == 20
+    assert summary['extra']['example'] == 'Aborted connection 10'
+
+
+def test_rate_limit_fingerprint(clock) -> None:
+    result: List[Dict[str, Any]] = []
+    limiter = RateLimiter(
+        result.append, [Limit.parse('*=5/10')], [Limit.parse('*=2/10')], clock=clock,
+    )
+
+    for index in range(3):
+        limiter(event(f'Aborted connection {index}'))
+    limiter(event('Unable to lock ./ibdata1'))
+    limiter({**event('Aborted connection 9'), 'fingerprint': ['mariadb_1', 'error']})
+    limiter(event('Unable to lock ./ibdata1'))
+
+    assert [item['message']['formatted'] for item in result] == [
+        'Aborted connection 0',
+        'Aborted connection 1',
+        'Unable to lock ./ibdata1',
+        'Aborted connection 9',
+        'Unable to lock ./ibdata1',
+    ]
+
+    # The container bucket is empty now, one token is refilled every 2 seconds
+    limiter(event('Out of memory'))
+    clock.now = 2.0
+    limiter(event('Out of memory'))
+    limiter(event('Out of memory'))
+
+    assert [item['message']['formatted'] for item in result[5:]] == ['Out of memory']
+    assert limiter.suppressed == 3
+
+    limiter.flush()
+
+    assert [item['message']['formatted'] for item in result[6:]] == [
+        '1 events suppressed by rate limit *',
+        '2 events suppressed by rate limit *',
+    ]
+
+
+def test_rate_limit_eviction(clock) -> None:
+    result: List[Dict[str, Any]] = []
+    limiter = RateLimiter(result.append, [Limit.parse('*=10/10')], maxsize=100, clock=clock)
+
+    for index in range(150):
+        limiter(event(container=f'container_{index}'))
+
+    assert len(limiter) == 100
+    assert limiter.evicted == 50
+
+    clock.now = 0.5
+    limiter(event(container='container_149'))
+
+    assert len(limiter) == 100
+    clock.now = 1.0
+    limiter.expire()
+
+    assert len(limiter) == 1
+    assert len(result) == 151
+
+
+def test_rate_limit_suppressed_eviction(clock) -> None:
+    result: List[Dict[str, Any]] = []
+    limiter = RateLimiter(result.append, [Limit.parse('*=1/10')], maxsize=2, clock=clock)
+
+    for index in range(3):
+        limiter(event(container=f'container_{index}'))
+        limiter(event(container=f'container_{index}'))
+
+    assert limiter.suppressed == 3
+    assert limiter.summaries == 1
+    assert result[-1]['tags']['container_name'] == 'container_0'
+    assert result[-1]['extra']['suppressed'] == 1
+
+    limiter.flush()
+
+    assert [item['tags']['container_name'] for item in result[-2:]] == ['container_1', 'container_2']
@@ -0,0 +1,95 @@
+import re
+from collections import namedtuple
+from typing import Dict, Optional
+
+import pytest
+
+import src
+from src.common_log_format.regex import HTTPD
+from src.mariadb_mysql.regex import MYSQL
+from src.nginx.regex import NGINX_ERROR
+from src.record import Record, Spans, record_type
+from src.syslog.regex import RFC5424
+
+TestCase = namedtuple('TestCase', 'given_name given_expression given_string')
+
+
+@pytest.mark.parametrize(
+    'given_name, given_expression, given_string', (
+        TestCase('RFC5424', RFC5424, '<165>1 2003-10-11T22:14:15.003Z mymachine.example.com evntslog - ID47 [exampleSDID@32473 iut="3" eventSource="Application" eventID="1011"] BOM An application event log entry...'),
+        TestCase('HTTPD', HTTPD, '127.0.0.1 - frank [10/Oct/2000:13:55:36 +0130] "GET /apache_pb.gif HTTP/1.0" 200 2326 "http://www.example.com/start.html" "Mozilla/4.08 [en] (Win98; I ;Nav)"'),
+        TestCase('MYSQL', MYSQL, '2020-03-22T12:35:47.538083Z 0 [Note] [MY-012487] [InnoDB] InnoDB: DDL log recovery : begin'),
+        TestCase('NGINX_ERROR', NGINX_ERROR, '2020/03/21 23:30:24 [crit] 30016#0: *4 stat() "/var/www/html/index.php" failed (13: Permission denied)'),
+    ),
+)
+def test_record(given_name: str, given_expression: re.Pattern, given_string: str) -> None:
+    match = given_expression.match(given_string)
+    expected_result: Dict[str, Optional[str]] = match.groupdict()
+
+    result = record_type(given_name, given_expression)(match)
+
+    assert isinstance(result, Record)
+    assert result.FORMAT == given_name
+    assert result.PATTERN is given_expression
+    assert result.FIELDS == tuple(expected_result)
+    assert {key: getattr(result, key) for key in result.FIELDS} == expected_result
+    assert result.asdict() == expected_result
+    assert result.astuple() == tuple(expected_result.values())
+
+
+def test_record_type_is_cached() -> None:
+    assert record_type('MYSQL', MYSQL) is record_type('MYSQL', MYSQL)
+    assert record_type('MYSQL', MYSQL) is not record_type('OTHER', MYSQL)
+    assert record_type('NGINX_ERROR', NGINX_ERROR).__name__ == 'NginxErrorRecord'
+
+
+def test_record_has_no_instance_dict() -> None:
+    result = record_type('MYSQL', MYSQL)(MYSQL.match('2020-03-22 12:35:47 1 [Note] foo'))
+
+    assert not hasattr(result, '__dict__')
+    with pytest.raises(AttributeError):
+        result.level = 'Error'
+
+
+def test_record_equality_and_span() -> None:
+    given_string = '2020-03-22 12:35:47 1 [Note] foo'
+    given_type = record_type('MYSQL', MYSQL)
+
+    result = given_type(MYSQL.match(given_string))
+
+    assert result == given_type(MYSQL.match(given_string))
+    assert result != given_type(MYSQL.match('2020-03-22 12:35:47 1 [Note] bar'))
+    assert result.span('message') == (29, 32)
+    assert 'MYSQL' in repr(result)
+
+
+def test_single_field() -> None:
+    given_type = record_type('SINGLE', re.compile(r'(?P<word>\w+)'))
+
+    assert given_type(given_type.PATTERN.match('foo')).astuple() == ('foo',)
+
+
+def test_spans() -> None:
+    given_string = '2020-03-22T12:35:47.538083Z 0 [Note] [MY-012487] [InnoDB] InnoDB: DDL log recovery : begin'
+    match = MYSQL.match(given_string)
+    record = record_type('MYSQL', MYSQL)(match)
+    spans = [0] * 4 + [value for span in match.regs for value in span]
+
+    result = record_type('MYSQL', MYSQL)(Spans(MYSQL, given_string, spans, 4))
+
+    assert result == record
+    assert result.asdict() == record.asdict()
+    assert result.group() == given_string
+    assert result.group('level', 2) == ('Note', '03')
+    assert result.span('message') == match.span('message')
+    assert result.microsecond == '538083'
+    assert result.timezone == 'Z'
+
+
+def test_contexts() -> None:
+    given_string = '2020-03-22T12:35:47.538083Z 0 [Note] [MY-012487] [InnoDB] InnoDB: DDL log recovery : begin'
+    record = record_type('MYSQL', MYSQL)(MYSQL.match(given_string))
+
+    assert record.ROUTES == src.get_routes(MYSQL)
+    assert record.contexts() == {'mysql': {'err_code': 'MY-012487', 'subsystem': 'InnoDB'}}
+    assert record_type('MYSQL', MYSQL)(MYSQL.match('2020-03-22 12:35:47 1 [Note] bar')).contexts() == {}
@@ -0,0 +1,55 @@
+import re
+
+import pytest
+
+import src
+import src.common_log_format  # noqa: F401
+import src.mariadb_mysql  # noqa: F401
+import src.nginx  # noqa: F401
+import src.syslog  # noqa: F401
+from benchmarks import corpus
+
+
+def test_as_bytes() -> None:
+    lines = [line for name in corpus.GENERATORS for line in corpus.generate(name, 20)]
+
+    for _, item in src.get_regex():
+        pattern = src.as_bytes(item)
+        assert src.as_bytes(item) is pattern
+        for line in lines:
+            expected_result = item.match(line)
+            result = pattern.match(line.encode())
+            assert (result and result.regs) == (expected_result and expected_result.regs)
+
+
+def test_as_bytes_non_ascii() -> None:
+    with pytest.raises(ValueError):
+        src.as_bytes(re.compile('ż'))
+
+
+def test_add_context() -> None:
+    src.add_context('test_add_context', ['test_field', 'test_other'])
+    src.add_context('test_add_context', ['test_field'])
+    src.add_context('test_add_context_2', ('test_field',))
+
+    assert src.get_context()['test_field'] == ('test_add_context', 'test_add_context_2')
+    assert src.get_context()['test_other'] == ('test_add_context',)
+
+
+def test_get_routes() -> None:
+    src.add_context('test_get_routes', ['test_routed', 'test_both'])
+    src.add_context('test_get_routes_2', ['test_both'])
+    pattern = re.compile(r'(?P<test_routed>\w+) (\d+) (?P<test_late>\w+) (?P<test_both>\w+)')
+
+    assert src.get_routes(pattern) == (
+        ('test_get_routes', (1, 4), ('test_routed', 'test_both')),
+        ('test_get_routes_2', (4,), ('test_both',)),
+    )
+
+    src.add_context('test_get_routes_3', ['test_late'])
+
+    assert src.get_routes(pattern) == (
+        ('test_get_routes', (1, 4), ('test_routed', 'test_both')),
+        ('test_get_routes_3', (3,), ('test_late',)),
+        ('test_get_routes_2', (4,), ('test_both',)),
+    )
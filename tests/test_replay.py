@@ -0,0 +1,195 @@
+import json
+import mmap
+import os
+import socket
+import subprocess
+import sys
+from collections import namedtuple
+from typing import List, Tuple
+
+import pytest
+
+from src.replay import (
+    Chunk,
+    Settings,
+    _chunks,
+    chunks,
+    container_tag,
+    load_checkpoint,
+    parse_chunk,
+    save_checkpoint,
+    to_syslog,
+)
+from src.syslog.regex import RFC5424
+
+TestCase = namedtuple('TestCase', 'given_record expected_result')
+
+CONTAINER_ID = 'd8e210ec875a' + '0' * 52
+MSGID = f'DOCKER:{CONTAINER_ID}~app_1~sha256:20da7ed64a1e~app:latest~docker'
+NGINX_ERROR = '2020/03/21 23:30:24 [crit] 30016#0: *4 stat() failed'
+
+
+def record(log: str, stream: str = 'stderr', time: str = '2020-03-22T12:35:47.385660123Z') -> bytes:
+    return json.dumps({'log': log, 'stream': stream, 'time': time}).encode() + b'\n'
+
+
+def write_log(directory: str, records: List[bytes], config: bool = True) -> str:
+    path = os.path.join(directory, f'{CONTAINER_ID}-json.log')
+    with open(path, 'wb') as file:
+        file.write(b''.join(records))
+    if config:
+        with open(os.path.join(directory, 'config.v2.json'), 'w') as file:
+            json.dump({
+                'ID': CONTAINER_ID,
+                'Name': '/app_1',
+                'Image': 'sha256:20da7ed64a1e',
+                'Config': {'Image': 'app:latest'},
+            }, file)
+    return path
+
+
+def split(path: str, start: int = 0, size: int = 1) -> List[Tuple[int, int]]:
+    with open(path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        return list(chunks(data, start, size))
+
+
+@pytest.mark.parametrize(
+    'given_record, expected_result', (
+        TestCase({'log': f'{NGINX_ERROR}\n', 'stream': 'stderr', 'time': '2020-03-22T12:35:47.385660123Z'}, f'<27>1 2020-03-22T12:35:47.385660Z host d8e210ec875a - {MSGID} - {NGINX_ERROR}'),
+        TestCase({'log': 'started\r\n', 'stream': 'stdout', 'time': '2020-03-22T12:35:47.38Z'}, f'<30>1 2020-03-22T12:35:47.38Z host d8e210ec875a - {MSGID} - started'),
+        TestCase({'log': '\n', 'stream': 'stdout', 'time': '2020-03-22T12:35:47Z'}, f'<30>1 2020-03-22T12:35:47Z host d8e210ec875a - {MSGID} -'),
+    ),
+)
+def test_to_syslog(given_record: dict, expected_result: str) -> None:
+    result = to_syslog(given_record, 'd8e210ec875a', MSGID, 'host')
+
+    assert result == expected_result
+    assert RFC5424.match(result).group('container_id') == CONTAINER_ID
+
+
+def test_container_tag(tmp_path) -> None:
+    path = write_log(str(tmp_path), [])
+
+    assert container_tag(path) == ('d8e210ec875a', MSGID)
+
+    os.remove(os.path.join(str(tmp_path), 'config.v2.json'))
+
+    assert container_tag(path) == (
+        'd8e210ec875a', f'DOCKER:{CONTAINER_ID}~unknown~unknown~unknown~docker',
+    )
+
+
+def test_chunks(tmp_path) -> None:
+    first, second = record('first\n'), record('second\n')
+    parts = record('par', 'stdout'), record('tial\n', 'stdout')
+    path = write_log(str(tmp_path), [first, *parts, second, b'{"log":"being written'])
+
+    assert split(path) == [
+        (0, len(first)),
+        (len(first), len(first) + len(parts[0]) + len(parts[1])),
+        (len(first) + len(parts[0]) + len(parts[1]), len(first) + len(parts[0]) + len(parts[1]) + len(second)),
+    ]
+    assert split(path, 0, 1 << 20) == [(0, len(first) + len(parts[0]) + len(parts[1]) + len(second))]
+    assert split(path, len(first) + len(parts[0]) + len(parts[1]) + len(second)) == []
+
+
+def test_chunks_partial_tail(tmp_path) -> None:
+    first = record('first\n')
+    path = write_log(str(tmp_path), [first, record('par'), record('ti')])
+
+    assert split(path) == [(0, len(first))]
+    assert split(path, len(first)) == []
+
+
+@pytest.mark.parametrize('given_sentry', (False, True))
+def test_parse_chunk(tmp_path, given_sentry: bool) -> None:
+    records = [
+        record(f'{NGINX_ERROR}\n'),
+        record('Traceback (most recent call last):\n'),
+        record('  File "/app/worker.py", line 1, in run\n'),
+        record('li'), record('ne\n', 'stdout'),
+        b'not json\n',
+    ]
+    path = write_log(str(tmp_path), records)
+    appname, msgid = container_tag(path)
+    chunk = Chunk(path, os.stat(path).st_ino, 0, os.stat(path).st_size, appname, msgid)
+
+    results, lines = parse_chunk(chunk, Settings('host', sentry=given_sentry))
+
+    assert lines == 6
+    if given_sentry:
+        assert [result['message']['formatted'] for result in results] == [
+            'stat() failed\nTraceback (most recent call last):\n  File "/app/worker.py", line 1, in run',
+            'line',
+            'not json',
+        ]
+        assert results[0]['timestamp'] == 1584880547.38566
+        assert results[0]['tags']['container_name'] == 'app_1'
+        assert results[2]['tags'] == {'format': 'RAW', 'severity': '7'}
+    else:
+        results = [json.loads(result) for result in results]
+        assert results[0]['inner']['format'] == 'NGINX_ERROR'
+        assert results[0]['continuation'] == [
+            'Traceback (most recent call last):', '  File "/app/worker.py", line 1, in run',
+        ]
+        assert results[1]['message'] == 'line'
+        assert results[1]['severity'] == '30'
+        assert results[2] == {'raw': 'not json'}
+
+
+def test_checkpoint(tmp_path) -> None:
+    path = write_log(str(tmp_path), [record('first\n'), record('second\n')])
+    checkpoint_path = os.path.join(str(tmp_path), 'checkpoint.json')
+    inode = os.stat(path).st_ino
+
+    assert load_checkpoint(checkpoint_path) == {}
+
+    save_checkpoint(checkpoint_path, {path: (inode, len(record('first\n')))})
+    checkpoint = load_checkpoint(checkpoint_path)
+
+    assert [(chunk.start, chunk.end) for chunk in _chunks([path], checkpoint, 1)] == [
+        (len(record('first\n')), os.stat(path).st_size),
+    ]
+    assert [(chunk.start, chunk.end) for chunk in _chunks([path], {path: (inode + 1, 10)}, 1 << 20)] == [
+        (0, os.stat(path).st_size),
+    ]
+
+
+def test_main(tmp_path) -> None:
+    path = write_log(str(tmp_path), [record(f'{NGINX_ERROR}\n'), record('second\n', 'stdout')])
+    checkpoint_path = os.path.join(str(tmp_path), 'checkpoint.json')
+    command = [
+        sys.executable, '-m', 'src.replay', path, '--processes', '1',
+        '--checkpoint', checkpoint_path, '--hostname', 'host',
+    ]
+
+    result = subprocess.run(command, capture_output=True, check=True, text=True)
+
+    assert [json.loads(line)['message'] for line in result.stdout.splitlines()] == [
+        NGINX_ERROR, 'second',
+    ]
+    assert '2 lines' in result.stderr and 'lines/s' in result.stderr and 'MB/s' in result.stderr
+    assert load_checkpoint(checkpoint_path) == {path: (os.stat(path).st_ino, os.stat(path).st_size)}
+
+    result = subprocess.run(command, capture_output=True, check=True, text=True)
+
+    assert result.stdout == ''
+
+
+def test_main_keeps_checkpoint_of_unsent_chunk(tmp_path) -> None:
+    path = write_log(str(tmp_path), [record(f'{NGINX_ERROR}\n')])
+    checkpoint_path = os.path.join(str(tmp_path), 'checkpoint.json')
+    with socket.socket() as sock:
+        # Nothing listens on the port once it is closed
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    command = [
+        sys.executable, '-m', 'src.replay', path, '--processes', '1',
+        '--checkpoint', checkpoint_path, '--dsn', f'http://public@127.0.0.1:{port}/1',
+    ]
+
+    result = subprocess.run(command, capture_output=True, text=True)
+
+    assert result.returncode == 1
+    assert 'could not be sent' in result.stderr
+    assert load_checkpoint(checkpoint_path) == {}
@@ -0,0 +1,251 @@
+import asyncio
+import os
+from collections import namedtuple
+from typing import List
+
+import pytest
+
+from src.sentry import Sender
+from src.sentry.stub import StubServer
+from src.spool import SUFFIX, Spool
+
+TestCase = namedtuple('TestCase', 'given_fsync expected_syncs')
+
+
+def events(count: int, start: int = 0) -> List[dict]:
+    return [{'message': f'event {index}'} for index in range(start, start + count)]
+
+
+def segments(directory: str) -> List[str]:
+    return sorted(name for name in os.listdir(directory) if name.endswith(SUFFIX))
+
+
+def test_roundtrip_across_segments(tmp_path) -> None:
+    spool = Spool(str(tmp_path), segment_bytes=100)
+
+    assert spool.append(events(10)) == 10
+    assert spool.append([]) == 0
+    assert len(segments(str(tmp_path))) == 1
+    assert spool.append(events(10, 10)) == 10
+    assert len(segments(str(tmp_path))) == 2
+
+    assert spool.read_events(15) == events(15)
+    assert spool.read_events(15) == events(5, 15)
+    assert spool.read_events(15) == []
+    assert (spool.appended, spool.read, spool.backlog) == (20, 20, 0)
+
+
+def test_commit_resumes_after_reopen(tmp_path) -> None:
+    spool = Spool(str(tmp_path), segment_bytes=100)
+    spool.append(events(20))
+    spool.read_events(15)
+    spool.commit()
+    spool.read_events(3)
+    spool.close()
+
+    assert len(segments(str(tmp_path))) == 1
+
+    spool = Spool(str(tmp_path), segment_bytes=100)
+    spool.append(events(2, 20))
+
+    assert spool.read_events(100) == events(7, 15)
+
+
+def test_rewind(tmp_path) -> None:
+    spool = Spool(str(tmp_path))
+    spool.append(events(5))
+    spool.read_events(2)
+    spool.commit()
+    spool.read_events(2)
+    spool.rewind()
+
+    assert spool.read_events(5) == events(3, 2)
+
+
+def test_torn_record_is_truncated(tmp_path) -> None:
+    spool = Spool(str(tmp_path))
+    spool.append(events(3))
+    spool.close()
+    path = os.path.join(str(tmp_path), segments(str(tmp_path))[-1])
+    size = os.path.getsize(path)
+    with open(path, 'ab') as file:
+        file.write(b'\x40\x00\x00\x00\x01\x02\x03\x04{"message":')
+
+    spool = Spool(str(tmp_path))
+
+    assert os.path.getsize(path) == size
+    assert spool.truncated_bytes == 19
+    spool.append(events(1, 3))
+    assert spool.read_events(10) == events(4)
+
+
+def test_corrupt_record_ends_its_segment(tmp_path) -> None:
+    spool = Spool(str(tmp_path), segment_bytes=60)
+    for event in events(6):
+        spool.append([event])
+    spool.close()
+    first = os.path.join(str(tmp_path), segments(str(tmp_path))[0])
+    with open(first, 'r+b') as file:
+        file.seek(8 + 1)
+        file.write(b'X')
+
+    spool = Spool(str(tmp_path), segment_bytes=60)
+
+    assert spool.read_events(10) == events(3, 3)
+    assert spool.truncated_bytes == os.path.getsize(first)
+
+
+def test_size_cap_evicts_oldest(tmp_path) -> None:
+    spool = Spool(str(tmp_path), max_bytes=250, segment_bytes=100)
+    spool.append(events(1))
+    spool.read_events(1)
+    for event in events(19, 1):
+        spool.append([event])
+
+    assert len(segments(str(tmp_path))) == 2
+    assert spool.bytes <= 250
+    # Events 1 to 11, event 0 was read
+    assert spool.evicted_bytes == 9 * 29 + 2 * 30
+    assert spool.read_events(100) == events(8, 12)
+
+
+def test_age_cap_evicts_oldest(tmp_path, clock) -> None:
+    spool = Spool(str(tmp_path), max_age=60, clock=clock)
+    spool.append(events(2))
+    clock.now += 30
+    spool.append(events(2, 2))
+    clock.now += 50
+
+    assert spool.read_events(10) == events(4)
+
+    spool.rewind()
+    clock.now += 20
+    spool.append(events(1, 4))
+
+    assert spool.read_events(10) == events(1, 4)
+    assert len(segments(str(tmp_path))) == 1
+
+
+@pytest.mark.parametrize(
+    'given_fsync, expected_syncs', (
+        TestCase('always', 3),
+        TestCase('interval', 0),
+        TestCase('never', 0),
+    ),
+)
+def test_fsync_policy(tmp_path, given_fsync: str, expected_syncs: int, clock) -> None:
+    spool = Spool(str(tmp_path), fsync=given_fsync, fsync_interval=1.0, clock=clock)
+
+    for _ in range(3):
+        spool.append(events(1))
+    assert spool.syncs == expected_syncs
+
+    clock.now += 1
+    spool.expire()
+    assert spool.syncs == expected_syncs + (given_fsync == 'interval')
+
+
+def test_unknown_fsync_policy(tmp_path) -> None:
+    with pytest.raises(ValueError, match='fsync'):
+        Spool(str(tmp_path), fsync='sometimes')
+
+
+def test_sender_spills_while_sentry_is_down(tmp_path) -> None:
+    async def run() -> None:
+        stub = StubServer(status=500)
+        await stub.start()
+        sender = Sender(
+            stub.dsn(), batch_size=5, flush_interval=0.02, spool=Spool(str(tmp_path)),
+        )
+        sender.start()
+
+        for event in events(10):
+            sender.send(event)
+        for _ in range(100):
+            if sender.spilled >= 10:
+                break
+            await asyncio.sleep(0.01)
+        assert (sender.sent, sender.failed) == (0, 0)
+
+        sender.send({'message': 'event 10'})
+        stub.status = 200
+        for _ in range(200):
+            if sender.sent == 11:
+                break
+            await asyncio.sleep(0.01)
+        await sender.close()
+        await stub.close()
+
+        assert sender.sent == 11
+        # The stub also keeps what it answered with 500
+        assert sorted(event['message'] for event in list(stub.received)[-11:]) == sorted(
+            event['message'] for event in events(11)
+        )
+
+    asyncio.run(run())
+
+
+def test_sender_keeps_backlog_for_next_start(tmp_path) -> None:
+    async def run() -> None:
+        stub = StubServer(status=503)
+        await stub.start()
+        sender = Sender(stub.dsn(), batch_size=5, spool=Spool(str(tmp_path)))
+        for event in events(3):
+            sender.send(event)
+        await sender.close()
+
+        stub.status = 200
+        sender = Sender(stub.dsn(), batch_size=5, flush_interval=0.02, spool=Spool(str(tmp_path)))
+        sender.start()
+        for _ in range(100):
+            if sender.sent == 3:
+                break
+            await asyncio.sleep(0.01)
+        await sender.close()
+        await stub.close()
+
+        assert sender.unspooled == 3
+        assert [event['message'] for event in stub.received][-3:] == ['event 0', 'event 1', 'event 2']
+
+    asyncio.run(run())
+
+
+def test_sender_does_not_spill_rejected_batches(tmp_path) -> None:
+    async def run() -> None:
+        stub = StubServer(status=400)
+        await stub.start()
+        sender = Sender(stub.dsn(), batch_size=5, spool=Spool(str(tmp_path)))
+        for event in events(3):
+            sender.send(event)
+        await sender.close()
+        await stub.close()
+
+        assert (sender.failed, sender.spilled) == (3, 0)
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize('given_status', (500, 200))
+def test_sender_commits_spooled_events_once_sent(tmp_path, given_status: int) -> None:
+    async def run() -> None:
+        spool = Spool(str(tmp_path))
+        spool.append(events(3))
+        spool.close()
+        stub = StubServer(status=given_status, delay=0.1)
+        await stub.start()
+        sender = Sender(stub.dsn(), batch_size=5, flush_interval=0.02, spool=Spool(str(tmp_path)))
+        sender.start()
+        for _ in range(100):
+            if stub.requests:
+                break
+            await asyncio.sleep(0.01)
+        # Posted but not answered yet: a crash now must not lose them
+        assert Spool(str(tmp_path)).read_events(10) == events(3)
+        await sender.close()
+        await stub.close()
+
+        assert sender.spilled == 0
+        expected = events(3) if given_status == 500 else []
+        assert Spool(str(tmp_path)).read_events(10) == expected
+
+    asyncio.run(run())
@@ -0,0 +1,54 @@
+from collections import namedtuple
+
+import pytest
+
+from src.syslog.structured_data import parse_structured_data
+
+TestCase = namedtuple('TestCase', 'given_string expected_result')
+
+
+@pytest.mark.parametrize(
+    'given_string, expected_result', (
+        TestCase('-', {}),
+        TestCase('[exampleSDID@32473]', {'exampleSDID@32473': {}}),
+        TestCase(
+            '[exampleSDID@32473 iut="3" eventSource="Application" eventID="1011"]'
+            '[examplePriority@32473 class="high"]',
+            {
+                'exampleSDID@32473': {'iut': '3', 'eventSource': 'Application', 'eventID': '1011'},
+                'examplePriority@32473': {'class': 'high'},
+            },
+        ),
+        TestCase('[a b=""]', {'a': {'b': ''}}),
+        TestCase('[a b="[x] y=\\"z\\""]', {'a': {'b': '[x] y="z"'}}),
+        TestCase('[a b="\\\\ \\] \\n"]', {'a': {'b': '\\ ] \\n'}}),
+        TestCase('[a b="1"][a c="2" b="3"]', {'a': {'b': '3', 'c': '2'}}),
+        TestCase('[a b="ąę €"]', {'a': {'b': 'ąę €'}}),
+    ),
+)
+def test_parse_structured_data(given_string: str, expected_result: dict) -> None:
+    assert parse_structured_data(given_string) == expected_result
+
+
+@pytest.mark.parametrize(
+    'given_string', (
+        '',
+        '--',
+        '[]',
+        '[a',
+        '[a ]',
+        '[a b]',
+        '[a b=c]',
+        '[a b="c]',
+        '[a b="c"',
+        '[a b="c"]x',
+        '[a b="c"] [d]',
+        '[a b="c\nd"]',
+        '[a  b="c"]',
+        f'[{"a" * 33}]',
+        f'[a {"b" * 33}="c"]',
+    ),
+)
+def test_parse_structured_data_invalid(given_string: str) -> None:
+    with pytest.raises(ValueError):
+        parse_structured_data(given_string)
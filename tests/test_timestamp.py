@@ -0,0 +1,87 @@
+import datetime as dt
+import re
+from collections import namedtuple
+from typing import Optional
+
+import pytest
+
+from src.common_log_format.regex import HTTPD
+from src.mariadb_mysql.regex import MYSQL
+from src.nginx.regex import NGINX_ERROR
+from src.record import record_type
+from src.syslog.regex import RFC5424
+from src.timestamp import Normalizer
+
+TestCase = namedtuple('TestCase', 'given_expression given_string expected_result')
+
+UTC = dt.timezone.utc
+
+
+@pytest.mark.parametrize(
+    'given_expression, given_string, expected_result', (
+        TestCase(RFC5424, '<30>1 2020-03-22T12:35:47.385660+02:00 host 6e8ef9a56b54 927 6e8ef9a56b54 - foo', dt.datetime(2020, 3, 22, 10, 35, 47, 385660, UTC)),
+        TestCase(RFC5424, '<165>1 2003-10-11T22:14:15.003Z mymachine.example.com evntslog - ID47 -', dt.datetime(2003, 10, 11, 22, 14, 15, 3000, UTC)),
+        TestCase(HTTPD, '127.0.0.1 - frank [10/Oct/2000:13:55:36 -0700] "GET /apache_pb.gif HTTP/1.0" 200 2326', dt.datetime(2000, 10, 10, 20, 55, 36, 0, UTC)),
+        TestCase(HTTPD, '127.0.0.1 - frank [10/Oct/2000:13:55:36 +0130] "GET /apache_pb.gif HTTP/1.0" 200 2326', dt.datetime(2000, 10, 10, 12, 25, 36, 0, UTC)),
+        TestCase(MYSQL, '2020-03-22T12:35:47.538083Z 0 [Note] [MY-012487] [InnoDB] InnoDB: DDL log recovery : begin', dt.datetime(2020, 3, 22, 12, 35, 47, 538083, UTC)),
+        TestCase(MYSQL, '2020-03-22 12:35:47 140310100753288 [Note] InnoDB: started', dt.datetime(2020, 3, 22, 12, 35, 47, 0, UTC)),
+        TestCase(NGINX_ERROR, '2020/03/21 23:30:24 [crit] 30016#0: *4 stat() failed', dt.datetime(2020, 3, 21, 23, 30, 24, 0, UTC)),
+        TestCase(HTTPD, '127.0.0.1 - frank [31/Feb/2000:13:55:36 -0700] "GET / HTTP/1.0" 200 0', dt.datetime(2000, 3, 2, 20, 55, 36, 0, UTC)),
+        TestCase(HTTPD, '127.0.0.1 - frank [10/Foo/2000:13:55:36 -0700] "GET / HTTP/1.0" 200 0', None),
+    ),
+)
+def test_normalize(
+    given_expression: re.Pattern,
+    given_string: str,
+    expected_result: Optional[dt.datetime],
+) -> None:
+    record = record_type('TEST', given_expression)(given_expression.match(given_string))
+    normalizer = Normalizer()
+
+    result = normalizer.datetime(record)
+
+    assert result == expected_result
+    if expected_result is None:
+        assert normalizer.epoch(record) is None
+        assert normalizer.microseconds(record) is None
+    else:
+        assert result.tzinfo is not None
+        assert normalizer.epoch(record) == pytest.approx(expected_result.timestamp())
+        assert normalizer.microseconds(record) == (
+            (expected_result - dt.datetime(1970, 1, 1, tzinfo=UTC)) // dt.timedelta(microseconds=1)
+        )
+
+
+def test_default_timezone() -> None:
+    normalizer = Normalizer(default_timezone=dt.timezone(dt.timedelta(hours=2)))
+
+    assert normalizer('2020', '03', '22', '12', '00', '00') == dt.datetime(2020, 3, 22, 10, tzinfo=UTC)
+    assert normalizer('2020', '03', '22', '12', '00', '00', None, 'Z') == dt.datetime(2020, 3, 22, 12, tzinfo=UTC)
+
+
+def test_cached_per_second() -> None:
+    normalizer = Normalizer()
+
+    normalizer('2020', '03', '22', '12', '35', '47', '1', 'Z')
+    normalizer('2020', '03', '22', '12', '35', '47', '2', 'Z')
+    result = normalizer('2020', '03', '22', '12', '35', '47', '000003', 'Z')
+    normalizer('2020', '03', '22', '12', '35', '48', None, 'Z')
+
+    assert result.microsecond == 3
+    assert (normalizer.hits, normalizer.misses) == (2, 2)
+
+
+def test_cache_is_bounded() -> None:
+    normalizer = Normalizer(maxsize=10)
+
+    for second in range(60):
+        normalizer('2020', '03', '22', '12', '35', f'{second:02d}')
+
+    assert len(normalizer._seconds) <= 10
+
+
+def test_record_without_timestamp() -> None:
+    given_type = record_type('WORD', re.compile(r'(?P<word>\w+)'))
+
+    with pytest.raises(ValueError):
+        Normalizer().datetime(given_type(given_type.PATTERN.match('foo')))
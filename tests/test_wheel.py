@@ -0,0 +1,41 @@
+import pytest
+
+from src.wheel import TimerWheel
+
+
+def test_wheel_advance() -> None:
+    wheel: TimerWheel[str] = TimerWheel(tick=1.0, slots=4)
+    wheel.schedule('a', 1.5)
+    wheel.schedule('b', 2.0)
+    wheel.schedule('c', 9.0)
+
+    assert wheel.advance(0.9) == []
+    assert wheel.advance(1.9) == ['a']
+    assert wheel.advance(2.0) == ['b']
+    assert len(wheel) == 1
+    assert wheel.advance(8.5) == []
+    assert wheel.advance(9.0) == ['c']
+    assert len(wheel) == 0
+
+
+def test_wheel_past_deadline() -> None:
+    wheel: TimerWheel[str] = TimerWheel(tick=1.0, slots=4, now=10.0)
+    wheel.schedule('a', 5.0)
+
+    assert wheel.next_tick == 11.0
+    assert wheel.advance(10.5) == []
+    assert wheel.advance(11.0) == ['a']
+
+
+def test_wheel_jump() -> None:
+    wheel: TimerWheel[int] = TimerWheel(tick=0.1, slots=8)
+    for index in range(100):
+        wheel.schedule(index, index / 10)
+
+    assert sorted(wheel.advance(5.05)) == list(range(51))
+    assert sorted(wheel.advance(1000.0)) == list(range(51, 100))
+
+
+def test_wheel_invalid() -> None:
+    with pytest.raises(ValueError):
+        TimerWheel(tick=0.0)
@@ -0,0 +1,131 @@
+import asyncio
+import os
+import signal
+from collections import namedtuple
+from typing import Any, List, Tuple
+
+import pytest
+
+import src.common_log_format  # noqa: F401
+import src.mariadb_mysql  # noqa: F401
+import src.nginx  # noqa: F401
+from src.pipeline import Event, Pipeline
+from src.workers import Workers, shard_key
+
+TestCase = namedtuple('TestCase', 'given_string expected_result')
+
+MYSQL = '2020-03-22T12:35:47.538083Z 4 [Warning] [10051] [Server] Event Scheduler: scheduler thread started with id 4'
+NGINX_ERROR = '2020/03/21 23:30:24 [crit] 30016#0: *4 stat() "/var/www/html/index.php" failed (13: Permission denied)'
+
+
+def line(container: str, message: str, priority: int = 27) -> str:
+    return (
+        f'<{priority}>1 2020-03-22T12:35:47.385660+02:00 host.localdomain app 927 '
+        f'DOCKER:{container}~app_1~sha256:20da7ed64a1e~app:latest~docker - {message}'
+    )
+
+
+@pytest.mark.parametrize(
+    'given_string, expected_result', (
+        TestCase(line('d8e210ec875a', MYSQL), 'd8e210ec875a'),
+        TestCase('<165>1 2003-10-11T22:14:15.003Z mymachine.example.com evntslog - ID47 - BOM An application event log entry...', 'mymachine.example.com evntslog'),
+        TestCase('not syslog', ''),
+        TestCase('', ''),
+    ),
+)
+def test_shard_key(given_string: str, expected_result: str) -> None:
+    assert shard_key(given_string) == expected_result
+
+
+def summary(event: Event) -> Tuple[Any, ...]:
+    inner = event.inner
+    return (
+        event.line,
+        event.envelope.asdict(),
+        event.message,
+        inner.FORMAT if inner is not None else None,
+        inner.asdict() if inner is not None else None,
+    )
+
+
+def test_workers() -> None:
+    lines = [
+        line(f'{container:012x}', message, priority)
+        for index in range(50)
+        for container in range(8)
+        for message, priority in ((f'{MYSQL} {index}', 27), (NGINX_ERROR, 31), ('not logged by MySQL', 27))
+    ] + ['not syslog']
+    expected_result: List[Tuple[Any, ...]] = []
+    pipeline = Pipeline.from_registry(lambda event: expected_result.append(summary(event)), 4)
+    for item in lines:
+        pipeline(item)
+    result: List[Tuple[Any, ...]] = []
+
+    async def run() -> Workers:
+        workers = Workers(lambda event: result.append(summary(event)), 3, severity=4, batch=16)
+        workers.start()
+        for item in lines:
+            await workers.wait()
+            workers(item)
+        await workers.close()
+        return workers
+
+    workers = asyncio.run(run())
+
+    assert (workers.lines, workers.unparsed, workers.dropped, workers.inflight) == (len(lines), 1, 0, 0)
+    assert sorted(result) == sorted(expected_result)
+    # Lines of every container keep their order
+    for container in range(8):
+        key = f'DOCKER:{container:012x}~'
+        assert [item for item in result if key in item[0]] == [item for item in expected_result if key in item[0]]
+
+
+def test_workers_replace_a_dead_worker() -> None:
+    lines = [line(f'{container:012x}', f'{MYSQL} {index}') for index in range(40) for container in range(8)]
+    result: List[str] = []
+
+    async def run() -> Workers:
+        workers = Workers(lambda event: result.append(event.line), 2, batch=4)
+        workers.start()
+        for item in lines[:160]:
+            await workers.wait()
+            workers(item)
+        await asyncio.sleep(0)
+        # Batches of the killed worker are in flight
+        assert workers.inflight
+        os.kill(workers._processes[0].pid, signal.SIGKILL)  # type: ignore
+        for item in lines[160:]:
+            await workers.wait()
+            workers(item)
+        await workers.close()
+        return workers
+
+    workers = asyncio.run(run())
+
+    assert (workers.restarts, workers.dropped, workers.inflight) == (1, 0, 0)
+    assert sorted(result) == sorted(lines)
+    for container in range(8):
+        key = f'DOCKER:{container:012x}~'
+        assert [item for item in result if key in item] == [item for item in lines if key in item]
+
+
+def test_workers_check() -> None:
+    result: List[str] = []
+
+    async def run() -> Workers:
+        workers = Workers(lambda event: result.append(event.line), 1, batch=4)
+        workers.start()
+        process = workers._processes[0]  # type: ignore
+        workers._loop.remove_reader(workers._results[0].fileno())  # type: ignore
+        process.kill()
+        process.join()
+        # Without the pipe closing, the dead worker is only noticed by `check`
+        workers.check()
+        assert workers._processes[0] is not process  # type: ignore
+        workers(line('d8e210ec875a', MYSQL))
+        await workers.close()
+        return workers
+
+    workers = asyncio.run(run())
+
+    assert (workers.restarts, len(result)) == (1, 1)